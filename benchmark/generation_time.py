@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from js2c.codegen.root import RootGenerator
+from js2c.schema import load_schema
+from js2c.settings import Settings
+
+HELP = """
+Measure how the generation time grows with the number of types in the schema.
+
+The generated schemas consist of groups of nested objects. Every group has its own $id, and is used twice,
+so half of the type lookups find an already cached type with the same name, which has to be compared.
+""".strip()
+
+def group_schema(group_index, depth):
+    level = {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["id", "kind", "tags"],
+        "properties": {
+            "id": {"type": "integer", "minimum": 0},
+            "kind": {"type": "string", "enum": ["small", "large"]},
+            "tags": {"type": "array", "maxItems": 4, "items": {"type": "string", "maxLength": 15}},
+        },
+    }
+    if depth > 1:
+        level["required"].append("next")
+        level["properties"]["next"] = group_schema(group_index, depth - 1)
+    level["$id"] = "#group_{}_level_{}".format(group_index, depth)
+    return level
+
+
+def benchmark_schema(group_num, group_depth):
+    definitions = {}
+    properties = {}
+    for group_index in range(group_num):
+        definitions["group_{}".format(group_index)] = group_schema(group_index, group_depth)
+        for copy_name in ("first", "second"):
+            properties["{}_{}".format(copy_name, group_index)] = {
+                "$ref": "#/definitions/group_{}".format(group_index)
+            }
+    return {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "$id": "#benchmark",
+        "type": "object",
+        "additionalProperties": False,
+        "required": list(properties),
+        "properties": properties,
+        "definitions": definitions,
+    }
+
+
+def measure(group_num, group_depth):
+    """ Returns the number of type declarations and the generation time in seconds """
+    schema_file = io.StringIO(json.dumps(benchmark_schema(group_num, group_depth)))
+    start_time = time.perf_counter()
+    schema = load_schema(schema_file)
+    root_generator = RootGenerator(schema, Settings({}, {}))
+    h_file = io.StringIO()
+    h_file.name = "benchmark.parser.h"
+    c_file = io.StringIO()
+    c_file.name = "benchmark.parser.c"
+    root_generator.generate_parser_h(h_file)
+    root_generator.generate_parser_c(c_file, "benchmark.parser.h")
+    elapsed = time.perf_counter() - start_time
+    return h_file.getvalue().count("typedef "), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "--groups", type=int, nargs="+", default=[80, 160, 320, 640],
+        help="The schema sizes to measure, in number of groups",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=8,
+        help="The number of nested objects in a group",
+    )
+    args = parser.parse_args()
+    print("{:>8} {:>10} {:>14}".format("types", "time (s)", "us per type"))
+    for group_num in args.groups:
+        type_num, elapsed = measure(group_num, args.depth)
+        print("{:>8} {:>10.3f} {:>14.1f}".format(type_num, elapsed, elapsed / type_num * 1e6))
+
+
+if __name__ == "__main__":
+    main()
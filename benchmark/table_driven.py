@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from js2c.codegen.root import RootGenerator
+from js2c.schema import load_schema
+from js2c.settings import Settings
+
+HELP = """
+Compare the table-driven parser with the generated parser functions: the code size of the compiled parser, and
+the time it takes to parse a document.
+
+The schemas have a number of different record types, each in its own array. The code size grows with the number
+of types for the generated functions, but mostly only the (smaller) tables grow for the table-driven parser.
+""".strip()
+
+DRIVER = r"""
+#include "benchmark.parser.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+
+static benchmark_t out;
+
+int main(int argc, char **argv) {
+    (void)argc;
+    const char *document = argv[1];
+    const long iterations = atol(argv[2]);
+    struct timespec start, end;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (long i = 0; i < iterations; ++i) {
+        if (json_parse_benchmark(document, &out)) {
+            return 1;
+        }
+    }
+    clock_gettime(CLOCK_MONOTONIC, &end);
+    const double elapsed_ns = (end.tv_sec - start.tv_sec) * 1e9 + (end.tv_nsec - start.tv_nsec);
+    printf("%f\n", elapsed_ns / iterations);
+    return 0;
+}
+"""
+
+
+def record_schema(type_index):
+    return {
+        "type": "object",
+        "$id": "#record_{}".format(type_index),
+        "additionalProperties": False,
+        "required": ["id", "name", "kind", "position"],
+        "properties": {
+            "id": {"type": "integer", "minimum": 0, "maximum": 1000000 + type_index},
+            "name": {"type": "string", "maxLength": 31},
+            "kind": {"type": "string", "enum": ["small", "medium", "large", "kind_{}".format(type_index)]},
+            "score": {"type": "number", "minimum": -1, "default": 0},
+            "enabled": {"type": "boolean", "default": True},
+            "position": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["x", "y"],
+                "properties": {
+                    "x": {"type": "integer", "js2cType": "int32_t"},
+                    "y": {"type": "integer", "js2cType": "int32_t"},
+                },
+            },
+            "tags": {"type": "array", "maxItems": 4, "items": {"type": "string", "maxLength": 15}},
+        },
+    }
+
+
+def benchmark_schema(type_num, table_driven):
+    return {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "$id": "benchmark",
+        "js2cSettings": {"tableDriven": table_driven},
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["records_{}".format(type_index) for type_index in range(type_num)],
+        "properties": {
+            "records_{}".format(type_index): {"type": "array", "maxItems": 8, "items": record_schema(type_index)}
+            for type_index in range(type_num)
+        },
+    }
+
+
+def benchmark_document(type_num):
+    records = [
+        {
+            "id": record_index,
+            "name": "record number {}".format(record_index),
+            "kind": "medium",
+            "score": 0.25 * record_index,
+            "position": {"x": -record_index, "y": record_index * 3},
+            "tags": ["a", "bcd"],
+        }
+        for record_index in range(8)
+    ]
+    return json.dumps({"records_{}".format(type_index): records for type_index in range(type_num)})
+
+
+def load_schema_from_dict(schema):
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as schema_file:
+        json.dump(schema, schema_file)
+        schema_file.seek(0)
+        return load_schema(schema_file)
+
+
+def generate(schema, c_path, h_path):
+    root_generator = RootGenerator(load_schema_from_dict(schema), Settings({}, schema["js2cSettings"]))
+    with open(h_path, "w", encoding="utf-8") as h_file:
+        root_generator.generate_parser_h(h_file)
+    with open(c_path, "w", encoding="utf-8") as c_file:
+        root_generator.generate_parser_c(c_file, os.path.basename(h_path))
+
+
+def code_size(object_path):
+    """ The text and data size of the compiled parser """
+    size_output = subprocess.check_output(["size", object_path], encoding="utf-8").splitlines()
+    text, data = size_output[1].split()[:2]
+    return int(text) + int(data)
+
+
+def measure(type_num, table_driven, compiler, iterations, directory):
+    """ Returns the code size in bytes and the parse time of a document in microseconds """
+    c_path = os.path.join(directory, "benchmark.parser.c")
+    h_path = os.path.join(directory, "benchmark.parser.h")
+    generate(benchmark_schema(type_num, table_driven), c_path, h_path)
+    object_path = os.path.join(directory, "benchmark.parser.o")
+    subprocess.check_call([compiler, "-O2", "-c", c_path, "-o", object_path])
+    driver_path = os.path.join(directory, "driver.c")
+    with open(driver_path, "w", encoding="utf-8") as driver_file:
+        driver_file.write(DRIVER)
+    executable_path = os.path.join(directory, "driver")
+    subprocess.check_call([compiler, "-O2", "-I", directory, driver_path, object_path, "-o", executable_path])
+    parse_time_ns = float(subprocess.check_output(
+        [executable_path, benchmark_document(type_num), str(iterations)], encoding="utf-8"
+    ))
+    return code_size(object_path), parse_time_ns / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "--types", type=int, nargs="+", default=[1, 8, 32],
+        help="The schema sizes to measure, in number of record types",
+    )
+    parser.add_argument("--iterations", type=int, default=2000, help="The number of times each document is parsed")
+    parser.add_argument("--cc", default=os.environ.get("CC", "cc"), help="The C compiler")
+    args = parser.parse_args()
+    print("{:>6} {:>18} {:>18} {:>16} {:>16}".format(
+        "types", "code size (funcs)", "code size (table)", "us/doc (funcs)", "us/doc (table)"
+    ))
+    with tempfile.TemporaryDirectory() as directory:
+        for type_num in args.types:
+            function_size, function_time = measure(type_num, False, args.cc, args.iterations, directory)
+            table_size, table_time = measure(type_num, True, args.cc, args.iterations, directory)
+            print("{:>6} {:>18} {:>18} {:>16.2f} {:>16.2f}".format(
+                type_num, function_size, table_size, function_time, table_time
+            ))
+
+
+if __name__ == "__main__":
+    main()
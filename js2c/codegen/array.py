@@ -22,7 +22,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator, CType, SchemaError
+from .base import Generator, CType, SchemaError, struct_layout
+from .error_helper_cache import ErrorArgument, StructuredError, error_value
+from .object import ObjectGenerator
 
 
 class ArrayType(CType):
@@ -43,21 +45,53 @@ class ArrayType(CType):
         out_file.print("}} {};".format(self.type_name))
         out_file.print("")
 
-    def __eq__(self, other):
-        return (
-            super().__eq__(other) and
-            self.max_items == other.max_items and
-            self.item_type == other.item_type
+    def layout(self):
+        return struct_layout([(CType.PRIMITIVE_LAYOUTS["uint64_t"], 1), (self.item_type.layout(), self.max_items)])
+
+    def structure(self):
+        return (self.max_items, self.item_type.fingerprint)
+
+
+class ColumnarArrayType(CType):
+    """ An array of objects, stored as one array per field ("struct of arrays") """
+    def __init__(self, type_name, description, fields, max_items):
+        super().__init__(type_name, description)
+        self.fields = fields
+        self.max_items = max_items
+
+    def generate_type_declaration_impl(self, out_file):
+        for field_type in self.fields.values():
+            field_type.generate_type_declaration(out_file)
+
+        out_file.print("typedef struct {}_s ".format(self.type_name) + "{")
+        with out_file.indent():
+            out_file.print_with_docstring("uint64_t n;", "The number of elements in the array")
+            for field_name, field_type in self.fields.items():
+                field_type.generate_field_declaration(
+                    "{}[{}]".format(field_name, self.max_items), out_file
+                )
+        out_file.print("}} {};".format(self.type_name))
+        out_file.print("")
+
+    def layout(self):
+        return struct_layout(
+            [(CType.PRIMITIVE_LAYOUTS["uint64_t"], 1)] +
+            [(field_type.layout(), self.max_items) for field_type in self.fields.values()]
         )
 
+    def structure(self):
+        return (self.max_items, tuple((name, field_type.fingerprint) for name, field_type in self.fields.items()))
+
 
 class ArrayGenerator(Generator):
     JSON_FIELDS = Generator.JSON_FIELDS + (
         "minItems",
         "maxItems",
+        "js2cColumnar",
     )
     minItems = 0
     maxItems = None
+    js2cColumnar = False
 
     def __init__(self, schema, parameters):
         super().__init__(schema, parameters)
@@ -70,54 +104,117 @@ class ArrayGenerator(Generator):
             schema["items"],
             parameters.with_suffix("items", self.type_name, "item"),
         )
-        self.c_type = ArrayType(
-            self.type_name,
-            self.description,
-            self.item_generator.c_type,
-            self.maxItems
-        )
+        if self.js2cColumnar:
+            if not isinstance(self.item_generator, ObjectGenerator) or not self.item_generator.fields:
+                raise SchemaError(self, "Only arrays of objects with properties can be columnar")
+            self.row_parser_name = self.parser_name + "_row"
+            self.c_type = ColumnarArrayType(
+                self.type_name,
+                self.description,
+                self.item_generator.c_type.fields,
+                self.maxItems
+            )
+        else:
+            self.c_type = ArrayType(
+                self.type_name,
+                self.description,
+                self.item_generator.c_type,
+                self.maxItems
+            )
         self.c_type = parameters.type_cache.try_get_cached(self.c_type)
 
     @classmethod
     def can_parse_schema(cls, schema):
         return schema.get('type') == 'array'
 
+    def child_generators(self):
+        if self.js2cColumnar:
+            return list(self.item_generator.fields.values())
+        return [self.item_generator]
+
     def generate_parser_call(self, out_var_name, out_file):
         parser_call = "parse_{}(parse_state, {})".format(self.parser_name, out_var_name)
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
+            out_file.print("return true;")
+
+    def generate_validator_call(self, out_file):
+        validator_call = "validate_{}(parse_state)".format(self.validator_name)
+        with self.error_if_block(validator_call, out_file):
             out_file.print("return true;")
 
     def generate_range_checks(self, out_file):
-        with out_file.if_block("n > {}".format(self.maxItems)):
+        with self.error_if_block("n > {}".format(self.maxItems), out_file):
             self.generate_logged_error(
-                ["Array '%s' too large. Length: %i. Maximum length: {}.".format(self.maxItems), "parse_state->current_key", "n"],
+                ["Array '%s' too large. Length: %i. Maximum length: {}.".format(self.maxItems), "parse_state->current_key", ErrorArgument("int", "n")],
+                StructuredError("JS2C_ERROR_ARRAY_TOO_LARGE", error_value("i", self.maxItems), error_value("i", "n")),
                 out_file
             )
         if self.minItems:
-            with out_file.if_block("n < {}".format(self.minItems)):
+            with self.error_if_block("n < {}".format(self.minItems), out_file):
                 self.generate_logged_error(
-                    ["Array '%s' too small. Length: %i. Minimum length: {}.".format(self.minItems), "parse_state->current_key", "n"],
+                    ["Array '%s' too small. Length: %i. Minimum length: {}.".format(self.minItems), "parse_state->current_key", ErrorArgument("int", "n")],
+                    StructuredError("JS2C_ERROR_ARRAY_TOO_SMALL", error_value("i", self.minItems), error_value("i", "n")),
                     out_file
                 )
 
-    def generate_parser_bodies(self, out_file):
-        self.item_generator.generate_parser_bodies(out_file)
-
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.parser_name, self.c_type))
-        with out_file.code_block():
-            with out_file.if_block("check_type(parse_state, JSMN_ARRAY)"):
-                out_file.print("return true;")
-            out_file.print("const int n = parse_state->tokens[parse_state->current_token].size;")
-            self.generate_range_checks(out_file)
-            out_file.print("out->n = n;")
-            out_file.print("parse_state->current_token += 1;")
-            with out_file.for_block("int i = 0; i < n; ++i"):
+    def generate_parser_body(self, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_ARRAY)", out_file):
+            out_file.print("return true;")
+        out_file.print("const int n = parse_state->tokens[parse_state->current_token].size;")
+        self.generate_range_checks(out_file)
+        out_file.print("out->n = n;")
+        out_file.print("parse_state->current_token += 1;")
+        with out_file.for_block("int i = 0; i < n; ++i"):
+            if self.js2cColumnar:
+                with self.error_if_block("parse_{}(parse_state, out, i)".format(self.row_parser_name), out_file):
+                    out_file.print("return true;")
+            else:
                 self.item_generator.generate_parser_call(
                     "&out->items[i]",
                     out_file
                 )
-            out_file.print("return false;")
-        out_file.print("")
+        out_file.print("return false;")
+
+    @classmethod
+    def generate_column_parser_call(cls, field_name, field_generator, out_file):
+        field_generator.generate_parser_call("&out->{}[row]".format(field_name), out_file)
+
+    def generate_row_parser_body(self, out_file):
+        """ Parse an object item directly into the row-th element of the columns """
+        self.item_generator.generate_object_body(
+            self.generate_column_parser_call, True, True, out_file, field_format="out->{}[row]"
+        )
+
+    def generate_parser_bodies(self, out_file):
+        if self.js2cColumnar:
+            # The item object itself is never stored, only its fields.
+            for field_generator in self.item_generator.fields.values():
+                field_generator.generate_parser_bodies(out_file)
+            self.row_parser_name = self.generate_deduplicated_function(
+                "static bool parse_{{}}(parse_state_t *parse_state, {} *out, uint64_t row)".format(self.c_type),
+                self.row_parser_name,
+                self.generate_row_parser_body,
+                out_file
+            )
+        else:
+            self.item_generator.generate_parser_bodies(out_file)
+
+        self.generate_parser_function(self.generate_parser_body, out_file)
+
+    def generate_validator_body(self, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_ARRAY)", out_file):
+            out_file.print("return true;")
+        out_file.print("const int n = parse_state->tokens[parse_state->current_token].size;")
+        self.generate_range_checks(out_file)
+        out_file.print("parse_state->current_token += 1;")
+        with out_file.for_block("int i = 0; i < n; ++i"):
+            self.item_generator.generate_validator_call(out_file)
+        out_file.print("return false;")
+
+    def generate_validator_bodies(self, out_file):
+        self.item_generator.generate_validator_bodies(out_file)
+
+        self.generate_validator_function(self.generate_validator_body, out_file)
 
     def has_default_value(self):
         return super().has_default_value() or self.minItems == 0
@@ -24,8 +24,15 @@
 #
 from abc import ABC, abstractmethod
 from collections import namedtuple
+import contextlib
+import hashlib
+import io
 import re
 
+from .code_block_printer import CodeBlockPrinter
+from .error_helper_cache import ErrorArgument, StructuredError
+from .parser_cache import ParserCache
+
 
 class SchemaError(ValueError):
     def __init__(self, generator_or_path, message):
@@ -38,6 +45,34 @@ class SchemaError(ValueError):
         super().__init__("Schema error in '{}': {}".format(path, message))
 
 
+TypeLayout = namedtuple("TypeLayout", ("size", "alignment", "padding"))
+
+
+def struct_layout(members):
+    """ Estimated layout of a C struct on common ABIs, where every type is aligned to its own alignment.
+
+    members is a list of (TypeLayout, count) pairs, where count is the array length for array members.
+    Returns None if the layout of any member is unknown. Padding includes the padding of the members.
+    """
+    if any(layout is None for layout, _ in members):
+        return None
+    size = 0
+    alignment = 1
+    padding = 0
+    for layout, count in members:
+        misalignment = size % layout.alignment
+        if misalignment:
+            padding += layout.alignment - misalignment
+            size += layout.alignment - misalignment
+        size += layout.size * count
+        padding += layout.padding * count
+        alignment = max(alignment, layout.alignment)
+    if size % alignment:
+        padding += alignment - size % alignment
+        size += alignment - size % alignment
+    return TypeLayout(size, alignment, padding)
+
+
 GeneratorInitParametersBase = namedtuple(
     "GeneratorInitParameters",
     (
@@ -46,7 +81,9 @@ GeneratorInitParametersBase = namedtuple(
         'type_name',
         'settings',
         'generator_factory',
-        'type_cache'
+        'type_cache',
+        'parser_cache',
+        'error_helper_cache',
     )
 )
 
@@ -64,6 +101,8 @@ class GeneratorInitParameters(GeneratorInitParametersBase):
             self.settings,
             self.generator_factory,
             self.type_cache,
+            self.parser_cache,
+            self.error_helper_cache,
         )
 
 
@@ -87,6 +126,9 @@ class Generator(ABC):
         self.path_in_schema = parameters.path_in_schema
         self.settings = parameters.settings
         self.parser_name = parameters.parser_name
+        self.validator_name = parameters.parser_name
+        self.parser_cache = parameters.parser_cache
+        self.error_helper_cache = parameters.error_helper_cache
 
         if self.js2cType is not None:
             self.type_name = self.js2cType
@@ -100,6 +142,10 @@ class Generator(ABC):
     def generate_parser_call(self, out_var_name, out_file):
         pass
 
+    @abstractmethod
+    def generate_validator_call(self, out_file):
+        """ Same as generate_parser_call, with all the checks, but without storing the parsed value anywhere """
+
     @abstractmethod
     def max_token_num(self):
         pass
@@ -109,9 +155,59 @@ class Generator(ABC):
     def can_parse_schema(cls, schema):
         pass
 
+    def child_generators(self):
+        """ The generators of the values stored in this one's type, e.g. object fields """
+        return []
+
     def generate_parser_bodies(self, out_file):
         pass
 
+    def generate_validator_bodies(self, out_file):
+        pass
+
+    def generate_deduplicated_function(self, signature, function_name, generate_body, out_file):
+        """ Generate a function, unless an identical one was already generated.
+
+        Returns the name of the function to call, which is the name of the existing function in the latter case.
+        """
+        if self.settings.split_output:
+            # The function may be called from another translation unit
+            assert signature.startswith("static "), signature
+            signature = "JS2C_INTERNAL " + signature[len("static "):]
+        function_file = CodeBlockPrinter(io.StringIO())
+        function_file.print(signature.format(ParserCache.PARSER_NAME_PLACEHOLDER))
+        with function_file.code_block():
+            generate_body(function_file)
+        function_file.print("")
+
+        parser_code = function_file.file.getvalue()
+        cached_function_name = self.parser_cache.try_get_cached(function_name, parser_code)
+        if cached_function_name == function_name:
+            out_file.file.write(parser_code.replace(ParserCache.PARSER_NAME_PLACEHOLDER, function_name, 1))
+        return cached_function_name
+
+    def generate_parser_function(self, generate_body, out_file):
+        """ Generate the parse_ function of this generator, unless an identical one was already generated.
+
+        In the latter case self.parser_name is changed to the name of the existing function, so calls
+        generated afterwards (including the parent's parser body) will use that one.
+        """
+        self.parser_name = self.generate_deduplicated_function(
+            "static bool parse_{{}}(parse_state_t *parse_state, {} *out)".format(self.c_type),
+            self.parser_name,
+            generate_body,
+            out_file
+        )
+
+    def generate_validator_function(self, generate_body, out_file):
+        """ Same as generate_parser_function, but for the validate_ function, which has no output """
+        self.validator_name = self.generate_deduplicated_function(
+            "static bool validate_{}(parse_state_t *parse_state)",
+            self.validator_name,
+            generate_body,
+            out_file
+        )
+
     def has_default_value(self):
         return self.js2cDefault is not None
 
@@ -122,17 +218,93 @@ class Generator(ABC):
         out_file.print("{} = {};".format(out_var_name, self.js2cDefault))
         return True
 
-    @classmethod
-    def generate_logged_error(cls, log_message, out_file):
+    def default_initializer(self):
+        """ A constant C initializer of the default value, or None if it can only be set by code.
+
+        js2cDefault can be any C expression, so it is always set by code. Arrays and maps are always set by code
+        too: only their lengths have to be reset, and a constant initializer would copy all of their items.
+        """
+        return None
+
+    def generate_error_path(self, out_file):
+        """ Record this generator's schema path as the path of a structured error, unless a child already did """
+        out_file.print("JS2C_SET_ERROR_PATH(parse_state, {})".format(
+            self.error_helper_cache.error_path_id(self.path_in_schema)
+        ))
+
+    @contextlib.contextmanager
+    def error_if_block(self, condition, out_file):
+        """ An if block for a condition that means a parse error """
+        if self.settings.cold_error_paths:
+            condition = "JS2C_UNLIKELY({})".format(condition)
+        with out_file.if_block(condition):
+            if self.settings.structured_errors:
+                self.generate_error_path(out_file)
+            yield
+
+    def generate_key_children_check(self, out_file):
+        """ Check that the current object key token has exactly one value """
+        with self.error_if_block("CURRENT_TOKEN(parse_state).size > 1", out_file):
+            self.generate_logged_error(
+                [
+                    "Missing separator between values in '%s', after key: %.*s",
+                    "parse_state->current_key",
+                    "CURRENT_STRING_FOR_ERROR(parse_state)"
+                ],
+                StructuredError("JS2C_ERROR_MISSING_SEPARATOR"),
+                out_file
+            )
+
+        with self.error_if_block("CURRENT_TOKEN(parse_state).size < 1", out_file):
+            self.generate_logged_error(
+                [
+                    "Missing value in '%s', after key: %.*s",
+                    "parse_state->current_key",
+                    "CURRENT_STRING_FOR_ERROR(parse_state)"
+                ],
+                StructuredError("JS2C_ERROR_MISSING_VALUE"),
+                out_file
+            )
+
+    def generate_logged_error(self, log_message, structured_error, out_file):
+        """ Log an error and return from the parser function.
+
+        log_message is either a simple string (logged with the current key as the only argument), or a list of
+        the message and its arguments. Arguments that are not derived from parse_state must be given as
+        ErrorArgument-s, so that they can be passed to out-of-line error helpers. structured_error is the
+        StructuredError recorded instead of the message with structured errors.
+        """
         if isinstance(log_message, str):
-            out_file.print("LOG_ERROR(CURRENT_TOKEN(parse_state).start, \"{}\", parse_state->current_key)".format(log_message))
+            log_message = [log_message, "parse_state->current_key"]
+        assert len(log_message) > 1, "Use a simple string, not a 1 element array."
+
+        if self.settings.structured_errors:
+            out_file.print("parse_state->error_position = CURRENT_TOKEN(parse_state).start;")
+            out_file.print("builtin_record_error(parse_state, {}, {}, {});".format(
+                structured_error.code,
+                structured_error.expected or "JS2C_NO_ERROR_VALUE",
+                structured_error.actual or "JS2C_NO_ERROR_VALUE",
+            ))
+            self.generate_error_path(out_file)
+        elif self.settings.lean_parser:
+            out_file.print("parse_state->error_position = CURRENT_TOKEN(parse_state).start;")
+        elif self.settings.cold_error_paths:
+            helper_name = self.error_helper_cache.try_get_cached(
+                log_message[0],
+                [ErrorArgument(argument.c_type, None) if isinstance(argument, ErrorArgument) else argument for argument in log_message[1:]],
+            )
+            out_file.print(
+                "{}({});".format(
+                    helper_name,
+                    ", ".join(["parse_state"] + [argument.expression for argument in log_message[1:] if isinstance(argument, ErrorArgument)])
+                )
+            )
         else:
-            assert len(log_message) > 1, "Use a simple string, not a 1 element array."
             out_file.print(
                 "LOG_ERROR(CURRENT_TOKEN(parse_state).start, \"{}\", {})"
                 .format(
                     log_message[0],
-                    ", ".join(log_message[1:]),
+                    ", ".join(argument.expression if isinstance(argument, ErrorArgument) else argument for argument in log_message[1:]),
                 )
             )
         out_file.print("return true;")
@@ -143,6 +315,7 @@ class CType():
         self.type_name = type_name
         self.description = description
         self.declaration_generated = False
+        self._fingerprint = None
 
     def __str__(self):
         return self.type_name
@@ -155,6 +328,23 @@ class CType():
             "{} {};".format(self.type_name, field_name), self.description
         )
 
+    PRIMITIVE_LAYOUTS = {
+        "bool": TypeLayout(1, 1, 0),
+        "double": TypeLayout(8, 8, 0),
+        "uint64_t": TypeLayout(8, 8, 0),
+        "int64_t": TypeLayout(8, 8, 0),
+        "uint32_t": TypeLayout(4, 4, 0),
+        "int32_t": TypeLayout(4, 4, 0),
+        "uint16_t": TypeLayout(2, 2, 0),
+        "int16_t": TypeLayout(2, 2, 0),
+        "uint8_t": TypeLayout(1, 1, 0),
+        "int8_t": TypeLayout(1, 1, 0),
+    }
+
+    def layout(self):
+        """ The estimated TypeLayout of the type, or None if it is unknown (e.g. a custom js2cType) """
+        return self.PRIMITIVE_LAYOUTS.get(self.type_name)
+
     def generate_type_declaration(self, out_file):
         if self.declaration_generated:
             return
@@ -165,9 +355,30 @@ class CType():
         # Simple types (e.g. uint64_t) should already be declared
         pass
 
+    def structure(self):
+        """ Everything besides the name that makes two types different. Member types are represented by their
+        fingerprints. """
+        return ()
+
+    @property
+    def fingerprint(self):
+        """ A digest of the whole structure of the type, computed only once.
+
+        Member types contribute only their own (already computed) fingerprints, so computing it for all types
+        is linear in the number of types, and comparing two types is O(1), regardless of their depth.
+        """
+        if self._fingerprint is None:
+            # Description deliberately left out. It will be the same type
+            # The main use-case is documenting a description differently on different
+            # parts of the JSON. The main result here will be a wrong docstring on the type,
+            # which is an OK trade-off.
+            self._fingerprint = hashlib.sha1(
+                repr((self.__class__.__name__, self.type_name, self.structure())).encode('utf-8')
+            ).hexdigest()
+        return self._fingerprint
+
     def __eq__(self, other):
-        # Description deliberately left out. It will be the same type
-        # The main use-case is documenting a description differently on different
-        # parts of the JSON. The main result here will be a wrong docstring on the type,
-        # which is an OK trade-off.
-        return self.__class__ == other.__class__ and self.type_name == other.type_name
+        return isinstance(other, CType) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
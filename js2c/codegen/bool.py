@@ -43,9 +43,13 @@ class BoolGenerator(Generator):
 
     def generate_parser_call(self, out_var_name, out_file):
         parser_call = "builtin_parse_bool(parse_state, {})".format(out_var_name)
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
             out_file.print("return true;")
 
+    def generate_validator_call(self, out_file):
+        out_file.print("bool bool_parse_tmp;")
+        self.generate_parser_call("&bool_parse_tmp", out_file)
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -59,5 +63,10 @@ class BoolGenerator(Generator):
             )
         )
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or self.default is None:
+            return None
+        return 'true' if self.default else 'false'
+
     def max_token_num(self):
         return 1
@@ -24,7 +24,8 @@
 #
 import re
 
-from .base import Generator, CType
+from .base import Generator, CType, TypeLayout
+from .error_helper_cache import StructuredError
 
 
 class EnumType(CType):
@@ -41,11 +42,12 @@ class EnumType(CType):
         out_file.print("}} {};".format(self.type_name))
         out_file.print("")
 
-    def __eq__(self, other):
-        return (
-            super().__eq__(other) and
-            self.enum_labels == other.enum_labels
-        )
+    def layout(self):
+        # Enums are ints on all common ABIs
+        return TypeLayout(4, 4, 0)
+
+    def structure(self):
+        return tuple(self.enum_labels)
 
 
 class EnumGenerator(Generator):
@@ -87,25 +89,52 @@ class EnumGenerator(Generator):
 
     def generate_parser_call(self, out_var_name, out_file):
         parser_call = "parse_{}(parse_state, {})".format(self.parser_name, out_var_name)
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
             out_file.print("return true;")
 
-    def generate_parser_bodies(self, out_file):
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.parser_name, self.c_type))
+    def generate_validator_call(self, out_file):
+        validator_call = "validate_{}(parse_state)".format(self.validator_name)
+        with self.error_if_block(validator_call, out_file):
+            out_file.print("return true;")
+
+    def generate_parser_body(self, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_STRING)", out_file):
+            out_file.print("return true;")
+
+        for enum_label in self.enum:
+            with out_file.if_block('current_string_is(parse_state, "{}")'.format(enum_label)):
+                out_file.print("*out = {};".format(self.convert_enum_label(enum_label)))
+            out_file.print("else")
         with out_file.code_block():
-            with out_file.if_block("check_type(parse_state, JSMN_STRING)"):
-                out_file.print("return true;")
-
-            for enum_label in self.enum:
-                with out_file.if_block('current_string_is(parse_state, "{}")'.format(enum_label)):
-                    out_file.print("*out = {};".format(self.convert_enum_label(enum_label)))
-                out_file.print("else")
-            with out_file.code_block():
-                self.generate_logged_error(["Unknown enum value in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"], out_file)
-
-            out_file.print("parse_state->current_token += 1;")
-            out_file.print("return false;")
-        out_file.print("")
+            self.generate_logged_error(
+                ["Unknown enum value in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"],
+                StructuredError("JS2C_ERROR_UNKNOWN_ENUM_VALUE"),
+                out_file
+            )
+
+        out_file.print("parse_state->current_token += 1;")
+        out_file.print("return false;")
+
+    def generate_parser_bodies(self, out_file):
+        self.generate_parser_function(self.generate_parser_body, out_file)
+
+    def generate_validator_body(self, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_STRING)", out_file):
+            out_file.print("return true;")
+
+        unknown_value = " && ".join('!current_string_is(parse_state, "{}")'.format(enum_label) for enum_label in self.enum)
+        with self.error_if_block(unknown_value, out_file):
+            self.generate_logged_error(
+                ["Unknown enum value in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"],
+                StructuredError("JS2C_ERROR_UNKNOWN_ENUM_VALUE"),
+                out_file
+            )
+
+        out_file.print("parse_state->current_token += 1;")
+        out_file.print("return false;")
+
+    def generate_validator_bodies(self, out_file):
+        self.generate_validator_function(self.generate_validator_body, out_file)
 
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
@@ -115,5 +144,10 @@ class EnumGenerator(Generator):
             return
         out_file.print("{} = {};".format(out_var_name, self.convert_enum_label(self.default)))
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or self.default is None:
+            return None
+        return self.convert_enum_label(self.default)
+
     def max_token_num(self):
         return 1
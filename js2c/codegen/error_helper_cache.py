@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from collections import namedtuple
+import hashlib
+
+
+# An argument of a logged error, which is a local variable (or expression) at the place of the error,
+# so it has to be passed to the out-of-line error helper as a parameter.
+ErrorArgument = namedtuple("ErrorArgument", ("c_type", "expression"))
+
+# The js2c_error_t form of a logged error, for structured errors. expected and actual are js2c_error_value_t
+# expressions (see error_value), or None if they are not set for the code.
+StructuredError = namedtuple("StructuredError", ("code", "expected", "actual"), defaults=(None, None))
+
+
+def error_value(member, expression):
+    """ A js2c_error_value_t expression, with the given member set """
+    return "JS2C_ERROR_VALUE({}, {})".format(member, expression)
+
+
+class ErrorHelperCache:
+    def __init__(self, stable_names=False):
+        """ With stable_names, helper names only depend on the message, not on the order they are needed in """
+        self.helpers = {}
+        self.stable_names = stable_names
+        # The schema paths of structured errors, indexed by their path ids
+        self.error_paths = []
+        self.error_path_ids = {}
+
+    def try_get_cached(self, log_message, arguments):
+        """ Return the name of the error helper logging this message, registering a new one if needed """
+        key = (log_message, tuple(arguments))
+        if key not in self.helpers:
+            if self.stable_names:
+                self.helpers[key] = "log_error_{}".format(hashlib.sha1(repr(key).encode()).hexdigest()[:12])
+            else:
+                self.helpers[key] = "log_error_{}".format(len(self.helpers))
+        return self.helpers[key]
+
+    def error_path_id(self, path):
+        """ The id of a schema path in the path table of structured errors, registering it if needed """
+        if path not in self.error_path_ids:
+            self.error_path_ids[path] = len(self.error_paths)
+            self.error_paths.append(path)
+        return self.error_path_ids[path]
+
+    @classmethod
+    def helper_parameters(cls, arguments):
+        """ Returns the parameter declarations and names of a helper, and the arguments of its LOG_ERROR """
+        parameters = ["const parse_state_t *parse_state"]
+        parameter_names = ["parse_state"]
+        log_arguments = []
+        for argument in arguments:
+            if isinstance(argument, ErrorArgument):
+                parameter_name = "arg{}".format(len(parameter_names) - 1)
+                parameters.append("{} {}".format(argument.c_type, parameter_name).replace("* ", "*"))
+                parameter_names.append(parameter_name)
+                log_arguments.append(parameter_name)
+            else:
+                log_arguments.append(argument)
+        return parameters, parameter_names, log_arguments
+
+    def helper_declarations(self):
+        """ Declarations of the helpers by name, for parsers split into several translation units """
+        declarations = {}
+        for (_, arguments), helper_name in self.helpers.items():
+            parameters, _, _ = self.helper_parameters(arguments)
+            declarations[helper_name] = "JS2C_INTERNAL JS2C_COLD void {}({});".format(helper_name, ", ".join(parameters))
+        return declarations
+
+    def generate_helpers(self, out_file, linkage="static"):
+        for (log_message, arguments), helper_name in self.helpers.items():
+            parameters, parameter_names, log_arguments = self.helper_parameters(arguments)
+            out_file.print("{} JS2C_COLD void {}({})".format(linkage, helper_name, ", ".join(parameters)))
+            with out_file.code_block():
+                # The parameters are unused if LOG_ERROR is not defined
+                for parameter_name in parameter_names:
+                    out_file.print("(void){};".format(parameter_name))
+                out_file.print(
+                    "LOG_ERROR(CURRENT_TOKEN(parse_state).start, \"{}\", {})"
+                    .format(log_message, ", ".join(log_arguments))
+                )
+            out_file.print("")
@@ -23,6 +23,7 @@
 # SOFTWARE.
 #
 from .base import Generator, CType
+from .error_helper_cache import ErrorArgument, StructuredError, error_value
 
 
 class FloatGenerator(Generator):
@@ -48,30 +49,36 @@ class FloatGenerator(Generator):
     def can_parse_schema(cls, schema):
         return schema.get('type') == 'number'
 
-    @classmethod
-    def generate_range_check(cls, check_number, out_var_name, check_operator, out_file):
+    def generate_range_check(self, check_number, out_var_name, check_operator, out_file):
         if check_number is None:
             return
-        with out_file.if_block("!((*{}) {} {})".format(out_var_name, check_operator, check_number)):
+        with self.error_if_block("!((*{}) {} {})".format(out_var_name, check_operator, check_number), out_file):
             # Roll back the token, as the value was not actually correct
             out_file.print("parse_state->current_token -= 1;")
-            cls.generate_logged_error(
+            self.generate_logged_error(
                 [
                     "Floating point value %.15g in '%s' out of range. It must be {} {}.".format(check_operator, check_number),
-                    "(*{})".format(out_var_name),
+                    ErrorArgument("double", "(*{})".format(out_var_name)),
                     "parse_state->current_key",
                 ],
+                StructuredError(
+                    "JS2C_ERROR_NUMBER_OUT_OF_RANGE", error_value("d", check_number), error_value("d", "*{}".format(out_var_name))
+                ),
                 out_file
             )
 
     def generate_parser_call(self, out_var_name, out_file):
-        with out_file.if_block("builtin_parse_double(parse_state, {})".format(out_var_name)):
+        with self.error_if_block("builtin_parse_double(parse_state, {})".format(out_var_name), out_file):
             out_file.print("return true;")
         self.generate_range_check(self.minimum, out_var_name, ">=", out_file)
         self.generate_range_check(self.maximum, out_var_name, "<=", out_file)
         self.generate_range_check(self.exclusiveMinimum, out_var_name, ">", out_file)
         self.generate_range_check(self.exclusiveMaximum, out_var_name, "<", out_file)
 
+    def generate_validator_call(self, out_file):
+        out_file.print("double float_parse_tmp;")
+        self.generate_parser_call("&float_parse_tmp", out_file)
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -80,5 +87,10 @@ class FloatGenerator(Generator):
             return
         out_file.print("{} = {};".format(out_var_name, self.default))
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or self.default is None:
+            return None
+        return "{}".format(self.default)
+
     def max_token_num(self):
         return 1
@@ -27,14 +27,17 @@ from .integer import IntegerGenerator, NumericStringGenerator, IntegerStringAnyO
 from .float import FloatGenerator
 from .bool import BoolGenerator
 from .object import ObjectGenerator
+from .map import MapGenerator
 from .string import StringGenerator
 from .enum import EnumGenerator
+from .one_of import OneOfGenerator
 from .base import SchemaError
 
 
 class GeneratorFactory:
     #pylint: disable=too-few-public-methods
     GENERATORS = [
+        OneOfGenerator,
         EnumGenerator,
         NumericStringGenerator,
         IntegerStringAnyOfGenerator,
@@ -42,6 +45,7 @@ class GeneratorFactory:
         IntegerGenerator,
         FloatGenerator,
         BoolGenerator,
+        MapGenerator,
         ObjectGenerator,
         ArrayGenerator,
     ]
@@ -55,7 +59,7 @@ class GeneratorFactory:
                 .format(schema)
             )
 
-        if 'type' not in schema and 'anyOf' not in schema:
+        if 'type' not in schema and 'anyOf' not in schema and 'oneOf' not in schema:
             raise SchemaError(parameters.path_in_schema, "Missing field: 'type'")
         for generator_class in cls.GENERATORS:
             if generator_class.can_parse_schema(schema):
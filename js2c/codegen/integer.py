@@ -25,6 +25,7 @@
 from abc import abstractmethod
 
 from .base import Generator, CType, SchemaError
+from .error_helper_cache import ErrorArgument, StructuredError, error_value
 
 
 class IntegerType(CType):
@@ -91,25 +92,37 @@ class IntegerGeneratorBase(Generator):
     def number_allowed(self):
         pass
 
-    @classmethod
-    def generate_range_check(cls, check_number, out_var_printf_macro, check_operator, out_file):
+    def structured_range_error(self, check_number):
+        """ The structured error of a value out of range, for the signedness of the parsed type """
+        if self.c_type.is_unsigned():
+            code, member = "JS2C_ERROR_UNSIGNED_OUT_OF_RANGE", "u"
+        else:
+            code, member = "JS2C_ERROR_INTEGER_OUT_OF_RANGE", "i"
+        return StructuredError(
+            code,
+            error_value(member, "{}{}".format(check_number, self.default_suffix)),
+            error_value(member, "int_parse_tmp"),
+        )
+
+    def generate_range_check(self, check_number, out_var_printf_macro, check_operator, out_file):
         # pylint: disable=too-many-arguments
         if check_number is None:
             return
-        with out_file.if_block("!(int_parse_tmp {} {})".format(check_operator, check_number)):
+        with self.error_if_block("!(int_parse_tmp {} {})".format(check_operator, check_number), out_file):
             # Roll back the token, as the value was not actually correct
             out_file.print("parse_state->current_token -= 1;")
-            cls.generate_logged_error(
+            self.generate_logged_error(
                 [
                     "Integer %\" {} \" in '%s' out of range. It must be {} {}."
                     .format(out_var_printf_macro, check_operator, check_number),
-                    "int_parse_tmp",
+                    ErrorArgument(self.parsed_type, "int_parse_tmp"),
                     "parse_state->current_key",
                 ],
+                self.structured_range_error(check_number),
                 out_file
             )
 
-    def generate_parser_call(self, out_var_name, out_file):
+    def generate_validator_call(self, out_file):
         out_file.print("{} int_parse_tmp;".format(self.parsed_type))
         parser_call = "{}(parse_state, {}, {}, {}, &int_parse_tmp)".format(
             self.parser_fn,
@@ -117,12 +130,15 @@ class IntegerGeneratorBase(Generator):
             'true' if self.string_allowed else 'false',
             self.radix
         )
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
             out_file.print("return true;")
         self.generate_range_check(self.minimum, self.parsed_type_printf_macro, ">=", out_file)
         self.generate_range_check(self.maximum, self.parsed_type_printf_macro, "<=", out_file)
         self.generate_range_check(self.exclusiveMinimum, self.parsed_type_printf_macro, ">", out_file)
         self.generate_range_check(self.exclusiveMaximum, self.parsed_type_printf_macro, "<", out_file)
+
+    def generate_parser_call(self, out_var_name, out_file):
+        self.generate_validator_call(out_file)
         out_file.print("*{} = int_parse_tmp;".format(out_var_name))
 
     def has_default_value(self):
@@ -133,6 +149,11 @@ class IntegerGeneratorBase(Generator):
             return
         out_file.print("{} = {}{};".format(out_var_name, self.default, self.default_suffix))
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or self.default is None:
+            return None
+        return "{}{}".format(self.default, self.default_suffix)
+
     def max_token_num(self):
         return 1
 
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import re
+
+from .base import Generator, CType, SchemaError, TypeLayout, struct_layout
+from .error_helper_cache import ErrorArgument, StructuredError, error_value
+
+
+class MapType(CType):
+    def __init__(self, type_name, description, value_type, max_key_length, max_properties):
+        super().__init__(type_name, description)
+        self.value_type = value_type
+        self.max_key_length = max_key_length
+        self.max_properties = max_properties
+        # Open addressing with linear probing, kept at most half full.
+        self.slot_num = 1
+        while self.slot_num < 2 * max_properties:
+            self.slot_num *= 2
+        self.slot_type = "uint16_t" if max_properties < 0xFFFF else "uint32_t"
+        self.accessors_generated = False
+
+    @property
+    def base_name(self):
+        return re.sub("_t$", "", self.type_name)
+
+    @property
+    def entry_type_name(self):
+        return self.base_name + "_entry_t"
+
+    def generate_type_declaration_impl(self, out_file):
+        self.value_type.generate_type_declaration(out_file)
+
+        out_file.print("typedef struct {}_s ".format(self.entry_type_name) + "{")
+        with out_file.indent():
+            out_file.print("char key[{}];".format(self.max_key_length + 1))
+            out_file.print("uint32_t key_length;")
+            self.value_type.generate_field_declaration("value", out_file)
+        out_file.print("}} {};".format(self.entry_type_name))
+        out_file.print("")
+
+        out_file.print("typedef struct {}_s ".format(self.type_name) + "{")
+        with out_file.indent():
+            out_file.print_with_docstring("uint64_t n;", "The number of entries in the map")
+            out_file.print_with_docstring(
+                "{} entries[{}];".format(self.entry_type_name, self.max_properties),
+                "The entries, in document order"
+            )
+            out_file.print_with_docstring(
+                "{} slots[{}];".format(self.slot_type, self.slot_num),
+                "Hash table of entry index + 1 values, 0 means empty"
+            )
+        out_file.print("}} {};".format(self.type_name))
+        out_file.print("")
+
+        out_file.print("/* Returns NULL if the key is not in the map */")
+        out_file.print("const {} *{}_get(const {} *map, const char *key, size_t key_length);".format(
+            self.value_type, self.base_name, self.type_name
+        ))
+        out_file.print("")
+        out_file.print("#define {}_FOREACH(map, entry) \\".format(self.base_name.upper()))
+        out_file.print("    for (const {0} *entry = (map)->entries; entry < (map)->entries + (map)->n; ++entry)".format(
+            self.entry_type_name
+        ))
+        out_file.print("")
+
+    def layout(self):
+        entry_layout = struct_layout([
+            (TypeLayout(1, 1, 0), self.max_key_length + 1),
+            (CType.PRIMITIVE_LAYOUTS["uint32_t"], 1),
+            (self.value_type.layout(), 1),
+        ])
+        return struct_layout([
+            (CType.PRIMITIVE_LAYOUTS["uint64_t"], 1),
+            (entry_layout, self.max_properties),
+            (CType.PRIMITIVE_LAYOUTS[self.slot_type], self.slot_num),
+        ])
+
+    def generate_accessors(self, out_file):
+        if self.accessors_generated:
+            return
+        self.accessors_generated = True
+        out_file.print("const {} *{}_get(const {} *map, const char *key, size_t key_length)".format(
+            self.value_type, self.base_name, self.type_name
+        ))
+        with out_file.code_block():
+            with out_file.if_block("key_length > {}".format(self.max_key_length)):
+                out_file.print("return NULL;")
+            out_file.print("uint32_t slot = builtin_hash_string(key, key_length) & {};".format(self.slot_num - 1))
+            with out_file.for_block("; map->slots[slot] != 0; slot = (slot + 1) & {}".format(self.slot_num - 1)):
+                out_file.print("const {} *entry = &map->entries[map->slots[slot] - 1];".format(self.entry_type_name))
+                with out_file.if_block("entry->key_length == key_length && memcmp(entry->key, key, key_length) == 0"):
+                    out_file.print("return &entry->value;")
+            out_file.print("return NULL;")
+        out_file.print("")
+
+    def structure(self):
+        return (self.value_type.fingerprint, self.max_key_length, self.max_properties)
+
+
+class MapGenerator(Generator):
+    """ Objects with arbitrary keys, described by an additionalProperties schema """
+    JSON_FIELDS = Generator.JSON_FIELDS + (
+        "minProperties",
+        "maxProperties",
+        "propertyNames",
+        "default",
+    )
+    minProperties = 0
+    maxProperties = None
+    propertyNames = None
+    default = None
+
+    def __init__(self, schema, parameters):
+        super().__init__(schema, parameters)
+        if schema.get('properties'):
+            raise SchemaError(self, "Objects with an additionalProperties schema can not have 'properties'")
+        if self.maxProperties is None or self.maxProperties < 1:
+            raise SchemaError(self, "Objects with an additionalProperties schema must have a positive 'maxProperties'")
+        property_names = self.propertyNames or {}
+        if 'maxLength' not in property_names:
+            raise SchemaError(self, "Objects with an additionalProperties schema must have 'propertyNames' with 'maxLength'")
+        if self.default not in (None, {}):
+            raise SchemaError(self, "Only empty default values are supported for maps")
+        self.min_key_length = property_names.get('minLength', 0)
+        self.max_key_length = property_names['maxLength']
+
+        self.value_generator = parameters.generator_factory.get_generator_for(
+            schema["additionalProperties"],
+            parameters.with_suffix("additionalProperties", self.type_name, "value"),
+        )
+        self.c_type = MapType(
+            self.type_name,
+            self.description,
+            self.value_generator.c_type,
+            self.max_key_length,
+            self.maxProperties,
+        )
+        self.c_type = parameters.type_cache.try_get_cached(self.c_type)
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return schema.get('type') == 'object' and isinstance(schema.get('additionalProperties'), dict)
+
+    def child_generators(self):
+        return [self.value_generator]
+
+    def generate_parser_call(self, out_var_name, out_file):
+        parser_call = "parse_{}(parse_state, {})".format(self.parser_name, out_var_name)
+        with self.error_if_block(parser_call, out_file):
+            out_file.print("return true;")
+
+    def generate_validator_call(self, out_file):
+        validator_call = "validate_{}(parse_state)".format(self.validator_name)
+        with self.error_if_block(validator_call, out_file):
+            out_file.print("return true;")
+
+    def generate_range_checks(self, out_file):
+        with self.error_if_block("n > {}".format(self.maxProperties), out_file):
+            self.generate_logged_error(
+                ["Too many keys in '%s'. Count: %i. Maximum: {}.".format(self.maxProperties), "parse_state->current_key", ErrorArgument("int", "n")],
+                StructuredError("JS2C_ERROR_MAP_TOO_LARGE", error_value("i", self.maxProperties), error_value("i", "n")),
+                out_file
+            )
+        if self.minProperties:
+            with self.error_if_block("n < {}".format(self.minProperties), out_file):
+                self.generate_logged_error(
+                    ["Too few keys in '%s'. Count: %i. Minimum: {}.".format(self.minProperties), "parse_state->current_key", ErrorArgument("int", "n")],
+                    StructuredError("JS2C_ERROR_MAP_TOO_SMALL", error_value("i", self.minProperties), error_value("i", "n")),
+                    out_file
+                )
+
+    def generate_map_start(self, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_OBJECT)", out_file):
+            out_file.print("return true;")
+        out_file.print("const int n = parse_state->tokens[parse_state->current_token].size;")
+        self.generate_range_checks(out_file)
+
+    def generate_key_check(self, out_file):
+        self.generate_key_children_check(out_file)
+        with self.error_if_block(
+            "builtin_check_current_string(parse_state, {}, {})".format(self.min_key_length, self.max_key_length),
+            out_file
+        ):
+            out_file.print("return true;")
+
+    def generate_parser_body(self, out_file):
+        slot_mask = self.c_type.slot_num - 1
+        self.generate_map_start(out_file)
+        out_file.print("memset(out->slots, 0, sizeof(out->slots));")
+        out_file.print("out->n = n;")
+        out_file.print("parse_state->current_token += 1;")
+        with out_file.for_block("int i = 0; i < n; ++i"):
+            self.generate_key_check(out_file)
+            # The key is inserted right away, the duplicate check is part of the probing
+            out_file.print("const char *key = CURRENT_STRING(parse_state);")
+            out_file.print("const uint32_t key_length = CURRENT_STRING_LENGTH(parse_state);")
+            out_file.print("uint32_t slot = builtin_hash_string(key, key_length) & {};".format(slot_mask))
+            with out_file.for_block("; out->slots[slot] != 0; slot = (slot + 1) & {}".format(slot_mask)):
+                out_file.print("const {} *entry = &out->entries[out->slots[slot] - 1];".format(self.c_type.entry_type_name))
+                with self.error_if_block("entry->key_length == key_length && memcmp(entry->key, key, key_length) == 0", out_file):
+                    out_file.print("builtin_log_duplicate_key(parse_state);")
+                    out_file.print("return true;")
+            out_file.print("out->slots[slot] = i + 1;")
+            out_file.print("memcpy(out->entries[i].key, key, key_length);")
+            out_file.print("out->entries[i].key[key_length] = '\\0';")
+            out_file.print("out->entries[i].key_length = key_length;")
+            out_file.print("parse_state->current_token += 1;")
+            self.value_generator.generate_parser_call("&out->entries[i].value", out_file)
+        out_file.print("return false;")
+
+    def generate_parser_bodies(self, out_file):
+        self.value_generator.generate_parser_bodies(out_file)
+        self.c_type.generate_accessors(out_file)
+
+        self.generate_parser_function(self.generate_parser_body, out_file)
+
+    def generate_validator_body(self, out_file):
+        self.generate_map_start(out_file)
+        out_file.print("uint32_t slots[{}] = {{0}};".format(self.c_type.slot_num))
+        out_file.print("parse_state->current_token += 1;")
+        with out_file.for_block("int i = 0; i < n; ++i"):
+            self.generate_key_check(out_file)
+            with self.error_if_block(
+                "builtin_check_duplicate_key_token(parse_state, slots, {})".format(self.c_type.slot_num - 1),
+                out_file
+            ):
+                out_file.print("return true;")
+            out_file.print("parse_state->current_token += 1;")
+            self.value_generator.generate_validator_call(out_file)
+        out_file.print("return false;")
+
+    def generate_validator_bodies(self, out_file):
+        self.value_generator.generate_validator_bodies(out_file)
+
+        self.generate_validator_function(self.generate_validator_body, out_file)
+
+    def has_default_value(self):
+        return super().has_default_value() or self.minProperties == 0
+
+    def generate_set_default_value(self, out_var_name, out_file):
+        if super().generate_set_default_value(out_var_name, out_file):
+            return
+        out_file.print("memset({0}.slots, 0, sizeof({0}.slots));".format(out_var_name))
+        out_file.print("{}.n = 0;".format(out_var_name))
+
+    def max_token_num(self):
+        return self.maxProperties * (1 + self.value_generator.max_token_num()) + 1
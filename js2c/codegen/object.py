@@ -24,14 +24,16 @@
 #
 import collections
 
-from .base import Generator, CType, SchemaError
+from .base import Generator, CType, SchemaError, struct_layout
+from .error_helper_cache import StructuredError, error_value
+from .type_cache import TypeCache
 
 
 class ObjectType(CType):
     def __init__(self, type_name, description, fields):
         super().__init__(type_name, description)
         assert isinstance(fields, collections.OrderedDict), \
-            "fields must be an OrderedDict, as we depend on the field order check of == in __eq__"
+            "fields must be an OrderedDict, as the field order is part of the structure of the type"
         self.fields = fields
 
     def generate_type_declaration_impl(self, out_file):
@@ -48,14 +50,17 @@ class ObjectType(CType):
         out_file.print("}} {};".format(self.type_name))
         out_file.print("")
 
-    def __eq__(self, other):
-        return (
-            super().__eq__(other) and
-            self.fields == other.fields
-        )
+    def layout(self):
+        return struct_layout([(field_type.layout(), 1) for field_type in self.fields.values()])
+
+    def structure(self):
+        return tuple((name, field_type.fingerprint) for name, field_type in self.fields.items())
 
 
 class ObjectGenerator(Generator):
+    # pylint: disable=too-many-public-methods
+    # The parser, validator and patcher of the objects share the field handling, so they are kept together
+
     JSON_FIELDS = Generator.JSON_FIELDS + (
         "required",
         "additionalProperties",
@@ -73,6 +78,14 @@ class ObjectGenerator(Generator):
                 field_schema,
                 parameters.with_suffix("properties." + field_name, self.type_name, field_name),
             )
+        # Fields removed by a projection. They are skipped during parsing, and are only needed for the token count.
+        self.skipped_fields = collections.OrderedDict()
+        for field_name, field_schema in schema.get('js2cSkippedProperties', {}).items():
+            self.skipped_fields[field_name] = parameters.generator_factory.get_generator_for(
+                field_schema,
+                parameters.with_suffix("properties." + field_name, self.type_name, field_name)._replace(type_cache=TypeCache()),
+            )
+        self.patcher_name = self.parser_name
         self.c_type = ObjectType(
             self.type_name,
             self.description,
@@ -91,22 +104,39 @@ class ObjectGenerator(Generator):
     def can_parse_schema(cls, schema):
         return schema.get('type') == 'object'
 
+    def child_generators(self):
+        return list(self.fields.values())
+
     def generate_parser_call(self, out_var_name, out_file):
         parser_call = "parse_{}(parse_state, {})".format(self.parser_name, out_var_name)
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
+            out_file.print("return true;")
+
+    def generate_validator_call(self, out_file):
+        validator_call = "validate_{}(parse_state)".format(self.validator_name)
+        with self.error_if_block(validator_call, out_file):
             out_file.print("return true;")
 
+    @classmethod
+    def generate_field_parser_call(cls, field_name, field_generator, out_file):
+        field_generator.generate_parser_call("&out->{}".format(field_name), out_file)
+
+    @classmethod
+    def generate_field_validator_call(cls, field_name, field_generator, out_file):
+        # pylint: disable=unused-argument
+        field_generator.generate_validator_call(out_file)
+
     def generate_seen_flags(self, out_file):
         for field_name in self.fields:
             out_file.print("bool seen_{} = false;".format(field_name))
 
-    def generate_default_field_setting(self, out_file):
+    def generate_default_field_setting(self, field_format, templated_fields, out_file):
         for field_name, field_generator in self.fields.items():
-            if not field_generator.has_default_value():
+            if not field_generator.has_default_value() or field_name in templated_fields:
                 continue
             with out_file.if_block("!seen_{}".format(field_name)):
                 field_generator.generate_set_default_value(
-                    "out->{}".format(field_name),
+                    field_format.format(field_name),
                     out_file
                 )
 
@@ -120,89 +150,250 @@ class ObjectGenerator(Generator):
                     "Field '{}' must be required or have a default value"
                     .format(field_name)
                 )
-            with out_file.if_block("!seen_{}".format(field_name)):
-                self.generate_logged_error("Missing required field in '%s': {}".format(field_name), out_file)
+            with self.error_if_block("!seen_{}".format(field_name), out_file):
+                self.generate_logged_error(
+                    "Missing required field in '%s': {}".format(field_name),
+                    StructuredError("JS2C_ERROR_MISSING_FIELD", error_value("s", '"{}"'.format(field_name))),
+                    out_file
+                )
 
-    def generate_key_children_check(self, out_file):
-        with out_file.if_block("CURRENT_TOKEN(parse_state).size > 1"):
+    def generate_field_parser(self, field_name, field_generator, generate_field_call, out_file):
+        with self.error_if_block("seen_{}".format(field_name), out_file):
             self.generate_logged_error(
-                [
-                    "Missing separator between values in '%s', after key: %.*s",
-                    "parse_state->current_key",
-                    "CURRENT_STRING_FOR_ERROR(parse_state)"
-                ],
+                "Duplicate field definition in '%s': {}".format(field_name),
+                StructuredError("JS2C_ERROR_DUPLICATE_FIELD", error_value("s", '"{}"'.format(field_name))),
                 out_file
             )
+        out_file.print("seen_{} = true;".format(field_name))
+        out_file.print("parse_state->current_token += 1;")
+        if not self.settings.lean_parser:
+            out_file.print("const char* saved_key = parse_state->current_key;")
+            out_file.print("parse_state->current_key = \"{}\";".format(field_name))
+        generate_field_call(field_name, field_generator, out_file)
+        if not self.settings.lean_parser:
+            out_file.print("parse_state->current_key = saved_key;")
 
-        with out_file.if_block("CURRENT_TOKEN(parse_state).size < 1"):
-            self.generate_logged_error(
-                [
-                    "Missing value in '%s', after key: %.*s",
-                    "parse_state->current_key",
-                    "CURRENT_STRING_FOR_ERROR(parse_state)"
-                ],
-                out_file
+    def generate_unknown_field_handling(self, out_file):
+        if self.skipped_fields:
+            skipped_field_check = " || ".join(
+                'current_string_is(parse_state, "{}")'.format(field_name) for field_name in self.skipped_fields
             )
-
-    def generate_field_parsers(self, out_file):
-        self.generate_key_children_check(out_file)
-        for field_name, field_generator in self.fields.items():
-            with out_file.if_block('current_string_is(parse_state, "{}")'.format(field_name)):
-                with out_file.if_block("seen_{}".format(field_name)):
-                    self.generate_logged_error("Duplicate field definition in '%s': {}".format(field_name), out_file)
-                out_file.print("seen_{} = true;".format(field_name))
+            with out_file.if_block(skipped_field_check):
                 out_file.print("parse_state->current_token += 1;")
-                out_file.print("const char* saved_key = parse_state->current_key;")
-                out_file.print("parse_state->current_key = \"{}\";".format(field_name))
-                field_generator.generate_parser_call(
-                    "&out->{}".format(field_name),
-                    out_file
-                )
-                out_file.print("parse_state->current_key = saved_key;")
+                out_file.print("builtin_skip(parse_state);")
             out_file.print("else")
         with out_file.code_block():
             if self.settings.allow_additional_properties:
                 out_file.print("parse_state->current_token += 1;")
                 out_file.print("builtin_skip(parse_state);")
             else:
-                self.generate_logged_error(["Unknown field in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"], out_file)
+                self.generate_logged_error(
+                    ["Unknown field in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"],
+                    StructuredError("JS2C_ERROR_UNKNOWN_FIELD"),
+                    out_file
+                )
+
+    def generate_field_parsers(self, generate_field_call, out_file):
+        self.generate_key_children_check(out_file)
+        if len(self.fields) < 2:
+            for field_name, field_generator in self.fields.items():
+                with out_file.if_block('current_string_is(parse_state, "{}")'.format(field_name)):
+                    self.generate_field_parser(field_name, field_generator, generate_field_call, out_file)
+                out_file.print("else")
+            self.generate_unknown_field_handling(out_file)
+            return
+
+        # Most documents have their fields in schema order, so the field after the previous one is tried
+        # first, with a single string compare. The whole list is only searched if that guess was wrong.
+        out_file.print("int field_index = -1;")
+        out_file.print("switch (next_field_index)")
+        with out_file.code_block():
+            for field_index, field_name in enumerate(self.fields):
+                out_file.print("case {}:".format(field_index))
+                with out_file.indent():
+                    with out_file.if_block('current_string_is(parse_state, "{}")'.format(field_name)):
+                        out_file.print("field_index = {};".format(field_index))
+                    out_file.print("break;")
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print("break;")
+        with out_file.if_block("field_index < 0"):
+            for field_index, field_name in enumerate(self.fields):
+                if field_index:
+                    out_file.print("else")
+                with out_file.if_block('current_string_is(parse_state, "{}")'.format(field_name)):
+                    out_file.print("field_index = {};".format(field_index))
+
+        out_file.print("switch (field_index)")
+        with out_file.code_block():
+            for field_index, (field_name, field_generator) in enumerate(self.fields.items()):
+                out_file.print("case {}:".format(field_index))
+                with out_file.code_block():
+                    self.generate_field_parser(field_name, field_generator, generate_field_call, out_file)
+                    out_file.print("next_field_index = {};".format(field_index + 1))
+                    out_file.print("break;")
+            out_file.print("default:")
+            self.generate_unknown_field_handling(out_file)
+
+    def generate_object_body(
+        self, generate_field_call, set_defaults, check_required, out_file, *, field_format="out->{}", templated_fields=()
+    ):
+        """ field_format is the expression of an output field, for setting the defaults. The defaults of
+        templated_fields are not set, as they were already copied from a template. """
+        # pylint: disable=too-many-arguments
+        with self.error_if_block("check_type(parse_state, JSMN_OBJECT)", out_file):
+            out_file.print("return true;")
+
+        self.generate_seen_flags(out_file)
+
+        out_file.print("const int object_start_token = parse_state->current_token;")
+        out_file.print("const uint64_t n = parse_state->tokens[parse_state->current_token].size;")
+        out_file.print("parse_state->current_token += 1;")
+        if len(self.fields) > 1:
+            out_file.print("int next_field_index = 0;")
+        with out_file.for_block("uint64_t i = 0; i < n; ++i"):
+            self.generate_field_parsers(generate_field_call, out_file)
+
+        if not check_required:
+            out_file.print("(void)object_start_token;")
+            out_file.print("return false;")
+            return
+
+        # This little magic is needed because both required checks and default setting
+        # use CURRENT_TOKEN, which may be past the token list by now, and also we want
+        # to report the issue at the start of the object.
+        out_file.print("const int saved_current_token = parse_state->current_token;")
+        out_file.print("parse_state->current_token = object_start_token;")
+
+        self.generate_required_checks(out_file)
+        if set_defaults:
+            self.generate_default_field_setting(field_format, templated_fields, out_file)
+
+        out_file.print("parse_state->current_token = saved_current_token;")
+
+        out_file.print("return false;")
+
+    def template_default_initializers(self):
+        """ The initializers of the fields, whose defaults can be copied from a static template.
+
+        The template is a whole struct, which is stored in .rodata and copied on every parse, so it is only used
+        if the fields with constant defaults make up most of the struct. Otherwise all defaults are set by code.
+        """
+        initializers = collections.OrderedDict()
+        templated_size = 0
+        for field_name, field_generator in self.fields.items():
+            if field_generator.has_default_value():
+                initializer = field_generator.default_initializer()
+                field_layout = field_generator.c_type.layout()
+                if initializer is not None and field_layout is not None:
+                    initializers[field_name] = initializer
+                    templated_size += field_layout.size
+        object_layout = self.c_type.layout()
+        if object_layout is None or templated_size * 2 < object_layout.size:
+            return collections.OrderedDict()
+        return initializers
+
+    def generate_parser_body(self, out_file):
+        if not self.fields:
+            # e.g. a oneOf variant with only the discriminator field
+            out_file.print("(void)out;")
+        initializers = self.template_default_initializers()
+        if initializers:
+            # All the constant defaults are copied at once, and overwritten by the fields that are present.
+            # This is cheaper than checking and setting every missing field after parsing.
+            out_file.print("static const {} defaults = {{".format(self.c_type))
+            with out_file.indent():
+                for field_name, initializer in initializers.items():
+                    if initializer != "{0}":
+                        out_file.print(".{} = {},".format(field_name, initializer))
+            out_file.print("};")
+            out_file.print("memcpy(out, &defaults, sizeof(defaults));")
+        self.generate_object_body(self.generate_field_parser_call, True, True, out_file, templated_fields=initializers)
 
     def generate_parser_bodies(self, out_file):
         for field_generator in self.fields.values():
             field_generator.generate_parser_bodies(out_file)
 
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.parser_name, self.c_type))
-        with out_file.code_block():
-            with out_file.if_block("check_type(parse_state, JSMN_OBJECT)"):
-                out_file.print("return true;")
+        self.generate_parser_function(self.generate_parser_body, out_file)
+
+    def generate_validator_body(self, out_file):
+        self.generate_object_body(self.generate_field_validator_call, False, True, out_file)
 
-            self.generate_seen_flags(out_file)
+    def generate_validator_bodies(self, out_file):
+        for field_generator in self.fields.values():
+            field_generator.generate_validator_bodies(out_file)
 
-            out_file.print("const int object_start_token = parse_state->current_token;")
-            out_file.print("const uint64_t n = parse_state->tokens[parse_state->current_token].size;")
-            out_file.print("parse_state->current_token += 1;")
-            with out_file.for_block("uint64_t i = 0; i < n; ++i"):
-                self.generate_field_parsers(out_file)
+        self.generate_validator_function(self.generate_validator_body, out_file)
 
-            # This little magic is needed because both required checks and default setting
-            # use CURRENT_TOKEN, which may be past the token list by now, and also we want
-            # to report the issue at the start of the object.
-            out_file.print("const int saved_current_token = parse_state->current_token;")
-            out_file.print("parse_state->current_token = object_start_token;")
+    def generate_patcher_call(self, out_var_name, changed_fields_var_name, out_file):
+        patcher_call = "patch_{}(parse_state, {}, {})".format(self.patcher_name, out_var_name, changed_fields_var_name)
+        with self.error_if_block(patcher_call, out_file):
+            out_file.print("return true;")
 
-            self.generate_required_checks(out_file)
-            self.generate_default_field_setting(out_file)
+    def generate_field_patcher_call(self, field_name, field_generator, out_file):
+        """ RFC 7386 merge patch: null resets the field, objects are patched, everything else is replaced """
+        with out_file.if_block("current_token_is_null(parse_state)"):
+            if field_generator.has_default_value():
+                out_file.print("parse_state->current_token += 1;")
+                field_generator.generate_set_default_value("out->{}".format(field_name), out_file)
+            else:
+                self.generate_logged_error(
+                    "Field '%s' is required, it can not be removed",
+                    StructuredError("JS2C_ERROR_REQUIRED_FIELD_REMOVED", error_value("s", '"{}"'.format(field_name))),
+                    out_file
+                )
+        out_file.print("else")
+        with out_file.code_block():
+            if isinstance(field_generator, ObjectGenerator):
+                out_file.print("uint64_t nested_changed_fields = 0;")
+                field_generator.generate_patcher_call("&out->{}".format(field_name), "&nested_changed_fields", out_file)
+            else:
+                field_generator.generate_parser_call("&out->{}".format(field_name), out_file)
+        field_index = list(self.fields).index(field_name)
+        if field_index < 64:
+            out_file.print("*changed_fields |= UINT64_C(1) << {};".format(field_index))
 
-            out_file.print("parse_state->current_token = saved_current_token;")
+    def generate_patcher_body(self, out_file):
+        if not self.fields:
+            out_file.print("(void)out;")
+            out_file.print("(void)changed_fields;")
+        self.generate_object_body(self.generate_field_patcher_call, False, False, out_file)
 
-            out_file.print("return false;")
-        out_file.print("")
+    def generate_patcher_bodies(self, out_file):
+        """ Generate the patch_ function, which only touches the fields present in the document """
+        for field_generator in self.fields.values():
+            if isinstance(field_generator, ObjectGenerator):
+                field_generator.generate_patcher_bodies(out_file)
+
+        self.generate_patcher_function(out_file)
+
+    def generate_patcher_function(self, out_file):
+        self.patcher_name = self.generate_deduplicated_function(
+            "static bool patch_{{}}(parse_state_t *parse_state, {} *out, uint64_t *changed_fields)".format(self.c_type),
+            self.patcher_name,
+            self.generate_patcher_body,
+            out_file
+        )
 
     def has_default_value(self):
         if super().has_default_value():
             return True
         return len(self.required) == 0 and all(field_generator.has_default_value() for field_generator in self.fields.values())
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or not self.has_default_value():
+            return None
+        initializers = []
+        for field_name, field_generator in self.fields.items():
+            initializer = field_generator.default_initializer()
+            if initializer is None:
+                return None
+            if initializer != "{0}":
+                initializers.append(".{} = {}".format(field_name, initializer))
+        if not initializers:
+            return "{0}"
+        return "{{{}}}".format(", ".join(initializers))
+
     def generate_set_default_value(self, out_var_name, out_file):
         if super().generate_set_default_value(out_var_name, out_file):
             return
@@ -213,4 +404,5 @@ class ObjectGenerator(Generator):
             )
 
     def max_token_num(self):
-        return sum(1 + field_generator.max_token_num() for field_generator in self.fields.values()) + 1
+        all_fields = list(self.fields.values()) + list(self.skipped_fields.values())
+        return sum(1 + field_generator.max_token_num() for field_generator in all_fields) + 1
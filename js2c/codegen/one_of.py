@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import collections
+
+from .base import Generator, CType, SchemaError, TypeLayout, struct_layout
+from .enum import EnumGenerator
+from .error_helper_cache import StructuredError, error_value
+
+
+class TaggedUnionType(CType):
+    def __init__(self, type_name, description, tag_type, variants):
+        super().__init__(type_name, description)
+        assert isinstance(variants, collections.OrderedDict), \
+            "variants must be an OrderedDict, as the variant order is part of the structure of the type"
+        self.tag_type = tag_type
+        self.variants = variants
+
+    def generate_type_declaration_impl(self, out_file):
+        self.tag_type.generate_type_declaration(out_file)
+        for variant_type in self.variants.values():
+            variant_type.generate_type_declaration(out_file)
+
+        out_file.print("typedef struct {}_s ".format(self.type_name) + "{")
+        with out_file.indent():
+            out_file.print_with_docstring("{} tag;".format(self.tag_type), "Selects the valid member of value")
+            out_file.print("union {")
+            with out_file.indent():
+                for member_name, variant_type in self.variants.items():
+                    variant_type.generate_field_declaration(member_name, out_file)
+            out_file.print("} value;")
+        out_file.print("}} {};".format(self.type_name))
+        out_file.print("")
+
+    def layout(self):
+        variant_layouts = [variant_type.layout() for variant_type in self.variants.values()]
+        if not variant_layouts or None in variant_layouts:
+            return None
+        # The union is as large as its largest member. The bytes not used by that member are padding.
+        largest = max(variant_layouts, key=lambda variant_layout: variant_layout.size)
+        union_layout = TypeLayout(
+            largest.size,
+            max(variant_layout.alignment for variant_layout in variant_layouts),
+            largest.padding,
+        )
+        union_layout = struct_layout([(union_layout, 1)])
+        return struct_layout([(self.tag_type.layout(), 1), (union_layout, 1)])
+
+    def structure(self):
+        return (
+            self.tag_type.fingerprint,
+            tuple((name, variant_type.fingerprint) for name, variant_type in self.variants.items()),
+        )
+
+
+class OneOfGenerator(Generator):
+    """ Tagged union of objects, told apart by a discriminator field with a constant value in each variant """
+    JSON_FIELDS = Generator.JSON_FIELDS + (
+        "oneOf",
+        "discriminator",
+    )
+    oneOf = ()
+    discriminator = None
+
+    def __init__(self, schema, parameters):
+        super().__init__(schema, parameters)
+        if not self.oneOf:
+            raise SchemaError(self, "'oneOf' must be a non-empty list")
+        self.discriminator_name = self.find_discriminator_name()
+        self.tag_values = [self.get_tag_value(variant_schema) for variant_schema in self.oneOf]
+        if len(set(self.tag_values)) != len(self.tag_values):
+            raise SchemaError(self, "Discriminator values must be unique in 'oneOf'")
+
+        self.tag_generator = EnumGenerator(
+            {"type": "string", "enum": self.tag_values},
+            parameters.with_suffix("discriminator", self.type_name, "tag"),
+        )
+        tag_prefix_length = len(self.tag_generator.convert_enum_label(""))
+        self.variants = collections.OrderedDict()
+        for index, (tag_value, variant_schema) in enumerate(zip(self.tag_values, self.oneOf)):
+            member_name = self.tag_generator.convert_enum_label(tag_value)[tag_prefix_length:].lower()
+            if member_name in self.variants or not member_name or member_name[0].isdigit():
+                raise SchemaError(self, "Could not create a C name for discriminator value '{}'".format(tag_value))
+            self.variants[member_name] = parameters.generator_factory.get_generator_for(
+                self.with_tag_field(variant_schema),
+                parameters.with_suffix("oneOf.{}".format(index), self.type_name, member_name),
+            )
+
+        self.c_type = TaggedUnionType(
+            self.type_name,
+            self.description,
+            self.tag_generator.c_type,
+            collections.OrderedDict((k, v.c_type) for k, v in self.variants.items())
+        )
+        self.c_type = parameters.type_cache.try_get_cached(self.c_type)
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return 'oneOf' in schema
+
+    def child_generators(self):
+        return list(self.variants.values())
+
+    @classmethod
+    def get_constant_value(cls, field_schema):
+        if 'const' in field_schema:
+            return field_schema['const']
+        if len(field_schema.get('enum', ())) == 1:
+            return field_schema['enum'][0]
+        return None
+
+    def find_discriminator_name(self):
+        if self.discriminator is not None:
+            if 'propertyName' not in self.discriminator:
+                raise SchemaError(self, "Missing field for discriminator: 'propertyName'")
+            return self.discriminator['propertyName']
+
+        candidates = None
+        for variant_schema in self.oneOf:
+            constant_fields = set(
+                field_name for field_name, field_schema in variant_schema.get('properties', {}).items()
+                if isinstance(self.get_constant_value(field_schema), str)
+            )
+            candidates = constant_fields if candidates is None else candidates & constant_fields
+        if len(candidates) != 1:
+            raise SchemaError(
+                self,
+                "Could not find the discriminator field of 'oneOf'. Use 'discriminator': {'propertyName': ...}"
+            )
+        return candidates.pop()
+
+    def get_tag_value(self, variant_schema):
+        if variant_schema.get('type') != 'object':
+            raise SchemaError(self, "All 'oneOf' variants must be objects")
+        field_schema = variant_schema.get('properties', {}).get(self.discriminator_name)
+        tag_value = None if field_schema is None else self.get_constant_value(field_schema)
+        if not isinstance(tag_value, str):
+            raise SchemaError(
+                self,
+                "All 'oneOf' variants must have a constant string field '{}'".format(self.discriminator_name)
+            )
+        return tag_value
+
+    def with_tag_field(self, variant_schema):
+        """ The discriminator is checked before dispatching, but it stays a field of the variant, a single value
+        enum, so that a second occurrence is a duplicate field, like in any other object """
+        result = dict(variant_schema)
+        result['properties'] = collections.OrderedDict(variant_schema['properties'])
+        result['properties'][self.discriminator_name] = {"type": "string", "enum": [self.get_tag_value(variant_schema)]}
+        return result
+
+    def generate_parser_call(self, out_var_name, out_file):
+        parser_call = "parse_{}(parse_state, {})".format(self.parser_name, out_var_name)
+        with self.error_if_block(parser_call, out_file):
+            out_file.print("return true;")
+
+    def generate_validator_call(self, out_file):
+        validator_call = "validate_{}(parse_state)".format(self.validator_name)
+        with self.error_if_block(validator_call, out_file):
+            out_file.print("return true;")
+
+    @classmethod
+    def generate_variant_parser_call(cls, member_name, variant_generator, out_file):
+        variant_generator.generate_parser_call("&out->value.{}".format(member_name), out_file)
+
+    @classmethod
+    def generate_variant_validator_call(cls, member_name, variant_generator, out_file):
+        # pylint: disable=unused-argument
+        variant_generator.generate_validator_call(out_file)
+
+    def generate_union_body(self, generate_variant_call, set_tag, out_file):
+        with self.error_if_block("check_type(parse_state, JSMN_OBJECT)", out_file):
+            out_file.print("return true;")
+
+        # Only the discriminator's value is looked at first, so that exactly one variant parser is run
+        out_file.print("const uint64_t object_token = parse_state->current_token;")
+        with self.error_if_block('builtin_find_field(parse_state, "{}")'.format(self.discriminator_name), out_file):
+            out_file.print("parse_state->current_token = object_token;")
+            self.generate_logged_error(
+                "Missing discriminator field in '%s': {}".format(self.discriminator_name),
+                StructuredError("JS2C_ERROR_MISSING_DISCRIMINATOR", error_value("s", '"{}"'.format(self.discriminator_name))),
+                out_file
+            )
+        with self.error_if_block("check_type(parse_state, JSMN_STRING)", out_file):
+            out_file.print("return true;")
+
+        variants_by_length = collections.OrderedDict()
+        for tag_value, (member_name, variant_generator) in zip(self.tag_values, self.variants.items()):
+            variants_by_length.setdefault(len(tag_value.encode('utf-8')), []).append((tag_value, member_name, variant_generator))
+
+        out_file.print("switch (CURRENT_TOKEN(parse_state).end - CURRENT_TOKEN(parse_state).start)")
+        with out_file.code_block():
+            for length, variants in variants_by_length.items():
+                out_file.print("case {}:".format(length))
+                with out_file.indent():
+                    for tag_value, member_name, variant_generator in variants:
+                        with out_file.if_block('current_string_is(parse_state, "{}")'.format(tag_value)):
+                            if set_tag:
+                                out_file.print("out->tag = {};".format(self.tag_generator.convert_enum_label(tag_value)))
+                            out_file.print("parse_state->current_token = object_token;")
+                            generate_variant_call(member_name, variant_generator, out_file)
+                            out_file.print("return false;")
+                    out_file.print("break;")
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print("break;")
+        self.generate_logged_error(
+            ["Unknown discriminator value in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"],
+            StructuredError("JS2C_ERROR_UNKNOWN_DISCRIMINATOR"),
+            out_file
+        )
+
+    def generate_parser_body(self, out_file):
+        self.generate_union_body(self.generate_variant_parser_call, True, out_file)
+
+    def generate_parser_bodies(self, out_file):
+        for variant_generator in self.variants.values():
+            variant_generator.generate_parser_bodies(out_file)
+
+        self.generate_parser_function(self.generate_parser_body, out_file)
+
+    def generate_validator_body(self, out_file):
+        self.generate_union_body(self.generate_variant_validator_call, False, out_file)
+
+    def generate_validator_bodies(self, out_file):
+        for variant_generator in self.variants.values():
+            variant_generator.generate_validator_bodies(out_file)
+
+        self.generate_validator_function(self.generate_validator_body, out_file)
+
+    def max_token_num(self):
+        return max(variant_generator.max_token_num() for variant_generator in self.variants.values())
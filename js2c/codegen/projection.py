@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from .base import SchemaError
+
+
+def parse_json_pointer(pointer):
+    """ Split a JSON pointer (RFC 6901) into its unescaped reference tokens """
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise SchemaError("", "Invalid JSON pointer in projection: '{}'. It must start with a '/'".format(pointer))
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def build_selection_tree(pointers):
+    """ Merge the pointers into a tree of dicts keyed by field name. None means the whole subtree is selected. """
+    tree = {}
+    for pointer in pointers:
+        parts = parse_json_pointer(pointer)
+        if not parts:
+            return None
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def strip_ids(schema):
+    """ Copy the schema without the $id fields, so that types are named after the projection, not the original schema """
+    if isinstance(schema, dict):
+        return {k: strip_ids(v) for k, v in schema.items() if k != "$id"}
+    if isinstance(schema, list):
+        return [strip_ids(v) for v in schema]
+    return schema
+
+
+def project_subschema(schema, selection, path):
+    if selection is None:
+        return strip_ids(schema)
+
+    if schema.get('type') == 'array' and 'items' in schema:
+        result = {k: v for k, v in schema.items() if k not in ('$id', 'items')}
+        result['items'] = project_subschema(schema['items'], selection, path)
+        return result
+
+    if schema.get('type') != 'object' or 'properties' not in schema:
+        raise SchemaError(path, "Projection selects fields of a non-object: {}".format(", ".join(selection)))
+
+    for field_name in selection:
+        if field_name not in schema['properties']:
+            raise SchemaError(path, "Projection selects nonexistent field: '{}'".format(field_name))
+
+    result = {k: v for k, v in schema.items() if k not in ('$id', 'properties', 'required')}
+    result['properties'] = {}
+    result['js2cSkippedProperties'] = {}
+    for field_name, field_schema in schema['properties'].items():
+        if field_name in selection:
+            result['properties'][field_name] = project_subschema(
+                field_schema,
+                selection[field_name],
+                path + ".properties." + field_name
+            )
+        else:
+            result['js2cSkippedProperties'][field_name] = field_schema
+    result['required'] = [field_name for field_name in schema.get('required', ()) if field_name in selection]
+    return result
+
+
+def project_schema(schema, pointers, projection_name):
+    """ Create a schema that only contains the fields selected by the JSON pointers.
+
+    Pointers are resolved against the described document, not the schema: object fields are selected by name,
+    and arrays are transparent, i.e. "/foo/bar" selects the field bar in all elements of the array foo.
+    The remaining fields are moved to js2cSkippedProperties, which are skipped without validation.
+    """
+    result = project_subschema(schema, build_selection_tree(pointers), "")
+    result['$id'] = projection_name or schema['$id']
+    return result
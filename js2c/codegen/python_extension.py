@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import io
+import os
+import re
+
+from .code_block_printer import CodeBlockPrinter
+from .base import SchemaError
+from .array import ArrayGenerator
+from .bool import BoolGenerator
+from .enum import EnumGenerator
+from .float import FloatGenerator
+from .integer import IntegerGeneratorBase
+from .map import MapGenerator
+from .object import ObjectGenerator
+from .one_of import OneOfGenerator
+from .string import StringGenerator
+
+
+EXTENSION_PRELUDE = """
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <stdarg.h>
+#include <stddef.h>
+#include <stdio.h>
+#include <string.h>
+
+#if defined(_MSC_VER)
+#define JS2C_THREAD_LOCAL __declspec(thread)
+#else
+#define JS2C_THREAD_LOCAL _Thread_local
+#endif
+
+typedef struct python_parse_error_s {
+    int position;
+    char message[512];
+} python_parse_error_t;
+
+/* Parsing runs without the GIL, possibly on many threads at once */
+static JS2C_THREAD_LOCAL python_parse_error_t last_parse_error;
+
+static void record_parse_error(int position, const char *format, ...) {
+    va_list args;
+    va_start(args, format);
+    last_parse_error.position = position;
+    vsnprintf(last_parse_error.message, sizeof(last_parse_error.message), format, args);
+    va_end(args);
+}
+
+#define LOG_ERROR(position, ...) record_parse_error((position), __VA_ARGS__);
+"""
+
+EXTENSION_HELPERS = """
+static PyObject *parse_error_type;
+
+static void raise_parse_error(const python_parse_error_t *error, Py_ssize_t index) {
+    PyObject *exception = PyObject_CallFunction(parse_error_type, "s", error->message);
+    if (exception == NULL) {
+        return;
+    }
+    PyObject *position = PyLong_FromLong(error->position);
+    PyObject *index_object = Py_None;
+    if (index >= 0) {
+        index_object = PyLong_FromSsize_t(index);
+    } else {
+        Py_INCREF(Py_None);
+    }
+    if (position != NULL && index_object != NULL &&
+        PyObject_SetAttrString(exception, "position", position) == 0 &&
+        PyObject_SetAttrString(exception, "index", index_object) == 0) {
+        PyErr_SetObject(parse_error_type, exception);
+    }
+    Py_XDECREF(position);
+    Py_XDECREF(index_object);
+    Py_DECREF(exception);
+}
+
+/* Steals the reference to value. Returns true on error. */
+static inline bool set_dict_item(PyObject *dict, const char *key, PyObject *value) {
+    if (value == NULL) {
+        return true;
+    }
+    const int result = PyDict_SetItemString(dict, key, value);
+    Py_DECREF(value);
+    return result != 0;
+}
+
+static inline uint32_t hex_escape_value(const char *digits) {
+    uint32_t value = 0;
+    for (int i = 0; i < 4; ++i) {
+        const char c = digits[i];
+        value = value * 16 + (uint32_t)(c <= '9' ? c - '0' : (c | 0x20) - 'a' + 10);
+    }
+    return value;
+}
+
+static inline size_t encode_utf8(uint32_t code_point, char *out) {
+    if (code_point < 0x80) {
+        out[0] = (char)code_point;
+        return 1;
+    }
+    if (code_point < 0x800) {
+        out[0] = (char)(0xC0 | (code_point >> 6));
+        out[1] = (char)(0x80 | (code_point & 0x3F));
+        return 2;
+    }
+    if (code_point < 0x10000) {
+        out[0] = (char)(0xE0 | (code_point >> 12));
+        out[1] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+        out[2] = (char)(0x80 | (code_point & 0x3F));
+        return 3;
+    }
+    out[0] = (char)(0xF0 | (code_point >> 18));
+    out[1] = (char)(0x80 | ((code_point >> 12) & 0x3F));
+    out[2] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+    out[3] = (char)(0x80 | (code_point & 0x3F));
+    return 4;
+}
+
+/* Strings are stored with their JSON escapes (already validated by the tokenizer), they are decoded here, so
+ * that the results match json.loads. Like json.loads, unpaired \\u surrogates are kept as they are. */
+static PyObject *string_from_json(const char *json, size_t length) {
+    if (memchr(json, '\\\\', length) == NULL) {
+        return PyUnicode_DecodeUTF8(json, length, "surrogatepass");
+    }
+    /* Every escape is at least as long as its UTF-8 encoding */
+    char *decoded = PyMem_Malloc(length);
+    if (decoded == NULL) {
+        return PyErr_NoMemory();
+    }
+    size_t decoded_length = 0;
+    for (size_t i = 0; i < length; ++i) {
+        if (json[i] != '\\\\' || i + 1 == length) {
+            decoded[decoded_length++] = json[i];
+            continue;
+        }
+        i += 1;
+        switch (json[i]) {
+        case 'b': decoded[decoded_length++] = '\\b'; break;
+        case 'f': decoded[decoded_length++] = '\\f'; break;
+        case 'n': decoded[decoded_length++] = '\\n'; break;
+        case 'r': decoded[decoded_length++] = '\\r'; break;
+        case 't': decoded[decoded_length++] = '\\t'; break;
+        case 'u':
+            if (i + 4 < length) {
+                uint32_t code_point = hex_escape_value(json + i + 1);
+                i += 4;
+                if (code_point >= 0xD800 && code_point < 0xDC00 && i + 6 < length && json[i + 1] == '\\\\' && json[i + 2] == 'u') {
+                    const uint32_t low = hex_escape_value(json + i + 3);
+                    if (low >= 0xDC00 && low < 0xE000) {
+                        code_point = 0x10000 + ((code_point - 0xD800) << 10) + (low - 0xDC00);
+                        i += 6;
+                    }
+                }
+                decoded_length += encode_utf8(code_point, decoded + decoded_length);
+                break;
+            }
+            /* fall through */
+        default:
+            /* \\", \\\\ and \\/ */
+            decoded[decoded_length++] = json[i];
+        }
+    }
+    PyObject *result = PyUnicode_DecodeUTF8(decoded, decoded_length, "surrogatepass");
+    PyMem_Free(decoded);
+    return result;
+}
+
+/* The description of a struct type, which can be passed to numpy.dtype(). Steals the references to formats. */
+static inline PyObject *dtype_struct(Py_ssize_t n, const char *const *names, PyObject **formats, const size_t *offsets, size_t itemsize) {
+    PyObject *names_list = PyList_New(n);
+    PyObject *formats_list = PyList_New(n);
+    PyObject *offsets_list = PyList_New(n);
+    bool failed = names_list == NULL || formats_list == NULL || offsets_list == NULL;
+    for (Py_ssize_t i = 0; i < n; ++i) {
+        if (failed || formats[i] == NULL) {
+            Py_XDECREF(formats[i]);
+            failed = true;
+            continue;
+        }
+        PyList_SET_ITEM(formats_list, i, formats[i]);
+        PyObject *name = PyUnicode_FromString(names[i]);
+        PyObject *offset = PyLong_FromSize_t(offsets[i]);
+        if (name == NULL || offset == NULL) {
+            Py_XDECREF(name);
+            Py_XDECREF(offset);
+            failed = true;
+            continue;
+        }
+        PyList_SET_ITEM(names_list, i, name);
+        PyList_SET_ITEM(offsets_list, i, offset);
+    }
+    PyObject *result = NULL;
+    if (!failed) {
+        result = Py_BuildValue(
+            "{sOsOsOsn}",
+            "names", names_list,
+            "formats", formats_list,
+            "offsets", offsets_list,
+            "itemsize", (Py_ssize_t)itemsize
+        );
+    }
+    Py_XDECREF(names_list);
+    Py_XDECREF(formats_list);
+    Py_XDECREF(offsets_list);
+    return result;
+}
+
+/* Borrows a NUL terminated UTF-8 view of a str or bytes object. Returns NULL with an exception set on error. */
+static const char *get_document(PyObject *document) {
+    const char *json_string;
+    Py_ssize_t json_length;
+    if (PyBytes_Check(document)) {
+        json_string = PyBytes_AS_STRING(document);
+        json_length = PyBytes_GET_SIZE(document);
+    } else if (PyUnicode_Check(document)) {
+        json_string = PyUnicode_AsUTF8AndSize(document, &json_length);
+        if (json_string == NULL) {
+            return NULL;
+        }
+    } else {
+        PyErr_Format(PyExc_TypeError, "JSON documents must be str or bytes, not %.200s", Py_TYPE(document)->tp_name);
+        return NULL;
+    }
+    if ((size_t)json_length != strlen(json_string)) {
+        PyErr_SetString(PyExc_ValueError, "JSON document contains a null character");
+        return NULL;
+    }
+    return json_string;
+}
+"""
+
+
+SETUP_TEMPLATE = """# This file was generated by JSON Schema to C.
+# Any changes made to it will be lost on regeneration.
+from setuptools import setup, Extension
+
+setup(
+    name="{module_name}",
+    ext_modules=[
+        Extension(
+            "{module_name}",
+            sources=["{extension}"],
+            # The parser itself is included in the extension source
+            depends=["{c_file}", "{h_file}"],
+        ),
+    ],
+)
+"""
+
+
+class PythonExtensionGenerator:
+    """ Generates a CPython extension module, which wraps the parser of a root generator.
+
+    The module has a parse(document) function, which returns the parsed document as a dict (with lists and
+    basic Python types inside), and a parse_many(documents) function, which parses a whole list of documents
+    without holding the GIL. Errors are raised as <module>.ParseError, which is a ValueError, with the message
+    and position passed to LOG_ERROR, and the index of the failing document in parse_many.
+
+    For bulk loading, parse_array(documents) returns the parsed C structs in a bytearray, and dtype() returns
+    the matching NumPy dtype description, so numpy.frombuffer(data, numpy.dtype(module.dtype())) can use the
+    structs without any copying or Python objects per document.
+
+    The extension includes the generated .c file, so that it can define LOG_ERROR.
+    """
+    # pylint: disable=too-many-public-methods
+    # One generate_ method per emitted C function keeps each of them readable
+
+    def __init__(self, root_generator, module_name, name):
+        if not re.match("^[A-Za-z_][A-Za-z0-9_]*$", module_name):
+            raise SchemaError("", "Invalid Python module name: '{}'".format(module_name))
+        self.root_generator = root_generator
+        self.module_name = module_name
+        self.name = name
+        self.converters = {}
+        self.converters_file = CodeBlockPrinter(io.StringIO())
+
+    @classmethod
+    def module_name_for_path(cls, extension_path):
+        """ The module is named after the file, e.g. foo.c and foo.module.c both contain module foo """
+        return os.path.basename(extension_path).split('.')[0]
+
+    def converter_name(self, generator):
+        return "to_python_{}".format(re.sub("_t$", "", str(generator.c_type)))
+
+    def value_expression(self, generator, pointer):
+        """ A C expression, which creates a new Python object from the C value pointer points to """
+        # pylint: disable=too-many-return-statements
+        if isinstance(generator, IntegerGeneratorBase):
+            if generator.c_type.is_unsigned():
+                return "PyLong_FromUnsignedLongLong(*({}))".format(pointer)
+            return "PyLong_FromLongLong(*({}))".format(pointer)
+        if isinstance(generator, FloatGenerator):
+            return "PyFloat_FromDouble(*({}))".format(pointer)
+        if isinstance(generator, BoolGenerator):
+            return "PyBool_FromLong(*({}))".format(pointer)
+        if isinstance(generator, StringGenerator):
+            if generator.js2cParseFunction is not None:
+                raise SchemaError(generator, "Strings with a js2cParseFunction can not be converted to Python")
+            return "string_from_json(*({0}), strlen(*({0})))".format(pointer)
+        self.generate_converter(generator)
+        return "{}({})".format(self.converter_name(generator), pointer)
+
+    def generate_converter(self, generator):
+        name = self.converter_name(generator)
+        if name in self.converters:
+            return
+        self.converters[name] = generator
+        if isinstance(generator, ObjectGenerator):
+            generate_body = self.generate_object_converter_body
+        elif isinstance(generator, ArrayGenerator):
+            generate_body = self.generate_array_converter_body
+        elif isinstance(generator, MapGenerator):
+            generate_body = self.generate_map_converter_body
+        elif isinstance(generator, OneOfGenerator):
+            generate_body = self.generate_one_of_converter_body
+        elif isinstance(generator, EnumGenerator):
+            generate_body = self.generate_enum_converter_body
+        else:
+            raise SchemaError(generator, "This type can not be converted to Python")
+
+        # Converters of the children are generated while generating the body, they must come first.
+        body_file = CodeBlockPrinter(io.StringIO())
+        body_file.print("static PyObject *{}(const {} *in)".format(name, generator.c_type))
+        with body_file.code_block():
+            generate_body(generator, body_file)
+        body_file.print("")
+        self.converters_file.file.write(body_file.file.getvalue())
+
+    def generate_dict_items(self, items, out_file):
+        """ items is a list of (key, generator, pointer) tuples """
+        for key, generator, pointer in items:
+            with out_file.if_block('set_dict_item(result, "{}", {})'.format(key, self.value_expression(generator, pointer))):
+                out_file.print("Py_DECREF(result);")
+                out_file.print("return NULL;")
+
+    def generate_object_converter_body(self, generator, out_file):
+        out_file.print("PyObject *result = PyDict_New();")
+        with out_file.if_block("result == NULL"):
+            out_file.print("return NULL;")
+        if not generator.fields:
+            out_file.print("(void)in;")
+        self.generate_dict_items(
+            [(field_name, field_generator, "&in->{}".format(field_name)) for field_name, field_generator in generator.fields.items()],
+            out_file
+        )
+        out_file.print("return result;")
+
+    def generate_array_converter_body(self, generator, out_file):
+        out_file.print("PyObject *result = PyList_New(in->n);")
+        with out_file.if_block("result == NULL"):
+            out_file.print("return NULL;")
+        with out_file.for_block("uint64_t i = 0; i < in->n; ++i"):
+            if generator.js2cColumnar:
+                out_file.print("PyObject *item = {};".format(self.columnar_row_converter_name(generator) + "(in, i)"))
+            else:
+                out_file.print("PyObject *item = {};".format(self.value_expression(generator.item_generator, "&in->items[i]")))
+            with out_file.if_block("item == NULL"):
+                out_file.print("Py_DECREF(result);")
+                out_file.print("return NULL;")
+            out_file.print("PyList_SET_ITEM(result, i, item);")
+        out_file.print("return result;")
+
+    def columnar_row_converter_name(self, generator):
+        """ Rows of columnar arrays are converted to dicts, just like the items of normal arrays """
+        name = self.converter_name(generator) + "_row"
+        if name in self.converters:
+            return name
+        self.converters[name] = generator
+        body_file = CodeBlockPrinter(io.StringIO())
+        body_file.print("static PyObject *{}(const {} *in, uint64_t row)".format(name, generator.c_type))
+        with body_file.code_block():
+            body_file.print("PyObject *result = PyDict_New();")
+            with body_file.if_block("result == NULL"):
+                body_file.print("return NULL;")
+            self.generate_dict_items(
+                [
+                    (field_name, field_generator, "&in->{}[row]".format(field_name))
+                    for field_name, field_generator in generator.item_generator.fields.items()
+                ],
+                body_file
+            )
+            body_file.print("return result;")
+        body_file.print("")
+        self.converters_file.file.write(body_file.file.getvalue())
+        return name
+
+    def generate_map_converter_body(self, generator, out_file):
+        out_file.print("PyObject *result = PyDict_New();")
+        with out_file.if_block("result == NULL"):
+            out_file.print("return NULL;")
+        with out_file.for_block("uint64_t i = 0; i < in->n; ++i"):
+            out_file.print("PyObject *key = string_from_json(in->entries[i].key, in->entries[i].key_length);")
+            out_file.print("PyObject *value = {};".format(self.value_expression(generator.value_generator, "&in->entries[i].value")))
+            out_file.print("const bool failed = key == NULL || value == NULL || PyDict_SetItem(result, key, value) != 0;")
+            out_file.print("Py_XDECREF(key);")
+            out_file.print("Py_XDECREF(value);")
+            with out_file.if_block("failed"):
+                out_file.print("Py_DECREF(result);")
+                out_file.print("return NULL;")
+        out_file.print("return result;")
+
+    def generate_one_of_converter_body(self, generator, out_file):
+        out_file.print("PyObject *result;")
+        out_file.print("switch (in->tag)")
+        with out_file.code_block():
+            for tag_value, (member_name, variant_generator) in zip(generator.tag_values, generator.variants.items()):
+                out_file.print("case {}:".format(generator.tag_generator.convert_enum_label(tag_value)))
+                with out_file.indent():
+                    out_file.print("result = {};".format(self.value_expression(variant_generator, "&in->value.{}".format(member_name))))
+                    with out_file.if_block('result != NULL && set_dict_item(result, "{}", PyUnicode_FromString("{}"))'.format(
+                        generator.discriminator_name, tag_value
+                    )):
+                        out_file.print("Py_CLEAR(result);")
+                    out_file.print("return result;")
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print('PyErr_SetString(PyExc_ValueError, "Invalid tag");')
+                out_file.print("return NULL;")
+
+    def generate_enum_converter_body(self, generator, out_file):
+        out_file.print("switch (*in)")
+        with out_file.code_block():
+            for enum_value in generator.enum:
+                out_file.print("case {}:".format(generator.convert_enum_label(enum_value)))
+                with out_file.indent():
+                    out_file.print('return PyUnicode_FromString("{}");'.format(enum_value))
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print('PyErr_SetString(PyExc_ValueError, "Invalid enum value");')
+                out_file.print("return NULL;")
+
+    def dtype_function_name(self, type_name):
+        return "dtype_{}".format(re.sub("_t$", "", type_name))
+
+    def dtype_expression(self, generator):
+        """ A C expression, which creates a new NumPy dtype description (a format string or a dict) of the
+        C type of generator, with the offsets and sizes of the actual C compiler """
+        # pylint: disable=too-many-return-statements
+        c_type = generator.c_type
+        if isinstance(generator, IntegerGeneratorBase):
+            signedness, bits = re.match("^(u?)int([0-9]+)_t$", str(c_type)).groups()
+            return 'PyUnicode_FromString("{}{}")'.format("u" if signedness else "i", int(bits) // 8)
+        if isinstance(generator, FloatGenerator):
+            return 'PyUnicode_FromString("f8")'
+        if isinstance(generator, BoolGenerator):
+            return 'sizeof(bool) == 1 ? PyUnicode_FromString("?") : PyUnicode_FromFormat("u%zu", sizeof(bool))'
+        if isinstance(generator, StringGenerator):
+            if generator.js2cParseFunction is not None:
+                # Custom types are opaque bytes
+                return 'PyUnicode_FromFormat("V%zu", sizeof({}))'.format(c_type)
+            return 'PyUnicode_FromFormat("S%zu", sizeof({}))'.format(c_type)
+        if isinstance(generator, EnumGenerator):
+            return 'PyUnicode_FromFormat("i%zu", sizeof({}))'.format(c_type)
+        self.generate_dtype_function(generator)
+        return "{}()".format(self.dtype_function_name(str(c_type)))
+
+    def generate_dtype_struct(self, c_type, fields, out_file, itemsize=None):
+        """ fields is a list of (name, format expression, offset expression) tuples """
+        if itemsize is None:
+            itemsize = "sizeof({})".format(c_type)
+        if not fields:
+            out_file.print("return dtype_struct(0, NULL, NULL, NULL, {});".format(itemsize))
+            return
+        out_file.print("const char *const names[] = {{{}}};".format(", ".join('"{}"'.format(name) for name, _, _ in fields)))
+        out_file.print("PyObject *formats[] = {")
+        with out_file.indent():
+            for _, format_expression, _ in fields:
+                out_file.print("{},".format(format_expression))
+        out_file.print("};")
+        out_file.print("const size_t offsets[] = {")
+        with out_file.indent():
+            for _, _, offset in fields:
+                out_file.print("{},".format(offset))
+        out_file.print("};")
+        out_file.print("return dtype_struct({}, names, formats, offsets, {});".format(len(fields), itemsize))
+
+    def generate_dtype_function(self, generator):
+        c_type = generator.c_type
+        name = self.dtype_function_name(str(c_type))
+        if name in self.converters:
+            return
+        self.converters[name] = generator
+        if isinstance(generator, ObjectGenerator):
+            fields = [
+                (field_name, self.dtype_expression(field_generator), "offsetof({}, {})".format(c_type, field_name))
+                for field_name, field_generator in generator.fields.items()
+            ]
+        elif isinstance(generator, ArrayGenerator) and generator.js2cColumnar:
+            fields = [("n", 'PyUnicode_FromString("u8")', "offsetof({}, n)".format(c_type))] + [
+                (
+                    field_name,
+                    'Py_BuildValue("(Nn)", {}, (Py_ssize_t){})'.format(self.dtype_expression(field_generator), generator.maxItems),
+                    "offsetof({}, {})".format(c_type, field_name)
+                )
+                for field_name, field_generator in generator.item_generator.fields.items()
+            ]
+        elif isinstance(generator, ArrayGenerator):
+            fields = [
+                ("n", 'PyUnicode_FromString("u8")', "offsetof({}, n)".format(c_type)),
+                (
+                    "items",
+                    'Py_BuildValue("(Nn)", {}, (Py_ssize_t){})'.format(self.dtype_expression(generator.item_generator), generator.maxItems),
+                    "offsetof({}, items)".format(c_type)
+                ),
+            ]
+        elif isinstance(generator, MapGenerator):
+            self.generate_map_entry_dtype_function(generator)
+            fields = [
+                ("n", 'PyUnicode_FromString("u8")', "offsetof({}, n)".format(c_type)),
+                (
+                    "entries",
+                    'Py_BuildValue("(Nn)", {}(), (Py_ssize_t){})'.format(
+                        self.dtype_function_name(c_type.entry_type_name), c_type.max_properties
+                    ),
+                    "offsetof({}, entries)".format(c_type)
+                ),
+                (
+                    "slots",
+                    'Py_BuildValue("(Nn)", PyUnicode_FromFormat("u%zu", sizeof({})), (Py_ssize_t){})'.format(c_type.slot_type, c_type.slot_num),
+                    "offsetof({}, slots)".format(c_type)
+                ),
+            ]
+        elif isinstance(generator, OneOfGenerator):
+            self.generate_union_dtype_function(generator)
+            fields = [
+                ("tag", self.dtype_expression(generator.tag_generator), "offsetof({}, tag)".format(c_type)),
+                ("value", "{}()".format(self.dtype_function_name(str(c_type) + "_value")), "offsetof({}, value)".format(c_type)),
+            ]
+        else:
+            raise SchemaError(generator, "No NumPy dtype for this type")
+
+        body_file = CodeBlockPrinter(io.StringIO())
+        body_file.print("static PyObject *{}(void)".format(name))
+        with body_file.code_block():
+            self.generate_dtype_struct(c_type, fields, body_file)
+        body_file.print("")
+        self.converters_file.file.write(body_file.file.getvalue())
+
+    def generate_map_entry_dtype_function(self, generator):
+        c_type = generator.c_type
+        fields = [
+            ("key", 'PyUnicode_FromFormat("S%zu", sizeof((({} *)0)->key))'.format(c_type.entry_type_name), "offsetof({}, key)".format(c_type.entry_type_name)),
+            ("key_length", 'PyUnicode_FromString("u4")', "offsetof({}, key_length)".format(c_type.entry_type_name)),
+            ("value", self.dtype_expression(generator.value_generator), "offsetof({}, value)".format(c_type.entry_type_name)),
+        ]
+        body_file = CodeBlockPrinter(io.StringIO())
+        body_file.print("static PyObject *{}(void)".format(self.dtype_function_name(c_type.entry_type_name)))
+        with body_file.code_block():
+            self.generate_dtype_struct(c_type.entry_type_name, fields, body_file)
+        body_file.print("")
+        self.converters_file.file.write(body_file.file.getvalue())
+
+    def generate_union_dtype_function(self, generator):
+        """ The value union of a tagged union is a struct with overlapping fields in NumPy """
+        c_type = generator.c_type
+        fields = [
+            (
+                member_name,
+                self.dtype_expression(variant_generator),
+                "offsetof({0}, value.{1}) - offsetof({0}, value)".format(c_type, member_name)
+            )
+            for member_name, variant_generator in generator.variants.items()
+        ]
+        body_file = CodeBlockPrinter(io.StringIO())
+        body_file.print("static PyObject *{}(void)".format(self.dtype_function_name(str(c_type) + "_value")))
+        with body_file.code_block():
+            self.generate_dtype_struct(c_type, fields, body_file, itemsize="sizeof((({} *)0)->value)".format(c_type))
+        body_file.print("")
+        self.converters_file.file.write(body_file.file.getvalue())
+
+    def generate_parse_functions(self, out_file):
+        """ The Python-facing functions of the module, and their helpers """
+        self.generate_parse_function(out_file)
+        self.generate_parse_documents_function(out_file)
+        self.generate_parse_many_function(out_file)
+        self.generate_parse_array_function(out_file)
+        self.generate_dtype_entry_function(out_file)
+
+    def generate_parse_function(self, out_file):
+        """ parse(document): a dict from one document """
+        c_type = self.root_generator.c_type
+        parser = "json_parse_{}".format(self.name)
+        result_expression = self.value_expression(self.root_generator, "out")
+
+        out_file.print("static PyObject *parse(PyObject *self, PyObject *document)")
+        with out_file.code_block():
+            out_file.print("(void)self;")
+            out_file.print("const char *json_string = get_document(document);")
+            with out_file.if_block("json_string == NULL"):
+                out_file.print("return NULL;")
+            out_file.print("{} *out = PyMem_RawMalloc(sizeof(*out));".format(c_type))
+            with out_file.if_block("out == NULL"):
+                out_file.print("return PyErr_NoMemory();")
+            out_file.print("python_parse_error_t error;")
+            out_file.print("bool failed;")
+            out_file.print("Py_BEGIN_ALLOW_THREADS")
+            out_file.print("failed = {}(json_string, out);".format(parser))
+            with out_file.if_block("failed"):
+                out_file.print("error = last_parse_error;")
+            out_file.print("Py_END_ALLOW_THREADS")
+            out_file.print("PyObject *result = NULL;")
+            with out_file.if_block("failed"):
+                out_file.print("raise_parse_error(&error, -1);")
+            out_file.print("else")
+            with out_file.code_block():
+                out_file.print("result = {};".format(result_expression))
+            out_file.print("PyMem_RawFree(out);")
+            out_file.print("return result;")
+        out_file.print("")
+
+    def generate_parse_documents_function(self, out_file):
+        """ parse_documents(document_list, outs), the GIL-free loop shared by parse_many and parse_array """
+        c_type = self.root_generator.c_type
+        parser = "json_parse_{}".format(self.name)
+
+        out_file.print("/* Parse a list of documents into an array, without holding the GIL. Returns true with an exception set on error. */")
+        out_file.print("static bool parse_documents(PyObject *document_list, {} *outs)".format(c_type))
+        with out_file.code_block():
+            out_file.print("const Py_ssize_t n = PyList_GET_SIZE(document_list);")
+            out_file.print("const char **json_strings = PyMem_RawCalloc(n + 1, sizeof(*json_strings));")
+            with out_file.if_block("json_strings == NULL"):
+                out_file.print("PyErr_NoMemory();")
+                out_file.print("return true;")
+            with out_file.for_block("Py_ssize_t i = 0; i < n; ++i"):
+                out_file.print("json_strings[i] = get_document(PyList_GET_ITEM(document_list, i));")
+                with out_file.if_block("json_strings[i] == NULL"):
+                    out_file.print("PyMem_RawFree(json_strings);")
+                    out_file.print("return true;")
+            out_file.print("python_parse_error_t error;")
+            out_file.print("Py_ssize_t failed_index = -1;")
+            out_file.print("Py_BEGIN_ALLOW_THREADS")
+            with out_file.for_block("Py_ssize_t i = 0; i < n; ++i"):
+                with out_file.if_block("{}(json_strings[i], &outs[i])".format(parser)):
+                    out_file.print("error = last_parse_error;")
+                    out_file.print("failed_index = i;")
+                    out_file.print("break;")
+            out_file.print("Py_END_ALLOW_THREADS")
+            out_file.print("PyMem_RawFree(json_strings);")
+            with out_file.if_block("failed_index >= 0"):
+                out_file.print("raise_parse_error(&error, failed_index);")
+                out_file.print("return true;")
+            out_file.print("return false;")
+        out_file.print("")
+
+    def generate_parse_many_function(self, out_file):
+        """ parse_many(documents): a list of dicts """
+        c_type = self.root_generator.c_type
+        result_expression = self.value_expression(self.root_generator, "out")
+
+        out_file.print("static PyObject *parse_many(PyObject *self, PyObject *documents)")
+        with out_file.code_block():
+            out_file.print("(void)self;")
+            out_file.print("/* A private copy of the list, so that it can not change while the GIL is released */")
+            out_file.print("PyObject *document_list = PySequence_List(documents);")
+            with out_file.if_block("document_list == NULL"):
+                out_file.print("return NULL;")
+            out_file.print("const Py_ssize_t n = PyList_GET_SIZE(document_list);")
+            out_file.print("{} *outs = PyMem_RawMalloc((n + 1) * sizeof(*outs));".format(c_type))
+            out_file.print("PyObject *result = NULL;")
+            with out_file.if_block("outs == NULL"):
+                out_file.print("PyErr_NoMemory();")
+                out_file.print("goto cleanup;")
+            with out_file.if_block("parse_documents(document_list, outs)"):
+                out_file.print("goto cleanup;")
+            out_file.print("result = PyList_New(n);")
+            with out_file.if_block("result == NULL"):
+                out_file.print("goto cleanup;")
+            with out_file.for_block("Py_ssize_t i = 0; i < n; ++i"):
+                out_file.print("const {} *out = &outs[i];".format(c_type))
+                out_file.print("PyObject *item = {};".format(result_expression))
+                with out_file.if_block("item == NULL"):
+                    out_file.print("Py_CLEAR(result);")
+                    out_file.print("goto cleanup;")
+                out_file.print("PyList_SET_ITEM(result, i, item);")
+            out_file.print("cleanup:")
+            out_file.print("PyMem_RawFree(outs);")
+            out_file.print("Py_DECREF(document_list);")
+            out_file.print("return result;")
+        out_file.print("")
+
+    def generate_parse_array_function(self, out_file):
+        """ parse_array(documents): a bytearray of structs """
+        c_type = self.root_generator.c_type
+
+        out_file.print("static PyObject *parse_array(PyObject *self, PyObject *documents)")
+        with out_file.code_block():
+            out_file.print("(void)self;")
+            out_file.print("PyObject *document_list = PySequence_List(documents);")
+            with out_file.if_block("document_list == NULL"):
+                out_file.print("return NULL;")
+            out_file.print("PyObject *result = PyByteArray_FromStringAndSize(NULL, PyList_GET_SIZE(document_list) * sizeof({}));".format(c_type))
+            with out_file.if_block("result != NULL && parse_documents(document_list, ({} *)PyByteArray_AS_STRING(result))".format(c_type)):
+                out_file.print("Py_CLEAR(result);")
+            out_file.print("Py_DECREF(document_list);")
+            out_file.print("return result;")
+        out_file.print("")
+
+    def generate_dtype_entry_function(self, out_file):
+        """ dtype(): the NumPy dtype description of the root struct """
+        out_file.print("static PyObject *dtype(PyObject *self, PyObject *unused)")
+        with out_file.code_block():
+            out_file.print("(void)self;")
+            out_file.print("(void)unused;")
+            out_file.print("return {};".format(self.dtype_expression(self.root_generator)))
+        out_file.print("")
+
+    def generate_module_definition(self, out_file):
+        out_file.print("static PyMethodDef methods[] = {")
+        with out_file.indent():
+            out_file.print('{{"parse", parse, METH_O, "Parse a {} document (str or bytes) into a dict"}},'.format(self.name))
+            out_file.print('{{"parse_many", parse_many, METH_O, "Parse a list of {} documents, without holding the GIL"}},'.format(
+                self.name
+            ))
+            out_file.print(
+                '{{"parse_array", parse_array, METH_O, '
+                '"Parse a list of {} documents into a bytearray of C structs, without holding the GIL"}},'.format(self.name)
+            )
+            out_file.print('{"dtype", dtype, METH_NOARGS, "NumPy dtype description of the structs returned by parse_array"},')
+            out_file.print("{NULL, NULL, 0, NULL},")
+        out_file.print("};")
+        out_file.print("")
+        out_file.print("static struct PyModuleDef module_definition = {")
+        with out_file.indent():
+            out_file.print("PyModuleDef_HEAD_INIT,")
+            out_file.print('"{}",'.format(self.module_name))
+            out_file.print('"Generated parser for {} documents",'.format(self.name))
+            out_file.print("-1,")
+            out_file.print("methods,")
+            out_file.print("NULL,")
+            out_file.print("NULL,")
+            out_file.print("NULL,")
+            out_file.print("NULL,")
+        out_file.print("};")
+        out_file.print("")
+        out_file.print("PyMODINIT_FUNC PyInit_{}(void)".format(self.module_name))
+        with out_file.code_block():
+            out_file.print("PyObject *module = PyModule_Create(&module_definition);")
+            with out_file.if_block("module == NULL"):
+                out_file.print("return NULL;")
+            out_file.print("parse_error_type = PyErr_NewExceptionWithDoc(")
+            with out_file.indent():
+                out_file.print('"{}.ParseError",'.format(self.module_name))
+                out_file.print('"Invalid document. The position attribute is the position of the error in the document, "')
+                out_file.print('"and index is the index of the document in parse_many.",')
+                out_file.print("PyExc_ValueError,")
+                out_file.print("NULL")
+            out_file.print(");")
+            with out_file.if_block("parse_error_type == NULL"):
+                out_file.print("Py_DECREF(module);")
+                out_file.print("return NULL;")
+            out_file.print("Py_INCREF(parse_error_type);")
+            with out_file.if_block('PyModule_AddObject(module, "ParseError", parse_error_type) != 0'):
+                out_file.print("Py_DECREF(parse_error_type);")
+                out_file.print("Py_DECREF(module);")
+                out_file.print("return NULL;")
+            out_file.print("return module;")
+
+    def generate_extension(self, out_file, c_include_path):
+        out_file.print(EXTENSION_PRELUDE)
+        out_file.print('#include "{}"'.format(c_include_path))
+        out_file.print(EXTENSION_HELPERS)
+        functions_file = CodeBlockPrinter(io.StringIO())
+        self.generate_parse_functions(functions_file)
+        out_file.file.write(self.converters_file.file.getvalue())
+        out_file.file.write(functions_file.file.getvalue())
+        self.generate_module_definition(out_file)
+
+    def generate_setup(self, setup_path, extension_path, c_path, h_path):
+        """ A minimal setuptools script, which builds the extension. Run it from its own directory. """
+        setup_dir = os.path.dirname(setup_path) or '.'
+        return SETUP_TEMPLATE.format(
+            module_name=self.module_name,
+            extension=os.path.relpath(extension_path, setup_dir),
+            c_file=os.path.relpath(c_path, setup_dir),
+            h_file=os.path.relpath(h_path, setup_dir),
+        )
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import json
+
+from .base import CType, SchemaError, TypeLayout, struct_layout
+from .integer import IntegerType
+from .parser_cache import ParserCache
+
+
+class ReportGenerator:
+    """ Size estimates of a generated parser, to catch oversized schemas before they overflow a stack. """
+    # jsmntok_t is four ints (type, start, end, size) in strict mode, without parent links.
+    TOKEN_LAYOUT = TypeLayout(16, 4, 0)
+    # The compact js2c_token_t packs the type and size into one int
+    COMPACT_TOKEN_LAYOUT = TypeLayout(12, 4, 0)
+    POINTER_LAYOUT = TypeLayout(8, 8, 0)
+    # parse_state_t: json_string, current_key, tokens, current_token, max_token_num, error_position
+    PARSE_STATE_MEMBERS = [
+        (POINTER_LAYOUT, 3),
+        (CType.PRIMITIVE_LAYOUTS["uint64_t"], 2),
+        (CType.PRIMITIVE_LAYOUTS["int32_t"], 1),
+    ]
+    PARSE_STATE_LAYOUT = struct_layout(PARSE_STATE_MEMBERS)
+    # js2c_error_t: code, position, token_index, path_id, expected, actual
+    ERROR_LAYOUT = struct_layout([
+        (CType.PRIMITIVE_LAYOUTS["int32_t"], 2),
+        (CType.PRIMITIVE_LAYOUTS["uint64_t"], 1),
+        (CType.PRIMITIVE_LAYOUTS["uint32_t"], 1),
+        (CType.PRIMITIVE_LAYOUTS["uint64_t"], 2),
+    ])
+    # With structured errors, parse_state_t also has the error
+    STRUCTURED_PARSE_STATE_LAYOUT = struct_layout(PARSE_STATE_MEMBERS + [(ERROR_LAYOUT, 1)])
+    DOMINANT_PATH_NUM = 5
+    LARGEST_FUNCTION_NUM = 5
+
+    def __init__(self, root_generator):
+        """ root_generator is a RootGenerator, which has already generated the parser C file """
+        self.root = root_generator
+        self.settings = root_generator.settings
+
+    @classmethod
+    def display_path(cls, path):
+        return path or '<root>'
+
+    def subtrees(self):
+        """ All generators of the schema, with their type sizes and token counts, in schema order """
+        result = []
+        generators = [self.root.root_generator]
+        while generators:
+            generator = generators.pop()
+            layout = generator.c_type.layout()
+            result.append({
+                "path": self.display_path(generator.path_in_schema),
+                "type": str(generator.c_type),
+                "size": layout.size if layout else None,
+                "max_token_num": generator.max_token_num(),
+            })
+            generators.extend(reversed(generator.child_generators()))
+        return result
+
+    def types(self):
+        """ All the structs, arrays, strings, etc. declared in the header, with their estimated layouts """
+        result = {}
+        generators = [self.root.root_generator]
+        while generators:
+            generator = generators.pop()
+            generators.extend(reversed(generator.child_generators()))
+            c_type = generator.c_type
+            # Plain C types and custom types are not declared by js2c
+            if type(c_type) in (CType, IntegerType):
+                continue
+            if c_type.type_name not in result:
+                layout = c_type.layout()
+                result[c_type.type_name] = {
+                    "name": c_type.type_name,
+                    "size": layout.size if layout else None,
+                    "alignment": layout.alignment if layout else None,
+                    "padding": layout.padding if layout else None,
+                    "paths": [],
+                }
+            result[c_type.type_name]["paths"].append(self.display_path(generator.path_in_schema))
+        return list(result.values())
+
+    def stack_frame(self, max_token_num):
+        token_layout = self.COMPACT_TOKEN_LAYOUT if self.settings.compact_tokens else self.TOKEN_LAYOUT
+        token_buffer_size = max_token_num * token_layout.size
+        if self.settings.structured_errors:
+            parse_state_layout = self.STRUCTURED_PARSE_STATE_LAYOUT
+        else:
+            parse_state_layout = self.PARSE_STATE_LAYOUT
+        return {
+            "function": "json_parse_{}".format(self.root.name),
+            "token_buffer": token_buffer_size,
+            "parse_state": parse_state_layout.size,
+            "total": token_buffer_size + parse_state_layout.size,
+        }
+
+    def functions(self):
+        """ The parse_, validate_ and patch_ functions, after deduplication """
+        functions = []
+        for code, name in self.root.root_generator.parser_cache.parsers.items():
+            code = code.replace(ParserCache.PARSER_NAME_PLACEHOLDER, name, 1)
+            functions.append({
+                # The name with the parse_/validate_/patch_ prefix, from the signature
+                "name": code.split("(", 1)[0].split()[-1],
+                "lines": code.count("\n"),
+                "bytes": len(code),
+            })
+        return {
+            "count": len(functions),
+            "lines": sum(function["lines"] for function in functions),
+            "bytes": sum(function["bytes"] for function in functions),
+            "largest": sorted(functions, key=lambda function: function["bytes"], reverse=True)[:self.LARGEST_FUNCTION_NUM],
+        }
+
+    @classmethod
+    def dominant_paths(cls, subtrees, key):
+        """ The largest subtrees below the root by key, with their share of the whole document """
+        total = subtrees[0][key]
+        candidates = [subtree for subtree in subtrees[1:] if subtree[key]]
+        candidates.sort(key=lambda subtree: subtree[key], reverse=True)
+        return [
+            {"path": subtree["path"], key: subtree[key], "percent": round(100.0 * subtree[key] / total, 1)}
+            for subtree in candidates[:cls.DOMINANT_PATH_NUM]
+        ]
+
+    def generate(self):
+        max_token_num = self.root.max_token_num()
+        subtrees = self.subtrees()
+        return {
+            "name": self.root.name,
+            "max_token_num": max_token_num,
+            "stack_frame": self.stack_frame(max_token_num),
+            "functions": self.functions(),
+            "types": self.types(),
+            "subtrees": subtrees,
+            "dominant_paths": {
+                "size": self.dominant_paths(subtrees, "size") if subtrees[0]["size"] else [],
+                "max_token_num": self.dominant_paths(subtrees, "max_token_num"),
+            },
+        }
+
+    def check_limits(self, report):
+        """ Raise a SchemaError for the first limit from the settings that the report exceeds """
+        # Token limits are reported at the schema path with the most tokens
+        token_path = "".join(path["path"] for path in report["dominant_paths"]["max_token_num"][:1])
+        if self.settings.max_tokens is not None and report["max_token_num"] > self.settings.max_tokens:
+            raise SchemaError(
+                token_path,
+                "Documents can have up to {} tokens, more than max_tokens ({})".format(report["max_token_num"], self.settings.max_tokens)
+            )
+        if self.settings.max_stack_size is not None and report["stack_frame"]["total"] > self.settings.max_stack_size:
+            raise SchemaError(
+                token_path,
+                "The estimated stack frame of {} is {} bytes, more than max_stack_size ({})".format(
+                    report["stack_frame"]["function"], report["stack_frame"]["total"], self.settings.max_stack_size
+                )
+            )
+        if self.settings.max_type_size is not None:
+            oversized_types = [
+                c_type for c_type in report["types"]
+                if c_type["size"] is not None and c_type["size"] > self.settings.max_type_size
+            ]
+            if oversized_types:
+                # The smallest one is reported, as it is the most specific: its containers are all oversized too.
+                c_type = min(oversized_types, key=lambda c_type: c_type["size"])
+                raise SchemaError(
+                    c_type["paths"][0],
+                    "The estimated size of {} is {} bytes, more than max_type_size ({})".format(
+                        c_type["name"], c_type["size"], self.settings.max_type_size
+                    )
+                )
+
+    @classmethod
+    def format_size(cls, size):
+        return "?" if size is None else str(size)
+
+    @classmethod
+    def format_table(cls, header, rows, text_columns=1):
+        """ The first text_columns columns are left aligned, the rest (the numbers) are right aligned """
+        rows = [header] + [[str(cell) for cell in row] for row in rows]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+        lines = []
+        for row in rows:
+            cells = [
+                cell.ljust(width) if column < text_columns else cell.rjust(width)
+                for column, (cell, width) in enumerate(zip(row, widths))
+            ]
+            lines.append("  " + "  ".join(cells).rstrip())
+        return lines
+
+    @classmethod
+    def format_text(cls, report):
+        stack_frame = report["stack_frame"]
+        functions = report["functions"]
+        lines = [
+            "Size report of json_parse_{}".format(report["name"]),
+            "",
+            "Maximum number of tokens: {}".format(report["max_token_num"]),
+            "Estimated stack frame of {}: {} bytes (token_buffer: {}, parse_state: {})".format(
+                stack_frame["function"], stack_frame["total"], stack_frame["token_buffer"], stack_frame["parse_state"]
+            ),
+            "Parser functions: {} ({} lines, {} bytes)".format(functions["count"], functions["lines"], functions["bytes"]),
+        ]
+        lines += cls.format_table(
+            ["Largest functions", "lines", "bytes"],
+            [[function["name"], function["lines"], function["bytes"]] for function in functions["largest"]]
+        )
+        lines.append("")
+        lines.append("Types:")
+        lines += cls.format_table(
+            ["name", "size", "alignment", "padding"],
+            [
+                [c_type["name"], cls.format_size(c_type["size"]), cls.format_size(c_type["alignment"]), cls.format_size(c_type["padding"])]
+                for c_type in report["types"]
+            ]
+        )
+        lines.append("")
+        lines.append("Schema paths:")
+        lines += cls.format_table(
+            ["path", "type", "size", "tokens"],
+            [
+                [subtree["path"], subtree["type"], cls.format_size(subtree["size"]), subtree["max_token_num"]]
+                for subtree in report["subtrees"]
+            ],
+            text_columns=2
+        )
+        for key, title in (("size", "size"), ("max_token_num", "tokens")):
+            lines.append("")
+            lines.append("Dominant paths by {}:".format(title))
+            lines += cls.format_table(
+                ["path", title, "%"],
+                [[path["path"], path[key], path["percent"]] for path in report["dominant_paths"][key]]
+            )
+        return "\n".join(lines) + "\n"
+
+    def generate_report_file(self, file_name):
+        """ Returns the contents of the report file, and checks the limits """
+        report = self.generate()
+        self.check_limits(report)
+        if file_name is not None and file_name.endswith(".json"):
+            return json.dumps(report, indent=4) + "\n"
+        return self.format_text(report)
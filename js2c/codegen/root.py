@@ -22,6 +22,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
+import functools
+import io
 import os
 import re
 
@@ -29,6 +31,13 @@ from .code_block_printer import CodeBlockPrinter
 
 from .generator_factory import GeneratorFactory
 from .type_cache import TypeCache
+from .parser_cache import ParserCache
+from .error_helper_cache import ErrorHelperCache
+from .projection import project_schema
+from .object import ObjectGenerator
+from .python_extension import PythonExtensionGenerator
+from .report import ReportGenerator
+from .table import TableParserGenerator
 from .base import GeneratorInitParameters, SchemaError
 
 
@@ -40,11 +49,95 @@ NOTE_FOR_GENERATED_FILES = """
 """
 
 
+STRUCTURED_ERROR_DECLARATIONS = """
+#ifndef JS2C_STRUCTURED_ERROR_TYPES
+#define JS2C_STRUCTURED_ERROR_TYPES
+/* The kinds of parse errors. The comments tell which members of expected and actual are set. */
+typedef enum js2c_error_code_e {
+    JS2C_ERROR_NONE,
+    /* actual.i: the jsmn error code */
+    JS2C_ERROR_SYNTAX,
+    /* expected.u: the size of the push parser's buffer, actual.u: the size needed */
+    JS2C_ERROR_DOCUMENT_TOO_LARGE,
+    /* expected.i: the expected jsmntype_t (JSMN_UNDEFINED if several are accepted), actual.i: the token's type */
+    JS2C_ERROR_UNEXPECTED_TOKEN,
+    /* expected.s: the kind of the literal, e.g. "boolean" */
+    JS2C_ERROR_INVALID_LITERAL,
+    /* expected.i: the length limit, actual.i: the length (or number of items or keys) */
+    JS2C_ERROR_STRING_TOO_LONG,
+    JS2C_ERROR_STRING_TOO_SHORT,
+    JS2C_ERROR_ARRAY_TOO_LARGE,
+    JS2C_ERROR_ARRAY_TOO_SMALL,
+    JS2C_ERROR_MAP_TOO_LARGE,
+    JS2C_ERROR_MAP_TOO_SMALL,
+    /* expected: the violated bound, actual: the value, in .i, .u and .d respectively */
+    JS2C_ERROR_INTEGER_OUT_OF_RANGE,
+    JS2C_ERROR_UNSIGNED_OUT_OF_RANGE,
+    JS2C_ERROR_NUMBER_OUT_OF_RANGE,
+    /* expected.s: the name of the field */
+    JS2C_ERROR_MISSING_FIELD,
+    JS2C_ERROR_DUPLICATE_FIELD,
+    /* The key is at the position of the error */
+    JS2C_ERROR_UNKNOWN_FIELD,
+    JS2C_ERROR_MISSING_SEPARATOR,
+    JS2C_ERROR_MISSING_VALUE,
+    JS2C_ERROR_DUPLICATE_KEY,
+    /* The value is at the position of the error */
+    JS2C_ERROR_UNKNOWN_ENUM_VALUE,
+    /* expected.s: the name of the discriminator field */
+    JS2C_ERROR_MISSING_DISCRIMINATOR,
+    JS2C_ERROR_UNKNOWN_DISCRIMINATOR,
+    /* actual.s: the error of the js2cParseFunction */
+    JS2C_ERROR_CUSTOM_PARSER,
+    /* expected.s: the name of the field */
+    JS2C_ERROR_REQUIRED_FIELD_REMOVED,
+    /* expected.s: the path of the file (only valid during LOG_STRUCTURED_ERROR), actual.i: the errno */
+    JS2C_ERROR_IO
+} js2c_error_code_t;
+
+typedef union js2c_error_value_u {
+    int64_t i;
+    uint64_t u;
+    double d;
+    const char *s;
+} js2c_error_value_t;
+
+/* The path_id of errors outside of any schema value, e.g. syntax errors */
+#define JS2C_NO_PATH UINT32_MAX
+
+typedef struct js2c_error_s {
+    js2c_error_code_t code;
+    /* The byte offset of the error in the document */
+    int position;
+    /* The index of the token of the error */
+    uint64_t token_index;
+    /* The index of the schema path of the value in the <id>_error_paths table, or JS2C_NO_PATH */
+    uint32_t path_id;
+    js2c_error_value_t expected;
+    js2c_error_value_t actual;
+} js2c_error_t;
+#endif
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def read_source_file(path):
+    """ Read one of the files pasted into every generated parser. They are cached, so that a
+    long-running generator does not read them again for every schema. """
+    with open(path, encoding='utf-8') as source_file:
+        return source_file.read()
+
+
 class RootGenerator:
+    # pylint: disable=too-many-public-methods
+    # Every kind of entry point and output file has its own generate_ method
+
     def __init__(self, schema, settings):
         self.settings = settings
         if '$id' not in schema:
             raise SchemaError("", "All schemas must have an ID (a field named '$id')")
+        if settings.projection is not None:
+            schema = project_schema(schema, settings.projection, settings.projection_name)
         self.root_generator = GeneratorFactory.get_generator_for(
             schema,
             GeneratorInitParameters(
@@ -54,27 +147,369 @@ class RootGenerator:
                 settings,
                 GeneratorFactory,
                 TypeCache(),
+                ParserCache(),
+                ErrorHelperCache(stable_names=bool(settings.split_output)),
             )
         )
         self.name = schema['$id']
+        self.validate_settings()
+        # Translation units of the split output, generated with the parser C file
+        self.split_outputs = []
+        self.table_generator = None
+        if settings.table_driven:
+            self.table_generator = TableParserGenerator(self.root_generator, self.name)
+        self.error_helper_cache = self.root_generator.error_helper_cache
+        if settings.structured_errors:
+            # Paths are registered in schema order, before the parsers register them in generation order
+            generators = [self.root_generator]
+            while generators:
+                generator = generators.pop()
+                self.error_helper_cache.error_path_id(generator.path_in_schema)
+                generators.extend(reversed(generator.child_generators()))
+
+    def validate_settings(self):
+        """ Reject the combinations of settings that can not be generated for this schema """
+        settings = self.settings
+        if settings.python_setup_file is not None and settings.python_extension_file is None:
+            raise SchemaError("", "A Python setup file can only be generated with a Python extension file")
+        for enabled, feature in ((settings.split_output, "Split output"), (settings.generate_patcher, "Patch functions")):
+            if enabled and not isinstance(self.root_generator, ObjectGenerator):
+                raise SchemaError("", "{} can only be generated for objects".format(feature))
+        if settings.split_output and settings.python_extension_file is not None:
+            raise SchemaError("", "The Python extension includes the parser, it can not be generated with split output")
+        if settings.generate_patcher and len(self.root_generator.fields) > 64:
+            raise SchemaError("", "Patch functions can only be generated for objects with at most 64 fields")
+        if settings.table_driven:
+            if settings.split_output:
+                raise SchemaError("", "The table-driven parser has no functions to split, it can not be generated with split output")
+            if settings.generate_patcher:
+                raise SchemaError("", "Patch functions can not be generated for the table-driven parser")
+        if settings.structured_errors:
+            if not settings.lean_parser:
+                raise SchemaError("", "Structured errors can only be generated for lean parsers")
+            if settings.table_driven:
+                raise SchemaError("", "Structured errors are not supported by the table-driven parser")
+
+    def max_token_num(self):
+        """ The size of the token buffer of the entry points """
+        max_token_num = self.root_generator.max_token_num()
+        if self.settings.allow_additional_properties is not None:
+            max_token_num += self.settings.allow_additional_properties
+        return max_token_num
+
+    def generate_document_parser_body(self, tokenizer_call, generate_root_call, max_token_num, out_file):
+        """ max_token_num is None if the tokens are not stored on the stack """
+        # pylint: disable=too-many-arguments
+        if max_token_num is not None:
+            out_file.print("js2c_token_t token_buffer[{}];".format(max_token_num))
+        if self.settings.cold_error_paths:
+            tokenizer_call = "JS2C_UNLIKELY({})".format(tokenizer_call)
+        with out_file.if_block(tokenizer_call):
+            out_file.print("return true;")
+        generate_root_call(out_file)
+        out_file.print("return false;")
+
+    def generate_error_log(self, out_file):
+        """ Pass the error recorded in lean mode to the user's logging macro """
+        if self.settings.structured_errors:
+            out_file.print("LOG_STRUCTURED_ERROR(builtin_structured_error(parse_state))")
+        else:
+            out_file.print("LOG_ERROR(parse_state->error_position, \"Invalid JSON document\")")
+
+    def document_parser_body(self, tokenizer_call, generate_root_call, max_token_num):
+        """ The body of an entry point, which tokenizes the document with tokenizer_call, and runs
+        generate_root_call's code on it """
+        return functools.partial(self.generate_document_parser_body, tokenizer_call, generate_root_call, max_token_num)
+
+    def generate_entry_point(self, function_name, parameters, generate_body, out_file):
+        """ Generate a public function, with generate_body's code inside, which can use parse_state.
+
+        parameters is a list of (declaration, name) pairs, e.g. ("const char *json_string", "json_string").
+        """
+        declarations = ", ".join(declaration for declaration, _ in parameters)
+        if self.settings.lean_parser:
+            # Errors are only recorded in the parse state in lean mode, so they are
+            # logged once, in the public function.
+            out_file.print("static bool {}_document(parse_state_t *parse_state, {})".format(function_name, declarations))
+            with out_file.code_block():
+                generate_body(out_file)
+            out_file.print("")
+
+        out_file.print("bool {}({})".format(function_name, declarations))
+        with out_file.code_block():
+            out_file.print("parse_state_t parse_state_var;")
+            out_file.print("parse_state_t *parse_state = &parse_state_var;")
+            if self.settings.structured_errors:
+                out_file.print("builtin_init_error(parse_state);")
+            if self.settings.lean_parser:
+                arguments = ", ".join(["parse_state"] + [name for _, name in parameters])
+                with out_file.if_block("{}_document({})".format(function_name, arguments)):
+                    self.generate_error_log(out_file)
+                    out_file.print("return true;")
+                out_file.print("return false;")
+            else:
+                generate_body(out_file)
+        out_file.print("")
+
+    def generate_root_parser_call(self, out_file):
+        if self.table_generator is not None:
+            self.table_generator.generate_parser_call("out", out_file)
+        else:
+            self.root_generator.generate_parser_call("out", out_file)
+
+    def generate_root_validator_call(self, out_file):
+        if self.table_generator is not None:
+            self.table_generator.generate_parser_call("NULL", out_file)
+        else:
+            self.root_generator.generate_validator_call(out_file)
 
     def generate_root_parser(self, out_file, max_token_num):
-        out_file.print("bool json_parse_{}(const char *json_string, {} *out)".format(self.name, self.root_generator.c_type))
+        self.generate_entry_point(
+            "json_parse_{}".format(self.name),
+            [
+                ("const char *json_string", "json_string"),
+                ("{} *out".format(self.root_generator.c_type), "out"),
+            ],
+            self.document_parser_body(
+                "builtin_parse_json_string(parse_state, token_buffer, {}, json_string)".format(max_token_num),
+                self.generate_root_parser_call,
+                max_token_num,
+            ),
+            out_file
+        )
+
+    def generate_root_file_parser(self, out_file, max_token_num):
+        out_file.print(
+            "static bool json_parse_{}_mapped(parse_state_t *parse_state, const char *json_string, size_t json_length, {} *out)"
+            .format(self.name, self.root_generator.c_type)
+        )
+        with out_file.code_block():
+            self.generate_document_parser_body(
+                "builtin_tokenize_json(parse_state, token_buffer, {}, json_string, json_length)".format(max_token_num),
+                self.generate_root_parser_call,
+                max_token_num,
+                out_file
+            )
+        out_file.print("")
+        self.generate_entry_point(
+            "json_parse_{}_file".format(self.name),
+            [
+                ("const char *path", "path"),
+                ("{} *out".format(self.root_generator.c_type), "out"),
+            ],
+            self.generate_file_parser_body,
+            out_file
+        )
+
+    def generate_file_parser_body(self, out_file):
+        out_file.print("const char *json_string;")
+        out_file.print("size_t json_length;")
+        with out_file.if_block("builtin_map_file(parse_state, path, &json_string, &json_length)"):
+            out_file.print("return true;")
+        out_file.print("const bool result = json_parse_{}_mapped(parse_state, json_string, json_length, out);".format(self.name))
+        out_file.print("builtin_unmap_file(json_string, json_length);")
+        out_file.print("return result;")
+
+    def generate_root_batch_parser(self, out_file):
+        out_file.print("bool json_parse_{0}_batch(const char *const *json_strings, size_t n, {1} *out, size_t *failed_index)".format(
+            self.name, self.root_generator.c_type
+        ))
+        with out_file.code_block():
+            with out_file.for_block("size_t i = 0; i < n; ++i"):
+                with out_file.if_block("json_parse_{}(json_strings[i], &out[i])".format(self.name)):
+                    out_file.print("*failed_index = i;")
+                    out_file.print("return true;")
+            out_file.print("return false;")
+        out_file.print("")
+
+    def push_parser_type(self):
+        return "{}_push_parser_t".format(self.name)
+
+    def generate_push_parser_declarations(self, h_file, max_token_num):
+        # The state is declared with a size only, as the header does not know the jsmn types. The C file checks that
+        # the real state fits, with room for the larger tokens of JSMN_PARENT_LINKS.
+        h_file.print("")
+        h_file.print("/* State of json_parse_{}_init, _feed and _finish. It is only declared so that it can be allocated by".format(self.name))
+        h_file.print(" * the caller, its contents are private. */")
+        h_file.print("typedef struct {}_push_parser_s {{".format(self.name))
+        with h_file.indent():
+            h_file.print("uint64_t private_state[{}];".format(8 + 3 * max_token_num))
+        h_file.print("}} {};".format(self.push_parser_type()))
+        h_file.print("")
+        h_file.print("/* Parse a document received in chunks. The chunks are copied into buffer, which must be large enough for")
+        h_file.print(" * the whole document, and are tokenized as they arrive. The parsed data is only stored into out by")
+        h_file.print(" * json_parse_{}_finish, called after the last chunk. */".format(self.name))
+        h_file.print("void json_parse_{}_init({} *parser, char *buffer, size_t buffer_size);".format(
+            self.name, self.push_parser_type()
+        ))
+        h_file.print("bool json_parse_{}_feed({} *parser, const char *chunk, size_t length);".format(
+            self.name, self.push_parser_type()
+        ))
+        h_file.print("bool json_parse_{}_finish({} *parser, {} *out);".format(
+            self.name, self.push_parser_type(), self.root_generator.c_type
+        ))
+
+    def generate_root_push_parser(self, out_file, max_token_num):
+        state_type = "{}_push_state_t".format(self.name)
+        out_file.print("typedef struct {}_push_state_s {{".format(self.name))
+        with out_file.indent():
+            out_file.print("builtin_push_state_t push;")
+            out_file.print("js2c_token_t tokens[{}];".format(max_token_num))
+        out_file.print("}} {};".format(state_type))
+        out_file.print("")
+        out_file.print("/* Compilation fails here if the state does not fit into the storage declared in the header */")
+        out_file.print("typedef char {}_push_state_fits[sizeof({}) <= sizeof({}) ? 1 : -1];".format(
+            self.name, state_type, self.push_parser_type()
+        ))
+        out_file.print("")
+
+        out_file.print("void json_parse_{}_init({} *parser, char *buffer, size_t buffer_size)".format(
+            self.name, self.push_parser_type()
+        ))
+        with out_file.code_block():
+            out_file.print("builtin_push_init(&(({} *)parser)->push, buffer, buffer_size);".format(state_type))
+        out_file.print("")
+
+        out_file.print("bool json_parse_{}_feed({} *parser, const char *chunk, size_t length)".format(
+            self.name, self.push_parser_type()
+        ))
         with out_file.code_block():
             out_file.print("parse_state_t parse_state_var;")
             out_file.print("parse_state_t *parse_state = &parse_state_var;")
-            out_file.print("jsmntok_t token_buffer[{}];".format(max_token_num))
-            parser_call = "builtin_parse_json_string(parse_state, token_buffer, {}, json_string)" \
-                .format(max_token_num)
-            with out_file.if_block(parser_call):
+            out_file.print("{0} *state = ({0} *)parser;".format(state_type))
+            if self.settings.structured_errors:
+                out_file.print("builtin_init_error(parse_state);")
+            with out_file.if_block(
+                "builtin_push_feed(parse_state, &state->push, state->tokens, {}, chunk, length)".format(max_token_num)
+            ):
+                if self.settings.lean_parser:
+                    self.generate_error_log(out_file)
                 out_file.print("return true;")
-            self.root_generator.generate_parser_call(
-                "out",
-                out_file,
-            )
             out_file.print("return false;")
         out_file.print("")
 
+        out_file.print("static bool json_parse_{}_push_tokens(parse_state_t *parse_state, {} *parser)".format(
+            self.name, self.push_parser_type()
+        ))
+        with out_file.code_block():
+            out_file.print("{0} *state = ({0} *)parser;".format(state_type))
+            out_file.print("return builtin_push_finish(parse_state, &state->push, state->tokens);")
+        out_file.print("")
+
+        self.generate_entry_point(
+            "json_parse_{}_finish".format(self.name),
+            [
+                ("{} *parser".format(self.push_parser_type()), "parser"),
+                ("{} *out".format(self.root_generator.c_type), "out"),
+            ],
+            self.document_parser_body(
+                "json_parse_{}_push_tokens(parse_state, parser)".format(self.name),
+                self.generate_root_parser_call,
+                None,
+            ),
+            out_file
+        )
+
+    def generate_msgpack_parser_declarations(self, h_file):
+        h_file.print("")
+        h_file.print("/* The largest buffer msgpack_parse_{} may need for a document of length bytes */".format(self.name))
+        h_file.print("#ifndef JS2C_MSGPACK_BUFFER_SIZE")
+        h_file.print("#define JS2C_MSGPACK_BUFFER_SIZE(length) (6 * (size_t)(length) + 1)")
+        h_file.print("#endif")
+        h_file.print("/* Parse a MessagePack document into the same struct, with the same checks as json_parse_{}. The document is".format(self.name))
+        h_file.print(" * converted to JSON-like text (with unescaped strings) in buffer, and error positions point into it, except for")
+        h_file.print(" * malformed MessagePack, where they are offsets in data. */")
+        h_file.print("bool msgpack_parse_{}(const uint8_t *data, size_t length, char *buffer, size_t buffer_size, {} *out);".format(
+            self.name, self.root_generator.c_type
+        ))
+
+    def generate_root_msgpack_parser(self, out_file, max_token_num):
+        self.generate_entry_point(
+            "msgpack_parse_{}".format(self.name),
+            [
+                ("const uint8_t *data", "data"),
+                ("size_t length", "length"),
+                ("char *buffer", "buffer"),
+                ("size_t buffer_size", "buffer_size"),
+                ("{} *out".format(self.root_generator.c_type), "out"),
+            ],
+            self.document_parser_body(
+                "builtin_msgpack_tokenize(parse_state, token_buffer, {}, data, length, buffer, buffer_size)".format(max_token_num),
+                self.generate_root_parser_call,
+                max_token_num,
+            ),
+            out_file
+        )
+
+    def generate_root_validator(self, out_file, max_token_num):
+        self.generate_entry_point(
+            "json_validate_{}".format(self.name),
+            [
+                ("const char *json_string", "json_string"),
+                ("size_t json_length", "json_length"),
+            ],
+            self.document_parser_body(
+                "builtin_tokenize_json(parse_state, token_buffer, {}, json_string, json_length)".format(max_token_num),
+                self.generate_root_validator_call,
+                max_token_num,
+            ),
+            out_file
+        )
+
+    def generate_root_patcher_call(self, out_file):
+        out_file.print("*changed_fields = 0;")
+        self.root_generator.generate_patcher_call("inout", "changed_fields", out_file)
+
+    def generate_root_patcher(self, out_file, max_token_num):
+        self.generate_entry_point(
+            "json_patch_{}".format(self.name),
+            [
+                ("const char *json_string", "json_string"),
+                ("size_t json_length", "json_length"),
+                ("{} *inout".format(self.root_generator.c_type), "inout"),
+                ("uint64_t *changed_fields", "changed_fields"),
+            ],
+            self.document_parser_body(
+                "builtin_tokenize_json(parse_state, token_buffer, {}, json_string, json_length)".format(max_token_num),
+                self.generate_root_patcher_call,
+                max_token_num,
+            ),
+            out_file
+        )
+
+    def generate_patcher_declarations(self, h_file):
+        h_file.print("")
+        h_file.print("/* Bits of changed_fields of json_patch_{} */".format(self.name))
+        for field_index, field_name in enumerate(self.root_generator.fields):
+            macro_name = re.sub("[^A-Z0-9_]", "_", "{}_FIELD_{}".format(self.name, field_name).upper())
+            h_file.print("#define {} (UINT64_C(1) << {})".format(macro_name, field_index))
+        h_file.print("")
+        h_file.print("/* Apply a JSON merge patch (RFC 7386). Only the fields present in the patch are changed, and their")
+        h_file.print(" * bits are set in changed_fields. On error, inout may be partially updated. */")
+        h_file.print("bool json_patch_{}(const char *json_string, size_t json_length, {} *inout, uint64_t *changed_fields);".format(
+            self.name, self.root_generator.c_type
+        ))
+
+    def generate_structured_error_declarations(self, h_file):
+        h_file.write(STRUCTURED_ERROR_DECLARATIONS)
+        h_file.print("")
+        h_file.print("/* The schema paths of the values, indexed by the path_id of errors, e.g. for aggregating errors */")
+        h_file.print("extern const char *const {}_error_paths[];".format(self.name))
+        h_file.print("/* Format a message from an error passed to LOG_STRUCTURED_ERROR, like snprintf */")
+        h_file.print("int json_format_error_{}(const js2c_error_t *error, char *buffer, size_t size);".format(self.name))
+
+    def generate_structured_error_functions(self, c_file):
+        c_file.print("const char *const {}_error_paths[] = {{".format(self.name))
+        with c_file.indent():
+            for path in self.error_helper_cache.error_paths:
+                c_file.print('"{}",'.format(path or '<root>'))
+        c_file.print("};")
+        c_file.print("")
+        c_file.print("int json_format_error_{}(const js2c_error_t *error, char *buffer, size_t size)".format(self.name))
+        with c_file.code_block():
+            c_file.print("return builtin_format_error(error, {}_error_paths, buffer, size);".format(self.name))
+        c_file.print("")
+
     def generate_parser_h(self, h_file):
         h_file_name = h_file.name
         h_file = CodeBlockPrinter(h_file)
@@ -87,6 +522,7 @@ class RootGenerator:
 
         h_file.print("#include <stdint.h>")
         h_file.print("#include <stdbool.h>")
+        h_file.print("#include <stddef.h>")
 
         if self.settings.h_prefix_file is not None:
             h_file.print_separator("User-added prefix")
@@ -99,6 +535,25 @@ class RootGenerator:
         h_file.print_separator("Generated type declarations")
         self.root_generator.c_type.generate_type_declaration(h_file)
         h_file.print("bool json_parse_{}(const char *json_string, {} *out);".format(self.name, self.root_generator.c_type))
+        if self.settings.generate_batch_parser:
+            h_file.print("")
+            h_file.print("/* Parse n documents into out[0..n-1]. Stops at the first invalid document, and stores its index in")
+            h_file.print(" * failed_index. The array can be wrapped without copying, e.g. with numpy.frombuffer. */")
+            h_file.print("bool json_parse_{0}_batch(const char *const *json_strings, size_t n, {1} *out, size_t *failed_index);".format(
+                self.name, self.root_generator.c_type
+            ))
+        if self.settings.generate_file_parser:
+            h_file.print("bool json_parse_{}_file(const char *path, {} *out);".format(self.name, self.root_generator.c_type))
+        if self.settings.generate_push_parser:
+            self.generate_push_parser_declarations(h_file, self.max_token_num())
+        if self.settings.generate_msgpack_parser:
+            self.generate_msgpack_parser_declarations(h_file)
+        if self.settings.generate_validator:
+            h_file.print("bool json_validate_{}(const char *json_string, size_t json_length);".format(self.name))
+        if self.settings.generate_patcher:
+            self.generate_patcher_declarations(h_file)
+        if self.settings.structured_errors:
+            self.generate_structured_error_declarations(h_file)
 
         h_file.print("#ifdef __cplusplus")
         h_file.print("}")
@@ -111,53 +566,235 @@ class RootGenerator:
         h_file.print("#endif /* {} */".format(header_guard_name))
         h_file.print("")
 
+    def generate_extra_outputs(self, c_file_name, h_file_name):
+        """ Generate the output files requested in the settings, other than the parser .c and .h.
+
+        Returns a list of (file name, contents) pairs.
+        """
+        outputs = list(self.split_outputs)
+        limits = (self.settings.max_type_size, self.settings.max_stack_size, self.settings.max_tokens)
+        if self.settings.report is not None or any(limit is not None for limit in limits):
+            # Limits are checked even if no report is written
+            report = ReportGenerator(self).generate_report_file(self.settings.report)
+            if self.settings.report is not None:
+                outputs.append((self.settings.report, report))
+        if self.settings.python_extension_file is not None:
+            extension_file_name = self.settings.python_extension_file
+            extension_generator = PythonExtensionGenerator(
+                self.root_generator,
+                PythonExtensionGenerator.module_name_for_path(extension_file_name),
+                self.name
+            )
+            extension_file = CodeBlockPrinter(io.StringIO())
+            extension_file.write(NOTE_FOR_GENERATED_FILES)
+            extension_generator.generate_extension(
+                extension_file,
+                os.path.relpath(c_file_name, os.path.dirname(extension_file_name) or '.')
+            )
+            outputs.append((extension_file_name, extension_file.file.getvalue()))
+            if self.settings.python_setup_file is not None:
+                outputs.append((
+                    self.settings.python_setup_file,
+                    extension_generator.generate_setup(self.settings.python_setup_file, extension_file_name, c_file_name, h_file_name)
+                ))
+        return outputs
+
     @classmethod
     def manually_include_jsmn(cls, c_file):
-        with open(os.path.join(DIR_OF_THIS_FILE, '..', '..', 'jsmn', 'jsmn.h'), encoding='utf-8') as jsmn_h:
-            c_file.print("")
-            c_file.print_separator("jsmn.h (From https://github.com/zserge/jsmn)")
-            c_file.write(jsmn_h.read())
-            c_file.print_separator("end of jsmn.h")
-            c_file.print("")
+        c_file.print("")
+        c_file.print_separator("jsmn.h (From https://github.com/zserge/jsmn)")
+        c_file.write(read_source_file(os.path.join(DIR_OF_THIS_FILE, '..', '..', 'jsmn', 'jsmn.h')))
+        c_file.print_separator("end of jsmn.h")
+        c_file.print("")
 
     @classmethod
     def manually_include_builtins(cls, c_file):
-        with open(os.path.join(DIR_OF_THIS_FILE, 'js2c_builtins.h'), encoding='utf-8') as builtins_file:
-            c_file.print_separator("js2c_builtins.h")
-            builtins_file_contents = builtins_file.read()
-            jsmn_include_string = '#include "jsmn.h"\n'
-            split_pos = builtins_file_contents.index(jsmn_include_string)
-            if split_pos < 0:
-                raise ValueError("{} not found in builtins file".format(jsmn_include_string))
-            c_file.write(builtins_file_contents[:split_pos])
-            cls.manually_include_jsmn(c_file)
-            c_file.write(builtins_file_contents[split_pos + len(jsmn_include_string):])
-
-            c_file.print_separator("end of js2c_builtins.h")
-            c_file.print("")
+        c_file.print_separator("js2c_builtins.h")
+        builtins_file_contents = read_source_file(os.path.join(DIR_OF_THIS_FILE, 'js2c_builtins.h'))
+        jsmn_include_string = '#include "jsmn.h"\n'
+        split_pos = builtins_file_contents.index(jsmn_include_string)
+        if split_pos < 0:
+            raise ValueError("{} not found in builtins file".format(jsmn_include_string))
+        c_file.write(builtins_file_contents[:split_pos])
+        cls.manually_include_jsmn(c_file)
+        c_file.write(builtins_file_contents[split_pos + len(jsmn_include_string):])
 
-    def generate_parser_c(self, c_file, h_file_name):
-        c_file = CodeBlockPrinter(c_file)
+        c_file.print_separator("end of js2c_builtins.h")
+        c_file.print("")
 
-        c_file.write(NOTE_FOR_GENERATED_FILES)
+    @classmethod
+    def split_file_names(cls, c_file_name, field_names):
+        """ The internal header, and the (field name, file name) pairs of the units of the split output.
+
+        The names only depend on the root fields, so the file list is stable for build systems.
+        """
+        base_name = re.sub(r"\.c$", "", c_file_name)
+        return base_name + ".internal.h", [(field_name, "{}.{}.c".format(base_name, field_name)) for field_name in field_names]
+
+    def generate_c_preamble(self, c_file, h_file_name):
+        """ Everything before the generated functions: includes, the user prefix, and the builtins """
         c_file.print('#include "{}"'.format(h_file_name))
 
         if self.settings.c_prefix_file is not None:
             c_file.print_separator("User-added prefix")
             c_file.write(self.settings.c_prefix_file.read())
 
+        if self.settings.lean_parser:
+            c_file.print("#define JS2C_LEAN_PARSER")
+        if self.settings.simd_tokenizer:
+            c_file.print("#define JS2C_SIMD_TOKENIZER")
+        if self.settings.compact_tokens:
+            c_file.print("#define JS2C_COMPACT_TOKENS")
+        if self.settings.generate_file_parser:
+            c_file.print("#define JS2C_FILE_PARSER")
+        if self.settings.generate_push_parser:
+            c_file.print("#define JS2C_PUSH_PARSER")
+        if self.settings.generate_msgpack_parser:
+            c_file.print("#define JS2C_MSGPACK_PARSER")
+        if self.settings.structured_errors:
+            c_file.print("#define JS2C_STRUCTURED_ERRORS")
+        if self.settings.table_driven:
+            c_file.print("#define JS2C_TABLE_PARSER")
         if self.settings.include_external_builtins_file:
             c_file.print('#include "{}"'.format(self.settings.include_external_builtins_file))
         else:
             self.manually_include_builtins(c_file)
+
+    def generate_parser_c(self, c_file, h_file_name):
+        if self.settings.split_output:
+            self.generate_split_parser_c(c_file, h_file_name)
+            return
+        c_file = CodeBlockPrinter(c_file)
+
+        c_file.write(NOTE_FOR_GENERATED_FILES)
+        self.generate_c_preamble(c_file, h_file_name)
+        # The parsers are generated first, because that's when the error helpers they use are collected.
+        parsers_file = CodeBlockPrinter(io.StringIO())
+        if self.table_generator is not None:
+            self.table_generator.generate_tables(parsers_file)
+        else:
+            self.root_generator.generate_parser_bodies(parsers_file)
+            if self.settings.generate_validator:
+                self.root_generator.generate_validator_bodies(parsers_file)
+        if self.settings.generate_patcher:
+            self.root_generator.generate_patcher_bodies(parsers_file)
+        if self.error_helper_cache.helpers:
+            c_file.print_separator("Generated error helpers")
+            c_file.print("")
+            self.error_helper_cache.generate_helpers(c_file)
         c_file.print_separator("Generated parsers")
         c_file.print("")
-        self.root_generator.generate_parser_bodies(c_file)
+        c_file.file.write(parsers_file.file.getvalue())
+        self.generate_entry_points(c_file)
 
-        max_token_num = self.root_generator.max_token_num()
-        if self.settings.allow_additional_properties is not None:
-            max_token_num += self.settings.allow_additional_properties
+    def generate_split_parser_c(self, c_file, h_file_name):
+        """ Generate the parsers of the root fields into separate translation units, and the rest into c_file.
+
+        The units share an internal header with the builtins, and each unit declares the generated functions it
+        calls, as deduplicated functions may be in other units. This way a schema change only changes the units
+        it affects (unless it changes the types), so only those are recompiled. The units and the header are
+        returned by generate_extra_outputs.
+        """
+        internal_h_name, unit_names = self.split_file_names(c_file.name, self.root_generator.fields)
+        include_line = '#include "{}"'.format(os.path.basename(internal_h_name))
+        # The units are generated first, so that the error helpers they use are collected for the main unit.
+        unit_bodies = [(unit_name, self.generate_split_unit_body(field_name)) for field_name, unit_name in unit_names]
+        main_body = self.generate_split_main_body()
+        self.split_outputs = [(internal_h_name, self.generate_split_internal_h(internal_h_name, h_file_name))]
+
+        declarations = self.split_function_declarations()
+        for unit_name, unit_body in unit_bodies:
+            unit_file = CodeBlockPrinter(io.StringIO())
+            self.generate_split_unit(unit_file, include_line, unit_body, declarations)
+            self.split_outputs.append((unit_name, unit_file.file.getvalue()))
+        self.generate_split_unit(CodeBlockPrinter(c_file), include_line, main_body, declarations)
+
+    def generate_split_unit_body(self, field_name):
+        """ The generated functions of a root field, for its own unit """
+        field_generator = self.root_generator.fields[field_name]
+        unit_body = CodeBlockPrinter(io.StringIO())
+        unit_body.print_separator("Generated parsers of '{}'".format(field_name))
+        unit_body.print("")
+        # Units without functions (e.g. for simple fields) are still generated, to keep the file list stable.
+        field_generator.generate_parser_bodies(unit_body)
+        if self.settings.generate_validator:
+            field_generator.generate_validator_bodies(unit_body)
+        if self.settings.generate_patcher and isinstance(field_generator, ObjectGenerator):
+            field_generator.generate_patcher_bodies(unit_body)
+        return unit_body.file.getvalue()
+
+    def generate_split_main_body(self):
+        """ The error helpers, the functions of the root object and the entry points, for the main unit """
+        parsers_file = CodeBlockPrinter(io.StringIO())
+        self.root_generator.generate_parser_function(self.root_generator.generate_parser_body, parsers_file)
+        if self.settings.generate_validator:
+            self.root_generator.generate_validator_function(self.root_generator.generate_validator_body, parsers_file)
+        if self.settings.generate_patcher:
+            self.root_generator.generate_patcher_function(parsers_file)
+        main_body = CodeBlockPrinter(io.StringIO())
+        if self.error_helper_cache.helpers:
+            main_body.print_separator("Generated error helpers")
+            main_body.print("")
+            self.error_helper_cache.generate_helpers(main_body, linkage="JS2C_INTERNAL")
+        main_body.print_separator("Generated parsers")
+        main_body.print("")
+        main_body.file.write(parsers_file.file.getvalue())
+        self.generate_entry_points(main_body)
+        return main_body.file.getvalue()
+
+    def generate_split_internal_h(self, internal_h_name, h_file_name):
+        """ The header shared by the units, with the builtins and the C prefix """
+        internal_h_file = CodeBlockPrinter(io.StringIO())
+        internal_h_file.write(NOTE_FOR_GENERATED_FILES)
+        header_guard_name = re.sub("[^A-Z0-9]", "_", os.path.basename(internal_h_name).upper())
+        internal_h_file.print("#ifndef {}".format(header_guard_name))
+        internal_h_file.print("#define {}".format(header_guard_name))
+        self.generate_c_preamble(internal_h_file, h_file_name)
+        internal_h_file.print("#endif /* {} */".format(header_guard_name))
+        internal_h_file.print("")
+        return internal_h_file.file.getvalue()
+
+    def split_function_declarations(self):
+        """ Declarations of all generated functions of a split parser by name """
+        declarations = self.error_helper_cache.helper_declarations()
+        for parser_code, function_name in self.root_generator.parser_cache.parsers.items():
+            # The first line of the function is its signature, with the opening brace of the body
+            signature = parser_code.strip().split("\n", 1)[0].rstrip(" {")
+            signature = signature.replace(ParserCache.PARSER_NAME_PLACEHOLDER, function_name, 1)
+            # The cached name is without the parse_, validate_ or patch_ prefix
+            declarations[re.search(r"(\w+)\(", signature).group(1)] = signature + ";"
+        return declarations
+
+    @classmethod
+    def generate_split_unit(cls, out_file, include_line, body, declarations):
+        out_file.write(NOTE_FOR_GENERATED_FILES)
+        out_file.print(include_line)
+        called_names = set(re.findall(r"\b(\w+)\(", body))
+        used_declarations = [declaration for name, declaration in declarations.items() if name in called_names]
+        if used_declarations:
+            out_file.print_separator("Declarations of the generated functions used")
+            for declaration in used_declarations:
+                out_file.print(declaration)
+            out_file.print("")
+        out_file.file.write(body)
+
+    def generate_entry_points(self, c_file):
+        max_token_num = self.max_token_num()
         self.generate_root_parser(c_file, max_token_num)
+        if self.settings.generate_batch_parser:
+            self.generate_root_batch_parser(c_file)
+        if self.settings.generate_file_parser:
+            self.generate_root_file_parser(c_file, max_token_num)
+        if self.settings.generate_push_parser:
+            self.generate_root_push_parser(c_file, max_token_num)
+        if self.settings.generate_msgpack_parser:
+            self.generate_root_msgpack_parser(c_file, max_token_num)
+        if self.settings.generate_validator:
+            self.generate_root_validator(c_file, max_token_num)
+        if self.settings.generate_patcher:
+            self.generate_root_patcher(c_file, max_token_num)
+        if self.settings.structured_errors:
+            self.generate_structured_error_functions(c_file)
 
         if self.settings.c_postfix_file:
             c_file.print_separator("User-added postfix")
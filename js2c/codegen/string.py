@@ -22,7 +22,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator, CType, SchemaError
+from .base import Generator, CType, SchemaError, TypeLayout
+from .error_helper_cache import ErrorArgument, StructuredError, error_value
 
 
 class StringType(CType):
@@ -36,11 +37,11 @@ class StringType(CType):
         )
         out_file.print("")
 
-    def __eq__(self, other):
-        return (
-            super().__eq__(other) and
-            self.max_length == other.max_length
-        )
+    def layout(self):
+        return TypeLayout(self.max_length + 1, 1, 0)
+
+    def structure(self):
+        return (self.max_length,)
 
 
 class StringGenerator(Generator):
@@ -82,21 +83,24 @@ class StringGenerator(Generator):
     def generate_custom_parser_call(self, src, src_length, out_var_name, out_file):
         out_file.print("const char *error = NULL;")
         parser_call = "{}({}, {}, {}, &error)".format(self.js2cParseFunction, src, src_length, out_var_name)
-        with out_file.if_block(parser_call):
+        with self.error_if_block(parser_call, out_file):
             self.generate_logged_error([
                 "Error parsing '%s', value=\\\"%.*s\\\": %s",
                 "parse_state->current_key",
-                src_length,
-                src,
-                "error ? error : \"error calling {}\"".format(self.js2cParseFunction),
-            ], out_file)
+                ErrorArgument("int", src_length),
+                ErrorArgument("const char *", src),
+                ErrorArgument("const char *", "error ? error : \"error calling {}\"".format(self.js2cParseFunction)),
+            ], StructuredError(
+                "JS2C_ERROR_CUSTOM_PARSER",
+                actual=error_value("s", "error ? error : \"error calling {}\"".format(self.js2cParseFunction)),
+            ), out_file)
 
     def generate_parser_call(self, out_var_name, out_file):
         if self.js2cParseFunction is not None:
             length_check = \
                 "builtin_check_current_string(parse_state, {}, {})" \
                 .format(self.minLength, self.maxLength)
-            with out_file.if_block(length_check):
+            with self.error_if_block(length_check, out_file):
                 out_file.print("return true;")
 
             self.generate_custom_parser_call(
@@ -110,9 +114,22 @@ class StringGenerator(Generator):
             length_check = \
                 "builtin_parse_string(parse_state, {}[0], {}, {})" \
                 .format(out_var_name, self.minLength, self.maxLength)
-            with out_file.if_block(length_check):
+            with self.error_if_block(length_check, out_file):
                 out_file.print("return true;")
 
+    def generate_validator_call(self, out_file):
+        if self.js2cParseFunction is not None:
+            # The custom parser may reject the string, so it has to be called
+            out_file.print("{} custom_parse_tmp;".format(self.js2cType))
+            self.generate_parser_call("&custom_parse_tmp", out_file)
+        else:
+            length_check = \
+                "builtin_check_current_string(parse_state, {}, {})" \
+                .format(self.minLength, self.maxLength)
+            with self.error_if_block(length_check, out_file):
+                out_file.print("return true;")
+            out_file.print("parse_state->current_token += 1;")
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -146,5 +163,10 @@ class StringGenerator(Generator):
                 )
             )
 
+    def default_initializer(self):
+        if self.js2cDefault is not None or self.js2cParseFunction is not None or self.default is None:
+            return None
+        return '"{}"'.format(self.default)
+
     def max_token_num(self):
         return 1
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from .base import SchemaError
+from .array import ArrayGenerator
+from .bool import BoolGenerator
+from .enum import EnumGenerator
+from .float import FloatGenerator
+from .integer import IntegerGeneratorBase
+from .object import ObjectGenerator
+from .string import StringGenerator
+
+
+class TableParserGenerator:
+    """ Serializes a schema into constant js2c_node_t descriptor tables, for the generic builtin_table_parse.
+
+    The tables take much less code than the specialized parse_ functions, at the cost of some speed, so they
+    are meant for targets where code size matters most. The parsed structs, the checks and the errors are the
+    same. Identical nodes, field lists and label lists are only emitted once.
+    """
+    # builtin_table_parse keeps the seen flags in a fixed bitmap
+    MAX_FIELDS = 256
+    # The members of js2c_node_t, in declaration order
+    NODE_MEMBERS = (
+        "kind", "flags", "size", "radix", "min_count", "max_count", "item_offset", "item_size", "item", "fields",
+        "labels", "minimum", "maximum", "default_value",
+    )
+
+    def __init__(self, root_generator, name):
+        self.root_generator = root_generator
+        self.name = name
+        self.nodes = []
+        self.node_indices = {}
+        self.tables = []
+        self.table_names = {}
+        self.root_node_index = self.node_index(root_generator)
+
+    @property
+    def nodes_name(self):
+        return "{}_nodes".format(self.name)
+
+    def node_reference(self, node_index):
+        return "&{}[{}]".format(self.nodes_name, node_index)
+
+    def root_node_reference(self):
+        return self.node_reference(self.root_node_index)
+
+    def table_name(self, kind, declaration_format, lines):
+        """ The name of a constant array with the given lines, which is only declared once for the same lines """
+        key = (kind, tuple(lines))
+        if key not in self.table_names:
+            kind_count = sum(1 for table_kind, _ in self.table_names if table_kind == kind)
+            table_name = "{}_{}_{}".format(self.name, kind, kind_count)
+            self.table_names[key] = table_name
+            self.tables.append((declaration_format.format(table_name), lines))
+        return self.table_names[key]
+
+    def node_index(self, generator):
+        """ The index of the node of the generator in the node table. Children get their nodes first. """
+        if generator.js2cDefault is not None:
+            raise SchemaError(generator, "js2cDefault is not supported by the table-driven parser")
+        members = sorted(self.node_members(generator), key=lambda member: self.NODE_MEMBERS.index(member[0]))
+        initializer = "{{{}}}".format(", ".join(".{} = {}".format(member, value) for member, value in members))
+        if initializer not in self.node_indices:
+            self.node_indices[initializer] = len(self.nodes)
+            self.nodes.append((generator.path_in_schema or '<root>', initializer))
+        return self.node_indices[initializer]
+
+    def node_members(self, generator):
+        """ The (member, value) pairs of the designated initializer of the node of the generator """
+        # pylint: disable=too-many-return-statements
+        if isinstance(generator, ObjectGenerator):
+            return self.object_members(generator)
+        if isinstance(generator, ArrayGenerator):
+            return self.array_members(generator)
+        if isinstance(generator, IntegerGeneratorBase):
+            return self.integer_members(generator)
+        if isinstance(generator, FloatGenerator):
+            return self.float_members(generator)
+        if isinstance(generator, BoolGenerator):
+            members = [("kind", "JS2C_NODE_BOOL")]
+            if generator.default is not None:
+                members += [("flags", "JS2C_NODE_HAS_DEFAULT"), ("default_value", "{{.u = {}}}".format(int(generator.default)))]
+            return members
+        if isinstance(generator, StringGenerator):
+            if generator.js2cParseFunction is not None:
+                raise SchemaError(generator, "js2cParseFunction is not supported by the table-driven parser")
+            members = [
+                ("kind", "JS2C_NODE_STRING"),
+                ("min_count", str(generator.minLength)),
+                ("max_count", str(generator.maxLength)),
+            ]
+            if generator.default is not None:
+                members += [("flags", "JS2C_NODE_HAS_DEFAULT"), ("default_value", '{{.s = "{}"}}'.format(generator.default))]
+            return members
+        if isinstance(generator, EnumGenerator):
+            return self.enum_members(generator)
+        raise SchemaError(generator, "This type is not supported by the table-driven parser")
+
+    def object_members(self, generator):
+        if generator.skipped_fields:
+            raise SchemaError(generator, "Projections are not supported by the table-driven parser")
+        if len(generator.fields) > self.MAX_FIELDS:
+            raise SchemaError(
+                generator, "The table-driven parser supports at most {} fields per object".format(self.MAX_FIELDS)
+            )
+        flags = []
+        if generator.has_default_value():
+            flags.append("JS2C_NODE_HAS_DEFAULT")
+        if generator.settings.allow_additional_properties:
+            flags.append("JS2C_NODE_ADDITIONAL_PROPERTIES")
+        members = [("kind", "JS2C_NODE_OBJECT")]
+        if flags:
+            members.append(("flags", " | ".join(flags)))
+        members.append(("max_count", str(len(generator.fields))))
+        field_lines = []
+        for field_name, field_generator in generator.fields.items():
+            if not field_generator.has_default_value() and field_name not in generator.required:
+                raise SchemaError(generator, "Field '{}' must be required or have a default value".format(field_name))
+            field_lines.append('{{"{name}", {node}, offsetof({c_type}, {name})}},'.format(
+                name=field_name,
+                node=self.node_reference(self.node_index(field_generator)),
+                c_type=generator.c_type,
+            ))
+        if field_lines:
+            members.append(("fields", self.table_name("fields", "static const js2c_field_t {}[]", field_lines)))
+        return members
+
+    def array_members(self, generator):
+        if generator.js2cColumnar:
+            raise SchemaError(generator, "Columnar arrays are not supported by the table-driven parser")
+        members = [("kind", "JS2C_NODE_ARRAY")]
+        if generator.minItems == 0:
+            members.append(("flags", "JS2C_NODE_HAS_DEFAULT"))
+        members += [
+            ("min_count", str(generator.minItems)),
+            ("max_count", str(generator.maxItems)),
+            ("item_offset", "offsetof({}, items)".format(generator.c_type)),
+            ("item_size", "sizeof({})".format(generator.item_generator.c_type)),
+            ("item", self.node_reference(self.node_index(generator.item_generator))),
+        ]
+        return members
+
+    @classmethod
+    def bound_members(cls, member, inclusive, exclusive, format_value):
+        """ Flags and members of a minimum or maximum. If both bounds are given, the stricter one is checked. """
+        # pylint: disable=too-many-arguments
+        if inclusive is None and exclusive is None:
+            return [], []
+        stricter = max if member == "minimum" else min
+        flag_name = "JS2C_NODE_HAS_{}".format(member.upper())
+        exclusive_flag_name = "JS2C_NODE_EXCLUSIVE_{}".format(member.upper())
+        if exclusive is not None and (inclusive is None or stricter(inclusive, exclusive) == exclusive):
+            return [flag_name, exclusive_flag_name], [(member, format_value(exclusive))]
+        return [flag_name], [(member, format_value(inclusive))]
+
+    def integer_members(self, generator):
+        if generator.c_type.is_unsigned():
+            kind = "JS2C_NODE_UNSIGNED"
+            format_value = "{{.u = {}ULL}}".format
+        else:
+            kind = "JS2C_NODE_SIGNED"
+            format_value = "{{.i = {}LL}}".format
+        flags = []
+        if generator.number_allowed:
+            flags.append("JS2C_NODE_NUMBER_ALLOWED")
+        if generator.string_allowed:
+            flags.append("JS2C_NODE_STRING_ALLOWED")
+        members = []
+        for member, inclusive, exclusive in (
+            ("minimum", generator.minimum, generator.exclusiveMinimum),
+            ("maximum", generator.maximum, generator.exclusiveMaximum),
+        ):
+            bound_flags, bound_members = self.bound_members(member, inclusive, exclusive, format_value)
+            flags += bound_flags
+            members += bound_members
+        if generator.default is not None:
+            flags.append("JS2C_NODE_HAS_DEFAULT")
+            members.append(("default_value", format_value(generator.default)))
+        return [
+            ("kind", kind),
+            ("flags", " | ".join(flags)),
+            ("size", "sizeof({})".format(generator.c_type)),
+            ("radix", str(generator.radix)),
+        ] + members
+
+    def float_members(self, generator):
+        format_value = "{{.d = {}}}".format
+        flags = []
+        members = []
+        for member, inclusive, exclusive in (
+            ("minimum", generator.minimum, generator.exclusiveMinimum),
+            ("maximum", generator.maximum, generator.exclusiveMaximum),
+        ):
+            bound_flags, bound_members = self.bound_members(member, inclusive, exclusive, format_value)
+            flags += bound_flags
+            members += bound_members
+        if generator.default is not None:
+            flags.append("JS2C_NODE_HAS_DEFAULT")
+            members.append(("default_value", format_value(generator.default)))
+        if flags:
+            members.insert(0, ("flags", " | ".join(flags)))
+        return [("kind", "JS2C_NODE_DOUBLE")] + members
+
+    def enum_members(self, generator):
+        label_lines = ['"{}",'.format(label) for label in generator.enum]
+        members = [("kind", "JS2C_NODE_ENUM")]
+        if generator.default is not None:
+            members.append(("flags", "JS2C_NODE_HAS_DEFAULT"))
+        members += [
+            ("size", "sizeof({})".format(generator.c_type)),
+            ("max_count", str(len(generator.enum))),
+            ("labels", self.table_name("labels", "static const char *const {}[]", label_lines)),
+        ]
+        if generator.default is not None:
+            members.append(("default_value", "{{.u = {}}}".format(generator.convert_enum_label(generator.default))))
+        return members
+
+    def generate_tables(self, out_file):
+        # The node table is declared first, as the field tables point into it
+        out_file.print("static const js2c_node_t {}[{}];".format(self.nodes_name, len(self.nodes)))
+        out_file.print("")
+        for declaration, lines in self.tables:
+            out_file.print("{} = {{".format(declaration))
+            with out_file.indent():
+                for line in lines:
+                    out_file.print(line)
+            out_file.print("};")
+            out_file.print("")
+        out_file.print("static const js2c_node_t {}[{}] = {{".format(self.nodes_name, len(self.nodes)))
+        with out_file.indent():
+            for path, initializer in self.nodes:
+                out_file.print("/* {} */".format(path))
+                out_file.print(initializer + ",")
+        out_file.print("};")
+        out_file.print("")
+
+    def generate_parser_call(self, out_var_name, out_file):
+        """ Parse the root value into out_var_name, which is NULL for validation only """
+        with self.root_generator.error_if_block(
+            "builtin_table_parse(parse_state, {}, {})".format(self.root_node_reference(), out_var_name), out_file
+        ):
+            out_file.print("return true;")
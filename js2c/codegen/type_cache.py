@@ -25,6 +25,7 @@
 
 
 class TypeCache:
+    """ Types by name. Types are compared by their fingerprint, so a lookup is O(1) even for deep types. """
     #pylint: disable=too-few-public-methods
     def __init__(self):
         self.types = {}
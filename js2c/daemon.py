@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import copy
+import io
+import json
+import os
+import socketserver
+import sys
+import time
+
+from .files import file_signature, write_if_changed
+from .schema import load_schema
+from .settings import Settings
+from .codegen.root import RootGenerator
+
+
+class SchemaCache:
+    """ Loaded schemas (with their $refs and allOfs resolved), kept until the schema file changes. """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.schemas = {}
+
+    def get(self, path):
+        signature = file_signature(path)
+        if path not in self.schemas or self.schemas[path][0] != signature:
+            with open(path, encoding='utf-8') as schema_file:
+                self.schemas[path] = (signature, load_schema(schema_file))
+        # Generators may modify the schema, so they get their own copy.
+        return copy.deepcopy(self.schemas[path][1])
+
+
+class GenerationJob:
+    """ Generation of a .c and .h file pair from a schema file, regenerated only if one of its inputs changed. """
+
+    def __init__(self, schema_path, c_path, h_path, settings_args):
+        self.schema_path = schema_path
+        self.c_path = c_path
+        self.h_path = h_path
+        self.settings_args = settings_args
+        # Signatures of all the files the last generation read, or None if the last generation failed.
+        self.dependencies = None
+        self.outputs = [c_path, h_path]
+
+    def is_up_to_date(self):
+        if self.dependencies is None:
+            return False
+        if not all(os.path.exists(path) for path in self.outputs):
+            return False
+        return all(file_signature(path) == signature for path, signature in self.dependencies.items())
+
+    def run(self, schema_cache):
+        """ Generate the files, if needed. Returns whether they were regenerated. """
+        if self.is_up_to_date():
+            return False
+        # Failed generations are always retried, as the file that needs fixing may not even be known.
+        self.dependencies = None
+        dependency_paths = [self.schema_path]
+        settings = None
+        try:
+            schema = schema_cache.get(self.schema_path)
+            settings = Settings(Settings.convert_args(self.settings_args), schema.get('js2cSettings', {}))
+            dependency_paths.extend(settings_file.name for settings_file in settings.file_fields())
+            # Signatures are taken before reading, so that changes made during generation are not missed.
+            dependencies = {path: file_signature(path) for path in dependency_paths}
+            root_generator = RootGenerator(schema, settings)
+            h_file = io.StringIO()
+            h_file.name = self.h_path
+            c_file = io.StringIO()
+            c_file.name = self.c_path
+            root_generator.generate_parser_h(h_file)
+            root_generator.generate_parser_c(c_file, os.path.basename(self.h_path))
+            extra_outputs = root_generator.generate_extra_outputs(self.c_path, self.h_path)
+        finally:
+            if settings is not None:
+                for settings_file in settings.file_fields():
+                    settings_file.close()
+        write_if_changed(self.h_path, h_file.getvalue())
+        write_if_changed(self.c_path, c_file.getvalue())
+        for path, contents in extra_outputs:
+            write_if_changed(path, contents)
+        self.outputs = [self.c_path, self.h_path] + [path for path, _ in extra_outputs]
+        self.dependencies = dependencies
+        return True
+
+
+class GeneratorDaemon:
+    """ A long-running generator, which keeps everything that does not depend on a schema in memory.
+
+    Generation requests are JSON objects, with "schema_file", "c_file" and "h_file" fields, and an optional
+    "settings" object, containing settings in the same format as js2cSettings. Each request is answered with a
+    JSON object with a "status" of "ok" or "error", and "message" or "regenerated" and "time_ms" fields.
+    """
+
+    def __init__(self, settings_args):
+        self.settings_args = settings_args
+        self.schema_cache = SchemaCache()
+        self.jobs = {}
+
+    def get_job(self, schema_path, c_path, h_path, settings_args=None):
+        job_args = dict(self.settings_args)
+        job_args.update(settings_args or {})
+        key = (schema_path, c_path, h_path)
+        if key not in self.jobs or self.jobs[key].settings_args != job_args:
+            self.jobs[key] = GenerationJob(schema_path, c_path, h_path, job_args)
+        return self.jobs[key]
+
+    def run_job(self, job):
+        start_time = time.perf_counter()
+        try:
+            regenerated = job.run(self.schema_cache)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Whatever goes wrong with one job, the daemon keeps serving the others.
+            return {"status": "error", "message": "{}: {}".format(job.schema_path, e)}
+        return {
+            "status": "ok",
+            "regenerated": regenerated,
+            "time_ms": round((time.perf_counter() - start_time) * 1000, 3),
+        }
+
+    def handle_request(self, request_line):
+        try:
+            request = json.loads(request_line)
+            job = self.get_job(request["schema_file"], request["c_file"], request["h_file"], request.get("settings"))
+        except (ValueError, KeyError, TypeError) as e:
+            return {"status": "error", "message": "Invalid request: {}".format(e)}
+        return self.run_job(job)
+
+    def serve_stream(self, in_stream, out_stream):
+        """ Answer requests, one per line, until the end of in_stream. """
+        for request_line in in_stream:
+            if not request_line.strip():
+                continue
+            out_stream.write(json.dumps(self.handle_request(request_line)) + "\n")
+            out_stream.flush()
+
+    def serve_socket(self, socket_path):
+        """ Answer requests on a unix domain socket, with the same protocol as serve_stream. """
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.serve_stream(
+                    io.TextIOWrapper(self.rfile, encoding='utf-8'),
+                    io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True),
+                )
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        with socketserver.UnixStreamServer(socket_path, RequestHandler) as server:
+            server.serve_forever()
+
+    def watch(self, file_triplets, poll_interval, log_file=sys.stderr):
+        """ Regenerate the (schema, c, h) file triplets whenever their inputs change. Never returns. """
+        jobs = [self.get_job(*triplet) for triplet in file_triplets]
+        last_errors = {}
+        while True:
+            for job in jobs:
+                result = self.run_job(job)
+                if result["status"] == "error":
+                    # Failed jobs are retried on every poll, but the same error is only reported once.
+                    if last_errors.get(job.c_path) != result["message"]:
+                        print(result["message"], file=log_file)
+                    last_errors[job.c_path] = result["message"]
+                else:
+                    last_errors.pop(job.c_path, None)
+                    if result["regenerated"]:
+                        print("Regenerated {} in {} ms".format(job.c_path, result["time_ms"]), file=log_file)
+            log_file.flush()
+            time.sleep(poll_interval)
@@ -61,6 +61,8 @@ def resolve_ref(full_schema, part_to_resolve):
     replacement = full_schema
     while ref_str:
         part, ref_str = ref_str.split('/', 1)
+        if not isinstance(replacement, dict) or part not in replacement:
+            raise ValueError("Reference {} not found".format(part_to_resolve["$ref"]))
         replacement = replacement[part]
     return replacement
 # WARNING OVER
@@ -33,6 +33,22 @@ def snake_to_camel_case(text: str):
     return text[0].lower() + text[1:]
 
 
+def str_to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError("Boolean value expected, got '{}'".format(value))
+
+
+def str_to_list(value):
+    if isinstance(value, list):
+        return value
+    return value.split(",")
+
+
 class Settings:
     # pylint: disable=too-few-public-methods
     FIELDS = [
@@ -74,6 +90,154 @@ class Settings:
             "with this path will be generated. Be sure to copy js2c_builtins.h there.",
             metavar="file",
         ),
+        SettingsField(
+            "cold_error_paths",
+            type=str_to_bool,
+            help="Move error reporting out of the parser functions into separate, cold functions, and mark all error \n"
+            "branches as unlikely. The reported errors stay the same, but the code for valid documents gets more compact.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "lean_parser",
+            type=str_to_bool,
+            help="Generate a lean parser for production use: no error messages are formatted, and the current key is \n"
+            "not tracked. Only the position of the error is recorded, and it is passed to LOG_ERROR once, with a generic message.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "structured_errors",
+            type=str_to_bool,
+            help="In lean mode, record errors as a js2c_error_t (an error code, the position and token index, the id \n"
+            "of the schema path, and the expected and actual values), and pass it to LOG_STRUCTURED_ERROR(error) instead \n"
+            "of LOG_ERROR. Messages are only formatted on request, with json_format_error_<id>.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "simd_tokenizer",
+            type=str_to_bool,
+            help="Tokenize with a built-in, jsmn compatible tokenizer. On x86 with GCC or clang, it scans strings and \n"
+            "whitespace with AVX2 or SSE2 instructions, whichever the CPU supports (checked on first use, no -mavx2 \n"
+            "needed). Other CPUs and compilers get scalar code.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "compact_tokens",
+            type=str_to_bool,
+            help="Store tokens in 12 bytes instead of the 16 of jsmn, which shrinks the token buffer by a quarter. \n"
+            "Tokens are produced by the built-in tokenizer (as with --simd-tokenizer) in this format.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "table_driven",
+            type=str_to_bool,
+            help="Describe the schema with constant tables, which are run by a generic parser in the builtins, instead \n"
+            "of generating a parser function for every type. The code is much smaller, but parsing is slower.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_file_parser",
+            type=str_to_bool,
+            help="Also generate a json_parse_<id>_file(path, out) function, which parses a file directly from a \n"
+            "read-only memory mapping of it. Requires POSIX mmap.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_push_parser",
+            type=str_to_bool,
+            help="Also generate json_parse_<id>_init, _feed and _finish functions, which parse a document received in \n"
+            "chunks. The chunks are tokenized as they arrive by the built-in tokenizer, into a buffer given by the caller.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_msgpack_parser",
+            type=str_to_bool,
+            help="Also generate a msgpack_parse_<id>(data, length, buffer, buffer_size, out) function, which parses a \n"
+            "MessagePack document into the same struct, with the same checks.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_batch_parser",
+            type=str_to_bool,
+            help="Also generate a json_parse_<id>_batch(json_strings, n, out, failed_index) function, which parses \n"
+            "n documents into a contiguous array of structs.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_validator",
+            type=str_to_bool,
+            help="Also generate a json_validate_<id>(json_string, json_length) function, which does all the checks of the \n"
+            "parser, but does not store the parsed data anywhere.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "generate_patcher",
+            type=str_to_bool,
+            help="Also generate a json_patch_<id>(json_string, json_length, inout, changed_fields) function, which \n"
+            "applies a JSON merge patch (RFC 7386) to an already parsed structure.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "split_output",
+            type=str_to_bool,
+            help="Split the generated parser into translation units that can be compiled in parallel: an internal \n"
+            "header (x.internal.h for x.c), the C file with the entry points, and an x.<field>.c file for every field \n"
+            "of the root object. All C files have to be compiled and linked. Unchanged files are not rewritten.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "python_extension_file",
+            type=str,
+            help="Also generate a CPython extension module into this file, with parse() and parse_many() functions, \n"
+            "which return dicts. The module is named after the file (up to the first dot). It includes the generated .c file.",
+            metavar="file",
+        ),
+        SettingsField(
+            "python_setup_file",
+            type=str,
+            help="Also generate a setuptools script into this file, which builds the CPython extension module.",
+            metavar="file",
+        ),
+        SettingsField(
+            "report",
+            type=str,
+            help="Write a size report into this file: estimated type sizes and padding, token counts per schema path, \n"
+            "the stack frame of the parse function, and the generated parser functions. The report is in JSON if the \n"
+            "file name ends with .json, and human-readable text otherwise.",
+            metavar="file",
+        ),
+        SettingsField(
+            "max_type_size",
+            type=int,
+            help="Fail the generation if the estimated size of any generated type is larger than this.",
+            metavar="bytes",
+        ),
+        SettingsField(
+            "max_stack_size",
+            type=int,
+            help="Fail the generation if the estimated stack frame of the parse function (mostly the token buffer) \n"
+            "is larger than this.",
+            metavar="bytes",
+        ),
+        SettingsField(
+            "max_tokens",
+            type=int,
+            help="Fail the generation if the maximum number of tokens in a document is larger than this.",
+            metavar="tokens",
+        ),
+        SettingsField(
+            "projection",
+            type=str_to_list,
+            help="Only parse the fields selected by these JSON pointers (comma separated on the command line), e.g. \n"
+            "/foo/bar. Arrays are transparent in the pointers. All other fields are skipped without any validation.",
+            metavar="pointers",
+        ),
+        SettingsField(
+            "projection_name",
+            type=str,
+            help="Use this name instead of the schema's $id for the projected parser and its types, so that several \n"
+            "projections of the same schema can be used side by side.",
+            metavar="name",
+        ),
     ]
 
     def __init__(self, args, settings_json):
@@ -91,13 +255,40 @@ class Settings:
     def parse_field(self, field_desc, field_data):
         setattr(self, field_desc.name, field_desc.type(field_data))
 
+    def file_fields(self):
+        """ The files opened for the file type settings (prefix and postfix files, etc.) """
+        return [
+            getattr(self, field.name) for field in self.FIELDS
+            if isinstance(field.type, argparse.FileType) and getattr(self, field.name) is not None
+        ]
+
+    @classmethod
+    def convert_args(cls, raw_args):
+        """ Convert settings given as strings (like on the command line) to their proper types.
+
+        Setting names can be in snake or camel case. The result can be used as the args of a Settings object.
+        """
+        result = {}
+        for field in cls.FIELDS:
+            field_name_in_camel = snake_to_camel_case(field.name)
+            for name in (field.name, field_name_in_camel):
+                if raw_args.get(name, None) is not None:
+                    result[field.name] = field.type(raw_args[name])
+        return result
+
     @classmethod
-    def fill_argparse(cls, parser):
+    def fill_argparse(cls, parser, convert_values=True):
+        """ Add all settings to an argparse parser.
+
+        With convert_values=False, the values are kept as strings, and can be converted with convert_args later.
+        This is needed if settings objects are created more than once, because file settings are opened when
+        they are converted.
+        """
         for field in cls.FIELDS:
             parser.add_argument(
                 "--" + field.name.replace('_', '-'),
                 metavar=field.metavar,
-                type=field.type,
+                type=field.type if convert_values else str,
                 help=field.help,
                 default=None,
             )
@@ -30,6 +30,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <limits.h>
 
 #ifndef JSMN_STATIC
 #define JSMN_STATIC
@@ -45,19 +46,99 @@
 #define LOG_ERROR(position, ...)
 #endif
 
+#if defined(__GNUC__)
+#define JS2C_UNLIKELY(condition) __builtin_expect(!!(condition), 0)
+#define JS2C_COLD __attribute__((cold, noinline))
+#define JS2C_INTERNAL __attribute__((visibility("hidden")))
+#else
+#define JS2C_UNLIKELY(condition) (condition)
+#define JS2C_COLD
+#define JS2C_INTERNAL
+#endif
+
+#ifdef JS2C_COMPACT_TOKENS
+/* 12 bytes instead of the 16 of jsmntok_t (or 20 with JSMN_PARENT_LINKS). The fields have the same names
+ * and meanings, so tokens are read the same way. Positions are ints in both, so the limit on the size
+ * of documents does not change. Only the built-in tokenizer can produce these tokens. */
+typedef struct js2c_token_s {
+    int start;
+    int end;
+    unsigned int type : 4;
+    unsigned int size : 28;
+} js2c_token_t;
+#else
+typedef jsmntok_t js2c_token_t;
+#endif
+
 typedef struct parse_state_s {
     const char *json_string;
     const char *current_key;
-    jsmntok_t *tokens;
+    js2c_token_t *tokens;
     uint64_t current_token;
     uint64_t max_token_num;
+    int error_position;
+#ifdef JS2C_STRUCTURED_ERRORS
+    js2c_error_t error;
+#endif
 } parse_state_t;
 
+/* In lean mode (JS2C_LEAN_PARSER), errors are not formatted or logged at all,
+ * only the position of the error is recorded in the parse state. */
+#ifdef JS2C_LEAN_PARSER
+#define REPORT_ERROR(parse_state, position, ...) ((parse_state)->error_position = (position));
+#else
+#define REPORT_ERROR(parse_state, position, ...) LOG_ERROR(position, __VA_ARGS__)
+#endif
+
 #define CURRENT_TOKEN(parse_state) ((parse_state)->tokens[(parse_state)->current_token])
 #define CURRENT_STRING(parse_state) ((parse_state)->json_string + CURRENT_TOKEN(parse_state).start)
 #define CURRENT_STRING_LENGTH(parse_state) (CURRENT_TOKEN(parse_state).end - CURRENT_TOKEN(parse_state).start)
 #define CURRENT_STRING_FOR_ERROR(parse_state) CURRENT_STRING_LENGTH(parse_state), CURRENT_STRING(parse_state)
 
+/* With structured errors (JS2C_STRUCTURED_ERRORS, only in lean mode), every error site also records a
+ * js2c_error_t, with an error code instead of a message. It is passed to LOG_STRUCTURED_ERROR once, in the
+ * public function, so rejecting a document costs about as much as accepting it. */
+#ifdef JS2C_STRUCTURED_ERRORS
+#ifndef LOG_STRUCTURED_ERROR
+#define LOG_STRUCTURED_ERROR(error)
+#endif
+
+#define JS2C_ERROR_VALUE(member, value) ((js2c_error_value_t){.member = (value)})
+#define JS2C_NO_ERROR_VALUE JS2C_ERROR_VALUE(i, 0)
+#define RECORD_ERROR(parse_state, code, expected, actual) builtin_record_error((parse_state), (code), (expected), (actual));
+/* Errors are passed up through all the parent parsers, and only the innermost one sets the path */
+#define JS2C_SET_ERROR_PATH(parse_state, id) \
+    if ((parse_state)->error.path_id == JS2C_NO_PATH) { \
+        (parse_state)->error.path_id = (id); \
+    }
+
+static inline void builtin_init_error(parse_state_t *parse_state) {
+    parse_state->error.code = JS2C_ERROR_NONE;
+    parse_state->error.path_id = JS2C_NO_PATH;
+}
+
+static JS2C_COLD void builtin_record_error(
+    parse_state_t *parse_state,
+    js2c_error_code_t code,
+    js2c_error_value_t expected,
+    js2c_error_value_t actual
+) {
+    parse_state->error.code = code;
+    parse_state->error.token_index = parse_state->current_token;
+    parse_state->error.expected = expected;
+    parse_state->error.actual = actual;
+}
+
+/* The error of a failed parse, as it is passed to LOG_STRUCTURED_ERROR */
+static inline const js2c_error_t *builtin_structured_error(parse_state_t *parse_state) {
+    parse_state->error.position = parse_state->error_position;
+    return &parse_state->error;
+}
+#else
+#define RECORD_ERROR(parse_state, code, expected, actual)
+#endif
+
+#if !defined(JS2C_LEAN_PARSER) || defined(JS2C_STRUCTURED_ERRORS)
 static inline const char *token_type_as_string(jsmntype_t type) {
     switch (type) {
     case JSMN_UNDEFINED:
@@ -87,23 +168,231 @@ static inline const char *jsmn_error_as_string(int err) {
         return "Internal error";
     }
 }
+#endif
 
-static inline bool check_type(const parse_state_t *parse_state, jsmntype_t type) {
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
-    if (token->type != type) {
-        LOG_ERROR(
-            token->start,
-            "Unexpected token in '%s': %s instead of %s",
-            parse_state->current_key,
-            token_type_as_string(token->type),
-            token_type_as_string(type))
+/* Error reporting is kept out of the (inlined) parsing functions, so that
+ * the code of the happy path stays compact. */
+static JS2C_COLD void builtin_log_unexpected_token(parse_state_t *parse_state, jsmntype_t expected_type) {
+    (void)parse_state;
+    (void)expected_type;
+    RECORD_ERROR(
+        parse_state,
+        JS2C_ERROR_UNEXPECTED_TOKEN,
+        JS2C_ERROR_VALUE(i, expected_type),
+        JS2C_ERROR_VALUE(i, CURRENT_TOKEN(parse_state).type)
+    )
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Unexpected token in '%s': %s instead of %s",
+        parse_state->current_key,
+        token_type_as_string(CURRENT_TOKEN(parse_state).type),
+        token_type_as_string(expected_type))
+}
+
+static JS2C_COLD void builtin_log_unexpected_token_type(parse_state_t *parse_state) {
+    (void)parse_state;
+    RECORD_ERROR(
+        parse_state,
+        JS2C_ERROR_UNEXPECTED_TOKEN,
+        JS2C_ERROR_VALUE(i, JSMN_UNDEFINED),
+        JS2C_ERROR_VALUE(i, CURRENT_TOKEN(parse_state).type)
+    )
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Unexpected token in '%s': %s",
+        parse_state->current_key,
+        token_type_as_string(CURRENT_TOKEN(parse_state).type))
+}
+
+static JS2C_COLD void builtin_log_invalid_literal(parse_state_t *parse_state, const char *literal_type) {
+    (void)parse_state;
+    (void)literal_type;
+    RECORD_ERROR(parse_state, JS2C_ERROR_INVALID_LITERAL, JS2C_ERROR_VALUE(s, literal_type), JS2C_NO_ERROR_VALUE)
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Invalid %s literal in '%s': %.*s",
+        literal_type,
+        parse_state->current_key,
+        CURRENT_STRING_FOR_ERROR(parse_state))
+}
+
+static JS2C_COLD void builtin_log_string_length(parse_state_t *parse_state, bool too_large, int limit) {
+    (void)parse_state;
+    (void)too_large;
+    (void)limit;
+    RECORD_ERROR(
+        parse_state,
+        too_large ? JS2C_ERROR_STRING_TOO_LONG : JS2C_ERROR_STRING_TOO_SHORT,
+        JS2C_ERROR_VALUE(i, limit),
+        JS2C_ERROR_VALUE(i, CURRENT_STRING_LENGTH(parse_state))
+    )
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "String too %s in '%s'. Length: %i. %s length: %i.",
+        too_large ? "large" : "short",
+        parse_state->current_key,
+        CURRENT_STRING_LENGTH(parse_state),
+        too_large ? "Maximum" : "Minimum",
+        limit)
+}
+
+static JS2C_COLD void builtin_log_duplicate_key(parse_state_t *parse_state) {
+    (void)parse_state;
+    RECORD_ERROR(parse_state, JS2C_ERROR_DUPLICATE_KEY, JS2C_NO_ERROR_VALUE, JS2C_NO_ERROR_VALUE)
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Duplicate key in '%s': %.*s",
+        parse_state->current_key,
+        CURRENT_STRING_FOR_ERROR(parse_state))
+}
+
+static JS2C_COLD void builtin_log_syntax_error(parse_state_t *parse_state, int position, int error) {
+    (void)parse_state;
+    (void)position;
+    (void)error;
+    RECORD_ERROR(parse_state, JS2C_ERROR_SYNTAX, JS2C_NO_ERROR_VALUE, JS2C_ERROR_VALUE(i, error))
+    REPORT_ERROR(parse_state, position, "JSON syntax error: %s", jsmn_error_as_string(error));
+}
+
+#ifdef JS2C_STRUCTURED_ERRORS
+static inline const char *builtin_error_code_as_string(js2c_error_code_t code) {
+    switch (code) {
+    case JS2C_ERROR_NONE:
+        return "No error";
+    case JS2C_ERROR_SYNTAX:
+        return "JSON syntax error";
+    case JS2C_ERROR_DOCUMENT_TOO_LARGE:
+        return "Document too large";
+    case JS2C_ERROR_UNEXPECTED_TOKEN:
+        return "Unexpected token";
+    case JS2C_ERROR_INVALID_LITERAL:
+        return "Invalid literal";
+    case JS2C_ERROR_STRING_TOO_LONG:
+        return "String too large";
+    case JS2C_ERROR_STRING_TOO_SHORT:
+        return "String too short";
+    case JS2C_ERROR_ARRAY_TOO_LARGE:
+        return "Array too large";
+    case JS2C_ERROR_ARRAY_TOO_SMALL:
+        return "Array too small";
+    case JS2C_ERROR_MAP_TOO_LARGE:
+        return "Too many keys";
+    case JS2C_ERROR_MAP_TOO_SMALL:
+        return "Too few keys";
+    case JS2C_ERROR_INTEGER_OUT_OF_RANGE:
+    case JS2C_ERROR_UNSIGNED_OUT_OF_RANGE:
+        return "Integer out of range";
+    case JS2C_ERROR_NUMBER_OUT_OF_RANGE:
+        return "Floating point value out of range";
+    case JS2C_ERROR_MISSING_FIELD:
+        return "Missing required field";
+    case JS2C_ERROR_DUPLICATE_FIELD:
+        return "Duplicate field definition";
+    case JS2C_ERROR_UNKNOWN_FIELD:
+        return "Unknown field";
+    case JS2C_ERROR_MISSING_SEPARATOR:
+        return "Missing separator between values";
+    case JS2C_ERROR_MISSING_VALUE:
+        return "Missing value";
+    case JS2C_ERROR_DUPLICATE_KEY:
+        return "Duplicate key";
+    case JS2C_ERROR_UNKNOWN_ENUM_VALUE:
+        return "Unknown enum value";
+    case JS2C_ERROR_MISSING_DISCRIMINATOR:
+        return "Missing discriminator field";
+    case JS2C_ERROR_UNKNOWN_DISCRIMINATOR:
+        return "Unknown discriminator value";
+    case JS2C_ERROR_CUSTOM_PARSER:
+        return "Error parsing";
+    case JS2C_ERROR_REQUIRED_FIELD_REMOVED:
+        return "Required field removed";
+    case JS2C_ERROR_IO:
+        return "Could not read file";
+    default:
+        return "Unknown error";
+    }
+}
+
+/* Format a structured error into buffer, like snprintf. Only needed if the message is actually shown. */
+static inline int builtin_format_error(const js2c_error_t *error, const char *const *paths, char *buffer, size_t size) {
+    const char *description = builtin_error_code_as_string(error->code);
+    const char *path = error->path_id == JS2C_NO_PATH ? "document" : paths[error->path_id];
+    switch (error->code) {
+    case JS2C_ERROR_SYNTAX:
+        return snprintf(buffer, size, "%s at %i: %s", description, error->position, jsmn_error_as_string((int)error->actual.i));
+    case JS2C_ERROR_DOCUMENT_TOO_LARGE:
+        return snprintf(
+            buffer, size, "%s at %i. Buffer size: %" PRIu64 ".", description, error->position, error->expected.u
+        );
+    case JS2C_ERROR_UNEXPECTED_TOKEN:
+        if (error->expected.i == JSMN_UNDEFINED) {
+            return snprintf(
+                buffer, size, "%s in '%s' at %i: %s", description, path, error->position,
+                token_type_as_string((jsmntype_t)error->actual.i)
+            );
+        }
+        return snprintf(
+            buffer, size, "%s in '%s' at %i: %s. Expected: %s.", description, path, error->position,
+            token_type_as_string((jsmntype_t)error->actual.i), token_type_as_string((jsmntype_t)error->expected.i)
+        );
+    case JS2C_ERROR_INVALID_LITERAL:
+        return snprintf(buffer, size, "Invalid %s literal in '%s' at %i", error->expected.s, path, error->position);
+    case JS2C_ERROR_STRING_TOO_LONG:
+    case JS2C_ERROR_STRING_TOO_SHORT:
+    case JS2C_ERROR_ARRAY_TOO_LARGE:
+    case JS2C_ERROR_ARRAY_TOO_SMALL:
+    case JS2C_ERROR_MAP_TOO_LARGE:
+    case JS2C_ERROR_MAP_TOO_SMALL:
+        return snprintf(
+            buffer, size, "%s in '%s' at %i. Length: %" PRIi64 ". Limit: %" PRIi64 ".",
+            description, path, error->position, error->actual.i, error->expected.i
+        );
+    case JS2C_ERROR_INTEGER_OUT_OF_RANGE:
+        return snprintf(
+            buffer, size, "%s in '%s' at %i. Value: %" PRIi64 ". Limit: %" PRIi64 ".",
+            description, path, error->position, error->actual.i, error->expected.i
+        );
+    case JS2C_ERROR_UNSIGNED_OUT_OF_RANGE:
+        return snprintf(
+            buffer, size, "%s in '%s' at %i. Value: %" PRIu64 ". Limit: %" PRIu64 ".",
+            description, path, error->position, error->actual.u, error->expected.u
+        );
+    case JS2C_ERROR_NUMBER_OUT_OF_RANGE:
+        return snprintf(
+            buffer, size, "%s in '%s' at %i. Value: %.15g. Limit: %.15g.",
+            description, path, error->position, error->actual.d, error->expected.d
+        );
+    case JS2C_ERROR_MISSING_FIELD:
+    case JS2C_ERROR_DUPLICATE_FIELD:
+    case JS2C_ERROR_MISSING_DISCRIMINATOR:
+    case JS2C_ERROR_REQUIRED_FIELD_REMOVED:
+        return snprintf(buffer, size, "%s in '%s' at %i: %s", description, path, error->position, error->expected.s);
+    case JS2C_ERROR_CUSTOM_PARSER:
+        return snprintf(buffer, size, "%s '%s' at %i: %s", description, path, error->position, error->actual.s);
+    case JS2C_ERROR_IO:
+        return snprintf(buffer, size, "%s '%s': %s", description, error->expected.s, strerror((int)error->actual.i));
+    default:
+        return snprintf(buffer, size, "%s in '%s' at %i", description, path, error->position);
+    }
+}
+#endif
+
+static inline bool check_type(parse_state_t *parse_state, jsmntype_t type) {
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
+    if (JS2C_UNLIKELY(token->type != type)) {
+        builtin_log_unexpected_token(parse_state, type);
         return true;
     }
     return false;
 }
 
 static inline bool current_string_is(const parse_state_t *parse_state, const char *s) {
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
     if (token->type != JSMN_STRING) {
         return false;
     }
@@ -113,17 +402,22 @@ static inline bool current_string_is(const parse_state_t *parse_state, const cha
     return memcmp(parse_state->json_string + token->start, s, token->end - token->start) == 0;
 }
 
+static inline bool current_token_is_null(const parse_state_t *parse_state) {
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
+    return token->type == JSMN_PRIMITIVE && parse_state->json_string[token->start] == 'n';
+}
+
 static inline bool builtin_check_current_string(parse_state_t *parse_state, int min_len, int max_len) {
     if (check_type(parse_state, JSMN_STRING)) {
         return true;
     }
-    const jsmntok_t *token = &CURRENT_TOKEN(parse_state);
-    if (token->end - token->start > max_len) {
-        LOG_ERROR(token->start, "String too large in '%s'. Length: %i. Maximum length: %i.", parse_state->current_key, token->end - token->start, max_len);
+    const js2c_token_t *token = &CURRENT_TOKEN(parse_state);
+    if (JS2C_UNLIKELY(token->end - token->start > max_len)) {
+        builtin_log_string_length(parse_state, true, max_len);
         return true;
     }
-    if (token->end - token->start < min_len) {
-        LOG_ERROR(token->start, "String too short in '%s'. Length: %i. Minimum length: %i.", parse_state->current_key, token->end - token->start, min_len);
+    if (JS2C_UNLIKELY(token->end - token->start < min_len)) {
+        builtin_log_string_length(parse_state, false, min_len);
         return true;
     }
     return false;
@@ -133,7 +427,7 @@ static inline bool builtin_parse_string(parse_state_t *parse_state, char *out, i
     if (builtin_check_current_string(parse_state, min_len, max_len)){
         return true;
     }
-    const jsmntok_t *token = &CURRENT_TOKEN(parse_state);
+    const js2c_token_t *token = &CURRENT_TOKEN(parse_state);
     memcpy(out, parse_state->json_string + token->start, token->end - token->start);
     out[token->end - token->start] = 0;
     parse_state->current_token += 1;
@@ -144,10 +438,10 @@ static inline bool builtin_parse_bool(parse_state_t *parse_state, bool *out) {
     if (check_type(parse_state, JSMN_PRIMITIVE)) {
         return true;
     }
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
     const char first_char = parse_state->json_string[token->start];
-    if (first_char != 't' && first_char != 'f') {
-        LOG_ERROR(token->start, "Invalid boolean literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (JS2C_UNLIKELY(first_char != 't' && first_char != 'f')) {
+        builtin_log_invalid_literal(parse_state, "boolean");
         return true;
     }
     *out = first_char == 't';
@@ -161,9 +455,9 @@ static inline bool builtin_parse_signed(
     bool string_allowed,
     int radix,
     int64_t *out) {
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
-    if (!((number_allowed && token->type == JSMN_PRIMITIVE) || (string_allowed && token->type == JSMN_STRING))) {
-        LOG_ERROR(token->start, "Unexpected token in '%s': %s", parse_state->current_key, token_type_as_string(token->type))
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
+    if (JS2C_UNLIKELY(!((number_allowed && token->type == JSMN_PRIMITIVE) || (string_allowed && token->type == JSMN_STRING)))) {
+        builtin_log_unexpected_token_type(parse_state);
         return true;
     }
     if (token->type == JSMN_PRIMITIVE) {
@@ -171,8 +465,8 @@ static inline bool builtin_parse_signed(
     }
     char *end_char = NULL;
     *out = strtoll(parse_state->json_string + token->start, &end_char, radix);
-    if (end_char != parse_state->json_string + token->end) {
-        LOG_ERROR(token->start, "Invalid signed integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (JS2C_UNLIKELY(end_char != parse_state->json_string + token->end)) {
+        builtin_log_invalid_literal(parse_state, "signed integer");
         return true;
     }
     parse_state->current_token += 1;
@@ -186,9 +480,9 @@ static inline bool builtin_parse_unsigned(
     int radix,
     uint64_t *out
 ) {
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
-    if (!((number_allowed && token->type == JSMN_PRIMITIVE) || (string_allowed && token->type == JSMN_STRING))) {
-        LOG_ERROR(token->start, "Unexpected token in '%s': %s", parse_state->current_key, token_type_as_string(token->type))
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
+    if (JS2C_UNLIKELY(!((number_allowed && token->type == JSMN_PRIMITIVE) || (string_allowed && token->type == JSMN_STRING)))) {
+        builtin_log_unexpected_token_type(parse_state);
         return true;
     }
     if (token->type == JSMN_PRIMITIVE) {
@@ -196,13 +490,13 @@ static inline bool builtin_parse_unsigned(
     }
     const char *start_char = parse_state->json_string + token->start;
     char *end_char = NULL;
-    if (*start_char == '-') {
-        LOG_ERROR(token->start, "Invalid unsigned integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (JS2C_UNLIKELY(*start_char == '-')) {
+        builtin_log_invalid_literal(parse_state, "unsigned integer");
         return true;
     }
     *out = strtoull(start_char, &end_char, radix);
-    if (end_char != parse_state->json_string + token->end) {
-        LOG_ERROR(token->start, "Invalid unsigned integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (JS2C_UNLIKELY(end_char != parse_state->json_string + token->end)) {
+        builtin_log_invalid_literal(parse_state, "unsigned integer");
         return true;
     }
     parse_state->current_token += 1;
@@ -210,22 +504,22 @@ static inline bool builtin_parse_unsigned(
 }
 
 static inline bool builtin_parse_double(parse_state_t *parse_state, double *out) {
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
+    const js2c_token_t *token = &parse_state->tokens[parse_state->current_token];
     if (check_type(parse_state, JSMN_PRIMITIVE)) {
         return true;
     }
     const char *start_char = parse_state->json_string + token->start;
     if (token->end - token->start >= 2) {
-        if (start_char[1] != '.' && start_char[1] != 'e' && start_char[1] != 'E' &&
-            !(start_char[1] >= '0' && start_char[1] <= '9')) {
-            LOG_ERROR(token->start, "Invalid floating point literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+        if (JS2C_UNLIKELY(start_char[1] != '.' && start_char[1] != 'e' && start_char[1] != 'E' &&
+            !(start_char[1] >= '0' && start_char[1] <= '9'))) {
+            builtin_log_invalid_literal(parse_state, "floating point");
             return true;
         }
     }
     char *end_char = NULL;
     *out = strtod(start_char, &end_char);
-    if (end_char != parse_state->json_string + token->end) {
-        LOG_ERROR(token->start, "Invalid floating point literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (JS2C_UNLIKELY(end_char != parse_state->json_string + token->end)) {
+        builtin_log_invalid_literal(parse_state, "floating point");
         return true;
     }
     parse_state->current_token += 1;
@@ -233,33 +527,459 @@ static inline bool builtin_parse_double(parse_state_t *parse_state, double *out)
 }
 
 static inline bool builtin_skip(parse_state_t *parse_state) {
-    /* The algorithm works, because of how .size behaves on JSMN tokens:
-     *   - Arrays have size = number of elements
-     *   - Objects have size = number of fields
-     *   - Object keys have a size of 1. This is important, because {"a": "b"} is 3 tokens this way:
-     *       - An object of size 1,
-     *       - A key of size 1
-     *       - A string of size 0.
-     *   - All other tokens are size 0.
+    /* Skipping does not need to walk the subtree, because of how JSMN stores tokens:
+     *   - Tokens are stored in the order of their start positions.
+     *   - The end of an object or array token is right after its closing bracket.
+     * So the subtree of the current token consists of the tokens that start before its end,
+     * and the first token after the subtree can be found with an exponential search. This only
+     * looks at O(log(subtree size)) tokens, and only one for primitives and strings.
      */
-    uint32_t skip_tokens = 1;
-    while (skip_tokens > 0) {
-        skip_tokens += CURRENT_TOKEN(parse_state).size;
-        if (parse_state->current_token >= parse_state->max_token_num) {
-            /* Should never happen */
+    const js2c_token_t *tokens = parse_state->tokens;
+    const int end = CURRENT_TOKEN(parse_state).end;
+    /* Tokens before first are part of the subtree, last is either after it or past the last token */
+    uint64_t first = parse_state->current_token + 1;
+    uint64_t last = first;
+    uint64_t step = 1;
+    while (last < parse_state->max_token_num && tokens[last].start < end) {
+        first = last + 1;
+        last = first + step;
+        step *= 2;
+    }
+    if (last > parse_state->max_token_num) {
+        last = parse_state->max_token_num;
+    }
+    while (first < last) {
+        const uint64_t middle = first + (last - first) / 2;
+        if (tokens[middle].start < end) {
+            first = middle + 1;
+        } else {
+            last = middle;
+        }
+    }
+    parse_state->current_token = first;
+    return false;
+}
+
+/* FNV-1a, used for the hash tables of maps */
+static inline uint32_t builtin_hash_string(const char *s, size_t length) {
+    uint32_t hash = 2166136261u;
+    for (size_t i = 0; i < length; ++i) {
+        hash ^= (uint8_t)s[i];
+        hash *= 16777619u;
+    }
+    return hash;
+}
+
+static inline bool builtin_check_duplicate_key_token(parse_state_t *parse_state, uint32_t *slots, uint32_t slot_mask) {
+    /* Duplicate key detection when the keys are not stored anywhere (i.e. for validation).
+     * slots is a hash table of key token index + 1 values, with 0 meaning an empty slot. */
+    uint32_t slot = builtin_hash_string(CURRENT_STRING(parse_state), CURRENT_STRING_LENGTH(parse_state)) & slot_mask;
+    for (; slots[slot] != 0; slot = (slot + 1) & slot_mask) {
+        const js2c_token_t *other_key = &parse_state->tokens[slots[slot] - 1];
+        if (
+            other_key->end - other_key->start == CURRENT_STRING_LENGTH(parse_state) &&
+            memcmp(parse_state->json_string + other_key->start, CURRENT_STRING(parse_state), CURRENT_STRING_LENGTH(parse_state)) == 0
+        ) {
+            builtin_log_duplicate_key(parse_state);
             return true;
         }
-        parse_state->current_token += 1;
-        skip_tokens -= 1;
     }
+    slots[slot] = parse_state->current_token + 1;
     return false;
 }
 
-static inline bool builtin_parse_json_string(
+static inline bool builtin_find_field(parse_state_t *parse_state, const char *key) {
+    /* Move from the current object token to the value of its field named key, without parsing anything.
+     * Returns true if there is no such field. */
+    const uint64_t n = CURRENT_TOKEN(parse_state).size;
+    parse_state->current_token += 1;
+    for (uint64_t i = 0; i < n; ++i) {
+        const bool found = current_string_is(parse_state, key);
+        parse_state->current_token += 1;
+        if (found) {
+            return false;
+        }
+        builtin_skip(parse_state);
+    }
+    return true;
+}
+
+#if defined(JS2C_SIMD_TOKENIZER) || defined(JS2C_COMPACT_TOKENS) || defined(JS2C_PUSH_PARSER)
+/* A drop-in replacement of jsmn_parse (in strict mode), which produces the same tokens and errors,
+ * but faster, and in either token format:
+ *   - String contents and whitespace are scanned 16 (SSE2) or 32 (AVX2) bytes at a time on x86,
+ *     whichever the CPU running the parser supports. Other CPUs and compilers get the same
+ *     algorithm with scalar loops.
+ *   - Open containers store the index of their enclosing open container in their end field,
+ *     so closing a container or finishing an object value does not search backwards in the
+ *     token list, like jsmn does.
+ *   - When continuing a partially tokenized document, the innermost open container is given by
+ *     the caller, so the tokens of the earlier runs are not looked at again. This is what the push
+ *     parser uses, even if the rest of the parser uses jsmn.
+ */
+#if (defined(__GNUC__) || defined(__clang__)) && (defined(__x86_64__) || defined(__i386__))
+/* The vector scanners are compiled for their instruction sets with target attributes, so the parser does not
+ * have to be compiled with -mavx2, and runs on any x86 CPU. The best one is selected when the program starts. */
+#include <immintrin.h>
+#define JS2C_SIMD_X86
+#endif
+
+/* jsmn marks open containers with end == -1. Here the end of an open container is
+ * -2 - (index of the enclosing open container), which is -1 for top level containers. */
+#define JS2C_OPEN_END(parent) (-2 - (parent))
+#define JS2C_PARENT_OF_OPEN(token) (-2 - (token).end)
+
+static inline bool builtin_is_json_whitespace(char c) {
+    return c == ' ' || c == '\n' || c == '\r' || c == '\t';
+}
+
+#ifdef JS2C_SIMD_X86
+/* The vector scanners look at whole 32 or 16 byte blocks only. They return the position of the first match in
+ * them, or the start of the remaining, shorter part of the input, which is left to the scalar loops. */
+typedef size_t (*builtin_simd_scan_t)(const char *js, size_t pos, size_t len);
+
+__attribute__((target("avx2")))
+static size_t builtin_find_string_special_avx2(const char *js, size_t pos, size_t len) {
+    const __m256i quote = _mm256_set1_epi8('"');
+    const __m256i backslash = _mm256_set1_epi8('\\');
+    for (; pos + 32 <= len; pos += 32) {
+        const __m256i chunk = _mm256_loadu_si256((const __m256i *)(js + pos));
+        const uint32_t mask = (uint32_t)_mm256_movemask_epi8(
+            _mm256_or_si256(_mm256_cmpeq_epi8(chunk, quote), _mm256_cmpeq_epi8(chunk, backslash))
+        );
+        if (mask != 0) {
+            return pos + __builtin_ctz(mask);
+        }
+    }
+    return pos;
+}
+
+__attribute__((target("sse2")))
+static size_t builtin_find_string_special_sse2(const char *js, size_t pos, size_t len) {
+    const __m128i quote = _mm_set1_epi8('"');
+    const __m128i backslash = _mm_set1_epi8('\\');
+    for (; pos + 16 <= len; pos += 16) {
+        const __m128i chunk = _mm_loadu_si128((const __m128i *)(js + pos));
+        const uint32_t mask = (uint32_t)_mm_movemask_epi8(
+            _mm_or_si128(_mm_cmpeq_epi8(chunk, quote), _mm_cmpeq_epi8(chunk, backslash))
+        );
+        if (mask != 0) {
+            return pos + __builtin_ctz(mask);
+        }
+    }
+    return pos;
+}
+
+__attribute__((target("avx2")))
+static size_t builtin_skip_whitespace_avx2(const char *js, size_t pos, size_t len) {
+    for (; pos + 32 <= len; pos += 32) {
+        const __m256i chunk = _mm256_loadu_si256((const __m256i *)(js + pos));
+        const __m256i whitespace = _mm256_or_si256(
+            _mm256_or_si256(_mm256_cmpeq_epi8(chunk, _mm256_set1_epi8(' ')), _mm256_cmpeq_epi8(chunk, _mm256_set1_epi8('\n'))),
+            _mm256_or_si256(_mm256_cmpeq_epi8(chunk, _mm256_set1_epi8('\r')), _mm256_cmpeq_epi8(chunk, _mm256_set1_epi8('\t')))
+        );
+        const uint32_t mask = ~(uint32_t)_mm256_movemask_epi8(whitespace);
+        if (mask != 0) {
+            return pos + __builtin_ctz(mask);
+        }
+    }
+    return pos;
+}
+
+__attribute__((target("sse2")))
+static size_t builtin_skip_whitespace_sse2(const char *js, size_t pos, size_t len) {
+    for (; pos + 16 <= len; pos += 16) {
+        const __m128i chunk = _mm_loadu_si128((const __m128i *)(js + pos));
+        const __m128i whitespace = _mm_or_si128(
+            _mm_or_si128(_mm_cmpeq_epi8(chunk, _mm_set1_epi8(' ')), _mm_cmpeq_epi8(chunk, _mm_set1_epi8('\n'))),
+            _mm_or_si128(_mm_cmpeq_epi8(chunk, _mm_set1_epi8('\r')), _mm_cmpeq_epi8(chunk, _mm_set1_epi8('\t')))
+        );
+        const uint32_t mask = ~(uint32_t)_mm_movemask_epi8(whitespace) & 0xFFFF;
+        if (mask != 0) {
+            return pos + __builtin_ctz(mask);
+        }
+    }
+    return pos;
+}
+
+/* Used on CPUs without SSE2 (only possible on 32 bit x86): everything is left to the scalar loops */
+static size_t builtin_simd_scan_none(const char *js, size_t pos, size_t len) {
+    (void)js;
+    (void)len;
+    return pos;
+}
+
+/* The selected scanners. They are only written before main() (or while a shared library is loaded), so the
+ * parsers can read them on any number of threads without synchronization. Until then, the scalar loops are used. */
+static builtin_simd_scan_t builtin_find_string_special_simd = builtin_simd_scan_none;
+static builtin_simd_scan_t builtin_skip_whitespace_simd = builtin_simd_scan_none;
+
+__attribute__((constructor))
+static void builtin_simd_select(void) {
+    /* Constructors may run before the CPU features are detected */
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx2")) {
+        builtin_find_string_special_simd = builtin_find_string_special_avx2;
+        builtin_skip_whitespace_simd = builtin_skip_whitespace_avx2;
+    } else if (__builtin_cpu_supports("sse2")) {
+        builtin_find_string_special_simd = builtin_find_string_special_sse2;
+        builtin_skip_whitespace_simd = builtin_skip_whitespace_sse2;
+    }
+}
+#endif
+
+/* Position of the first '"' or '\\' at or after pos, or len if there is none */
+static inline size_t builtin_find_string_special(const char *js, size_t pos, size_t len) {
+#ifdef JS2C_SIMD_X86
+    pos = builtin_find_string_special_simd(js, pos, len);
+#endif
+    for (; pos < len; ++pos) {
+        if (js[pos] == '"' || js[pos] == '\\') {
+            return pos;
+        }
+    }
+    return len;
+}
+
+/* Position of the first non-whitespace character at or after pos, or len if there is none */
+static inline size_t builtin_skip_whitespace(const char *js, size_t pos, size_t len) {
+    /* Whitespace between tokens is mostly a few characters at most, vector scanning only pays off
+     * for the longer runs of indentation */
+    for (size_t short_run_end = pos + 4; pos < short_run_end; ++pos) {
+        if (pos >= len || !builtin_is_json_whitespace(js[pos])) {
+            return pos;
+        }
+    }
+#ifdef JS2C_SIMD_X86
+    pos = builtin_skip_whitespace_simd(js, pos, len);
+#endif
+    for (; pos < len; ++pos) {
+        if (!builtin_is_json_whitespace(js[pos])) {
+            return pos;
+        }
+    }
+    return len;
+}
+
+static inline bool builtin_is_hex_digit(char c) {
+    return (c >= '0' && c <= '9') || (c >= 'A' && c <= 'F') || (c >= 'a' && c <= 'f');
+}
+
+/* innermost_open is the index of the innermost open container, or -1 at the start of a document. It is
+ * updated together with parser, including on errors. */
+static int builtin_fast_tokenize_continue(
+    jsmn_parser *parser,
+    int *innermost_open,
+    const char *js,
+    size_t len,
+    js2c_token_t *tokens,
+    unsigned int num_tokens
+) {
+    /* The state is saved on errors too, so that tokenization can continue after JSMN_ERROR_PART
+     * (with more data), just like with jsmn. */
+#define JS2C_TOKENIZE_ERROR(error, position) \
+    { \
+        parser->pos = (position); \
+        parser->toknext = toknext; \
+        parser->toksuper = toksuper; \
+        *innermost_open = open; \
+        return (error); \
+    }
+
+    /* jsmn_parse is not called when this tokenizer is used */
+    (void)jsmn_parse;
+
+    int toksuper = parser->toksuper;
+    int toknext = parser->toknext;
+    size_t pos = parser->pos;
+    int open = *innermost_open;
+
+    /* jsmn stops at the first NUL character. The part before pos was already searched by the earlier runs. */
+    const char *nul = (const char *)memchr(js + pos, '\0', len - pos);
+    if (nul != NULL) {
+        len = nul - js;
+    }
+
+    for (;;) {
+        pos = builtin_skip_whitespace(js, pos, len);
+        if (pos >= len) {
+            break;
+        }
+        const char c = js[pos];
+        switch (c) {
+        case '{':
+        case '[': {
+            if ((unsigned int)toknext >= num_tokens) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_NOMEM, pos);
+            }
+            if (toksuper != -1) {
+                if (tokens[toksuper].type == JSMN_OBJECT) {
+                    JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, pos);
+                }
+                tokens[toksuper].size++;
+            }
+            js2c_token_t *token = &tokens[toknext];
+            token->type = (c == '{' ? JSMN_OBJECT : JSMN_ARRAY);
+            token->start = pos;
+            token->end = JS2C_OPEN_END(open);
+            token->size = 0;
+            open = toksuper = toknext;
+            toknext++;
+            pos++;
+            break;
+        }
+        case '}':
+        case ']': {
+            if (open == -1 || tokens[open].type != (c == '}' ? JSMN_OBJECT : JSMN_ARRAY)) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, pos);
+            }
+            const int parent = JS2C_PARENT_OF_OPEN(tokens[open]);
+            tokens[open].end = pos + 1;
+            open = toksuper = parent;
+            pos++;
+            break;
+        }
+        case '\"': {
+            const size_t start = pos;
+            pos = builtin_find_string_special(js, pos + 1, len);
+            while (pos < len && js[pos] == '\\') {
+                pos++;
+                if (pos < len) {
+                    switch (js[pos]) {
+                    case '\"':
+                    case '/':
+                    case '\\':
+                    case 'b':
+                    case 'f':
+                    case 'r':
+                    case 'n':
+                    case 't':
+                        break;
+                    case 'u':
+                        for (int i = 0; i < 4 && pos + 1 < len; i++) {
+                            pos++;
+                            if (!builtin_is_hex_digit(js[pos])) {
+                                JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, start);
+                            }
+                        }
+                        break;
+                    default:
+                        JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, start);
+                    }
+                }
+                pos = builtin_find_string_special(js, pos + 1, len);
+            }
+            if (pos >= len) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_PART, start);
+            }
+            if ((unsigned int)toknext >= num_tokens) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_NOMEM, start);
+            }
+            js2c_token_t *token = &tokens[toknext++];
+            token->type = JSMN_STRING;
+            token->start = start + 1;
+            token->end = pos;
+            token->size = 0;
+            if (toksuper != -1) {
+                tokens[toksuper].size++;
+            }
+            pos++;
+            break;
+        }
+        case ':':
+            toksuper = toknext - 1;
+            pos++;
+            break;
+        case ',':
+            if (toksuper != -1 && open != -1 && tokens[toksuper].type != JSMN_ARRAY && tokens[toksuper].type != JSMN_OBJECT) {
+                toksuper = open;
+            }
+            pos++;
+            break;
+        case '-':
+        case '0':
+        case '1':
+        case '2':
+        case '3':
+        case '4':
+        case '5':
+        case '6':
+        case '7':
+        case '8':
+        case '9':
+        case 't':
+        case 'f':
+        case 'n': {
+            if (toksuper != -1) {
+                const js2c_token_t *t = &tokens[toksuper];
+                if (t->type == JSMN_OBJECT || (t->type == JSMN_STRING && t->size != 0)) {
+                    JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, pos);
+                }
+            }
+            const size_t start = pos;
+            for (; pos < len; pos++) {
+                const char p = js[pos];
+                if (p == ' ' || p == ',' || p == ']' || p == '}' || p == '\n' || p == '\r' || p == '\t') {
+                    break;
+                }
+                if (p < 32 || p >= 127) {
+                    JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, start);
+                }
+            }
+            if (pos >= len) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_PART, start);
+            }
+            if ((unsigned int)toknext >= num_tokens) {
+                JS2C_TOKENIZE_ERROR(JSMN_ERROR_NOMEM, start);
+            }
+            js2c_token_t *token = &tokens[toknext++];
+            token->type = JSMN_PRIMITIVE;
+            token->start = start;
+            token->end = pos;
+            token->size = 0;
+            if (toksuper != -1) {
+                tokens[toksuper].size++;
+            }
+            break;
+        }
+        default:
+            JS2C_TOKENIZE_ERROR(JSMN_ERROR_INVAL, pos);
+        }
+    }
+    if (open != -1) {
+        JS2C_TOKENIZE_ERROR(JSMN_ERROR_PART, len);
+    }
+    parser->pos = len;
+    parser->toknext = toknext;
+    parser->toksuper = toksuper;
+    *innermost_open = open;
+    return toknext;
+#undef JS2C_TOKENIZE_ERROR
+}
+#endif
+
+#if defined(JS2C_SIMD_TOKENIZER) || defined(JS2C_COMPACT_TOKENS)
+static inline int builtin_fast_tokenize(
+    jsmn_parser *parser,
+    const char *js,
+    size_t len,
+    js2c_token_t *tokens,
+    unsigned int num_tokens
+) {
+    int innermost_open = -1;
+    return builtin_fast_tokenize_continue(parser, &innermost_open, js, len, tokens, num_tokens);
+}
+#define JS2C_TOKENIZE builtin_fast_tokenize
+#else
+#define JS2C_TOKENIZE jsmn_parse
+#endif
+
+static inline bool builtin_tokenize_json(
     parse_state_t *parse_state,
-    jsmntok_t *token_buffer,
+    js2c_token_t *token_buffer,
     uint64_t token_buffer_size,
-    const char *json_string
+    const char *json_string,
+    size_t json_length
 ) {
     jsmn_parser parser = {0};
 
@@ -267,15 +987,969 @@ static inline bool builtin_parse_json_string(
     parse_state->tokens = token_buffer;
     parse_state->current_token = 0;
     parse_state->max_token_num = token_buffer_size;
+#ifndef JS2C_LEAN_PARSER
     parse_state->current_key = "document root";
+#endif
 
     jsmn_init(&parser);
-    int token_num = jsmn_parse(&parser, json_string, strlen(json_string), parse_state->tokens, token_buffer_size);
-    if (token_num < 0) {
-        LOG_ERROR(parser.pos, "JSON syntax error: %s", jsmn_error_as_string(token_num));
+    int token_num = JS2C_TOKENIZE(&parser, json_string, json_length, parse_state->tokens, token_buffer_size);
+    if (JS2C_UNLIKELY(token_num < 0)) {
+        builtin_log_syntax_error(parse_state, parser.pos, token_num);
+        return true;
+    }
+    /* An empty (or whitespace-only) document has no root token to look at */
+    if (JS2C_UNLIKELY(token_num == 0)) {
+        builtin_log_syntax_error(parse_state, parser.pos, JSMN_ERROR_PART);
+        return true;
+    }
+    /* Only the tokens actually filled in by the tokenizer may be looked at from now on. */
+    parse_state->max_token_num = token_num;
+    return false;
+}
+
+static inline bool builtin_parse_json_string(
+    parse_state_t *parse_state,
+    js2c_token_t *token_buffer,
+    uint64_t token_buffer_size,
+    const char *json_string
+) {
+    return builtin_tokenize_json(parse_state, token_buffer, token_buffer_size, json_string, strlen(json_string));
+}
+
+#ifdef JS2C_PUSH_PARSER
+/* State of a push parser: the document received so far, and the progress of the tokenizer on it.
+ * The tokens themselves are stored by the generated parser, as their number depends on the schema. */
+typedef struct builtin_push_state_s {
+    char *buffer;
+    size_t buffer_size;
+    size_t length;
+    jsmn_parser tokenizer;
+    /* The innermost open container, so that it is not searched for in the tokens on every chunk */
+    int innermost_open;
+    /* The result of the last tokenizer run: the number of tokens, or a jsmn error */
+    int token_num;
+} builtin_push_state_t;
+
+static inline void builtin_push_init(builtin_push_state_t *state, char *buffer, size_t buffer_size) {
+    state->buffer = buffer;
+    state->buffer_size = buffer_size;
+    state->length = 0;
+    state->innermost_open = -1;
+    state->token_num = JSMN_ERROR_PART;
+    jsmn_init(&state->tokenizer);
+}
+
+/* Append a chunk to the document, and tokenize as much of it as possible. The tokenizer continues where it
+ * stopped the last time, so the cost of a chunk only depends on its own length, except for a string or number
+ * cut in half by the end of the chunk: that is tokenized again from its start by the next chunk. */
+static inline bool builtin_push_feed(
+    parse_state_t *parse_state,
+    builtin_push_state_t *state,
+    js2c_token_t *tokens,
+    unsigned int max_token_num,
+    const char *chunk,
+    size_t length
+) {
+    parse_state->current_token = 0;
+    if (JS2C_UNLIKELY(state->token_num < 0 && state->token_num != JSMN_ERROR_PART)) {
+        /* The error was already reported by the chunk that caused it */
+        return true;
+    }
+    /* jsmn stores positions as int */
+    if (JS2C_UNLIKELY(length > state->buffer_size - state->length || state->length + length > INT_MAX)) {
+        /* The error is at the first byte that did not fit */
+        RECORD_ERROR(
+            parse_state,
+            JS2C_ERROR_DOCUMENT_TOO_LARGE,
+            JS2C_ERROR_VALUE(u, state->buffer_size),
+            JS2C_ERROR_VALUE(u, state->length + length)
+        )
+        REPORT_ERROR(
+            parse_state,
+            state->buffer_size < INT_MAX ? (int)state->buffer_size : INT_MAX,
+            "Document too large for the %zu byte buffer",
+            state->buffer_size
+        );
+        state->token_num = JSMN_ERROR_NOMEM;
+        return true;
+    }
+    memcpy(state->buffer + state->length, chunk, length);
+    state->length += length;
+    state->token_num = builtin_fast_tokenize_continue(
+        &state->tokenizer, &state->innermost_open, state->buffer, state->length, tokens, max_token_num
+    );
+    if (JS2C_UNLIKELY(state->token_num < 0 && state->token_num != JSMN_ERROR_PART)) {
+        builtin_log_syntax_error(parse_state, state->tokenizer.pos, state->token_num);
+        return true;
+    }
+    return false;
+}
+
+/* Set up the parse state for the tokens of a fully received document */
+static inline bool builtin_push_finish(parse_state_t *parse_state, builtin_push_state_t *state, js2c_token_t *tokens) {
+    parse_state->json_string = state->buffer;
+    parse_state->tokens = tokens;
+    parse_state->current_token = 0;
+#ifndef JS2C_LEAN_PARSER
+    parse_state->current_key = "document root";
+#endif
+    if (JS2C_UNLIKELY(state->token_num < 0 && state->token_num != JSMN_ERROR_PART)) {
+        return true;
+    }
+    /* An incomplete or empty document */
+    if (JS2C_UNLIKELY(state->token_num <= 0)) {
+        builtin_log_syntax_error(parse_state, (int)state->length, JSMN_ERROR_PART);
+        return true;
+    }
+    parse_state->max_token_num = state->token_num;
+    return false;
+}
+#endif
+
+#ifdef JS2C_MSGPACK_PARSER
+/* MessagePack documents are converted into the tokens of the equivalent JSON document, so that they are checked and
+ * parsed by the same generated functions as JSON. The text the tokens point to is written into a buffer given by the
+ * caller: strings are copied as they are (without escaping), numbers are written in decimal, and the brackets and
+ * separators of JSON are kept, so that error positions point into a readable document. */
+
+/* Open arrays and maps are tracked on the stack, so nesting is limited */
+#ifndef JS2C_MSGPACK_MAX_DEPTH
+#define JS2C_MSGPACK_MAX_DEPTH 64
+#endif
+
+typedef struct builtin_msgpack_container_s {
+    int token;
+    /* Keys and values are both counted for maps */
+    uint64_t items;
+    uint64_t done;
+} builtin_msgpack_container_t;
+
+#ifndef JS2C_LEAN_PARSER
+static inline const char *msgpack_error_as_string(int err) {
+    switch (err) {
+    case JSMN_ERROR_INVAL:
+        return "Invalid or unsupported value";
+    case JSMN_ERROR_NOMEM:
+        return "MessagePack document too complex, or the buffer is too small";
+    case JSMN_ERROR_PART:
+        return "End of data reached (MessagePack document incomplete)";
+    default:
+        return "Internal error";
+    }
+}
+#endif
+
+static JS2C_COLD void builtin_log_msgpack_error(parse_state_t *parse_state, size_t position, int error) {
+    (void)parse_state;
+    (void)position;
+    (void)error;
+    RECORD_ERROR(parse_state, JS2C_ERROR_SYNTAX, JS2C_NO_ERROR_VALUE, JS2C_ERROR_VALUE(i, error))
+    REPORT_ERROR(parse_state, (int)position, "MessagePack syntax error: %s", msgpack_error_as_string(error));
+}
+
+/* A big endian unsigned integer */
+static inline uint64_t builtin_msgpack_read(const uint8_t *data, size_t size) {
+    uint64_t result = 0;
+    for (size_t i = 0; i < size; ++i) {
+        result = (result << 8) | data[i];
+    }
+    return result;
+}
+
+/* out must have room for 20 characters. Returns the length. */
+static inline size_t builtin_format_unsigned(char *out, uint64_t value) {
+    char digits[20];
+    size_t length = 0;
+    do {
+        digits[length++] = (char)('0' + value % 10);
+        value /= 10;
+    } while (value != 0);
+    for (size_t i = 0; i < length; ++i) {
+        out[i] = digits[length - 1 - i];
+    }
+    return length;
+}
+
+static inline size_t builtin_format_signed(char *out, int64_t value) {
+    if (value >= 0) {
+        return builtin_format_unsigned(out, (uint64_t)value);
+    }
+    out[0] = '-';
+    return 1 + builtin_format_unsigned(out + 1, -(uint64_t)value);
+}
+
+/* out must have room for 32 characters. Floats always get a fraction or an exponent, so that they are rejected by
+ * integer fields, just like 1.0 in JSON. Infinities and NaNs are written as "inf" and "nan", which are not valid
+ * JSON numbers, so floating point fields reject them too. */
+static inline size_t builtin_format_double(char *out, double value) {
+    size_t length = (size_t)snprintf(out, 32, "%.17g", value);
+    if (strpbrk(out, ".eni") == NULL) {
+        out[length++] = '.';
+        out[length++] = '0';
+    }
+    return length;
+}
+
+/* Convert a MessagePack document into tokens and text. Every byte of the document takes at most 6 bytes of text
+ * (e.g. a false value and a comma), plus the closing NUL, so a buffer of 6 * length + 1 bytes is always enough.
+ * Error positions of malformed documents are offsets in data. */
+static inline bool builtin_msgpack_tokenize(
+    parse_state_t *parse_state,
+    js2c_token_t *tokens,
+    unsigned int num_tokens,
+    const uint8_t *data,
+    size_t length,
+    char *buffer,
+    size_t buffer_size
+) {
+#define JS2C_MSGPACK_ERROR(error, position) \
+    { \
+        builtin_log_msgpack_error(parse_state, (position), (error)); \
+        return true; \
+    }
+#define JS2C_MSGPACK_RESERVE(size, position) \
+    if (JS2C_UNLIKELY(buffer_size - text < (size))) { \
+        JS2C_MSGPACK_ERROR(JSMN_ERROR_NOMEM, position); \
+    }
+
+    parse_state->json_string = buffer;
+    parse_state->tokens = tokens;
+    parse_state->current_token = 0;
+    parse_state->max_token_num = num_tokens;
+#ifndef JS2C_LEAN_PARSER
+    parse_state->current_key = "document root";
+#endif
+    /* Token positions are ints */
+    if (buffer_size > INT_MAX) {
+        buffer_size = INT_MAX;
+    }
+    if (JS2C_UNLIKELY(length > INT_MAX)) {
+        JS2C_MSGPACK_ERROR(JSMN_ERROR_NOMEM, 0);
+    }
+
+    builtin_msgpack_container_t stack[JS2C_MSGPACK_MAX_DEPTH];
+    int depth = 0;
+    unsigned int toknext = 0;
+    size_t pos = 0;
+    size_t text = 0;
+    do {
+        const size_t item_start = pos;
+        builtin_msgpack_container_t *parent = depth > 0 ? &stack[depth - 1] : NULL;
+        const bool is_key = parent != NULL && tokens[parent->token].type == JSMN_OBJECT && parent->done % 2 == 0;
+        if (parent != NULL && parent->done > 0) {
+            JS2C_MSGPACK_RESERVE(1, item_start);
+            buffer[text++] = tokens[parent->token].type == JSMN_OBJECT && !is_key ? ':' : ',';
+        }
+        if (JS2C_UNLIKELY(pos >= length)) {
+            JS2C_MSGPACK_ERROR(JSMN_ERROR_PART, item_start);
+        }
+        if (JS2C_UNLIKELY(toknext >= num_tokens)) {
+            JS2C_MSGPACK_ERROR(JSMN_ERROR_NOMEM, item_start);
+        }
+        js2c_token_t *token = &tokens[toknext];
+        const uint8_t type_byte = data[pos++];
+        /* Scalars are formatted here first */
+        char scalar[32];
+        size_t scalar_length = 0;
+        /* The size of the following integer, float, string length or container size */
+        size_t argument_size = 0;
+        uint64_t container_size = 0;
+        uint64_t string_length = 0;
+        jsmntype_t type = JSMN_PRIMITIVE;
+        if (type_byte <= 0x7f) {
+            scalar_length = builtin_format_unsigned(scalar, type_byte);
+        } else if (type_byte >= 0xe0) {
+            scalar_length = builtin_format_signed(scalar, (int8_t)type_byte);
+        } else if (type_byte <= 0x8f) {
+            type = JSMN_OBJECT;
+            container_size = type_byte & 0x0f;
+        } else if (type_byte <= 0x9f) {
+            type = JSMN_ARRAY;
+            container_size = type_byte & 0x0f;
+        } else if (type_byte <= 0xbf) {
+            type = JSMN_STRING;
+            string_length = type_byte & 0x1f;
+        } else {
+            switch (type_byte) {
+            case 0xc0:
+                memcpy(scalar, "null", 4);
+                scalar_length = 4;
+                break;
+            case 0xc2:
+                memcpy(scalar, "false", 5);
+                scalar_length = 5;
+                break;
+            case 0xc3:
+                memcpy(scalar, "true", 4);
+                scalar_length = 4;
+                break;
+            case 0xca:
+            case 0xcb:
+            case 0xcc:
+            case 0xcd:
+            case 0xce:
+            case 0xcf:
+            case 0xd0:
+            case 0xd1:
+            case 0xd2:
+            case 0xd3:
+                argument_size = type_byte == 0xca ? 4 : type_byte == 0xcb ? 8 : (size_t)1 << (type_byte & 0x03);
+                break;
+            case 0xd9:
+            case 0xda:
+            case 0xdb:
+                type = JSMN_STRING;
+                argument_size = (size_t)1 << (type_byte - 0xd9);
+                break;
+            case 0xdc:
+            case 0xdd:
+                type = JSMN_ARRAY;
+                argument_size = (size_t)2 << (type_byte - 0xdc);
+                break;
+            case 0xde:
+            case 0xdf:
+                type = JSMN_OBJECT;
+                argument_size = (size_t)2 << (type_byte - 0xde);
+                break;
+            default:
+                /* Binary data and extension types have no JSON equivalent */
+                JS2C_MSGPACK_ERROR(JSMN_ERROR_INVAL, item_start);
+            }
+        }
+        if (argument_size > 0) {
+            if (JS2C_UNLIKELY(length - pos < argument_size)) {
+                JS2C_MSGPACK_ERROR(JSMN_ERROR_PART, item_start);
+            }
+            const uint64_t argument = builtin_msgpack_read(data + pos, argument_size);
+            pos += argument_size;
+            if (type == JSMN_STRING) {
+                string_length = argument;
+            } else if (type != JSMN_PRIMITIVE) {
+                container_size = argument;
+            } else if (type_byte == 0xca) {
+                const uint32_t bits = (uint32_t)argument;
+                float value;
+                memcpy(&value, &bits, sizeof(value));
+                scalar_length = builtin_format_double(scalar, value);
+            } else if (type_byte == 0xcb) {
+                double value;
+                memcpy(&value, &argument, sizeof(value));
+                scalar_length = builtin_format_double(scalar, value);
+            } else if (type_byte <= 0xcf) {
+                scalar_length = builtin_format_unsigned(scalar, argument);
+            } else {
+                /* Sign extension */
+                const unsigned int shift = 64 - 8 * (unsigned int)argument_size;
+                scalar_length = builtin_format_signed(scalar, (int64_t)(argument << shift) >> shift);
+            }
+        }
+        /* Keys are strings in JSON */
+        if (JS2C_UNLIKELY(is_key && type != JSMN_STRING)) {
+            JS2C_MSGPACK_ERROR(JSMN_ERROR_INVAL, item_start);
+        }
+
+        token->type = type;
+        token->size = is_key ? 1 : 0;
+        if (type == JSMN_STRING) {
+            if (JS2C_UNLIKELY(length - pos < string_length)) {
+                JS2C_MSGPACK_ERROR(JSMN_ERROR_PART, item_start);
+            }
+            JS2C_MSGPACK_RESERVE(string_length + 2, item_start);
+            /* Short strings (mostly keys) are copied and checked in one pass, without library calls */
+            bool has_nul = false;
+            if (string_length <= 16) {
+                for (size_t i = 0; i < string_length; ++i) {
+                    buffer[text + 1 + i] = (char)data[pos + i];
+                    has_nul |= data[pos + i] == 0;
+                }
+            } else {
+                has_nul = memchr(data + pos, '\0', string_length) != NULL;
+                memcpy(buffer + text + 1, data + pos, string_length);
+            }
+            /* The string would be cut short in the parsed struct */
+            if (JS2C_UNLIKELY(has_nul)) {
+                JS2C_MSGPACK_ERROR(JSMN_ERROR_INVAL, item_start);
+            }
+            buffer[text++] = '\"';
+            token->start = (int)text;
+            text += string_length;
+            token->end = (int)text;
+            buffer[text++] = '\"';
+            pos += string_length;
+        } else if (type == JSMN_PRIMITIVE) {
+            JS2C_MSGPACK_RESERVE(scalar_length, item_start);
+            token->start = (int)text;
+            memcpy(buffer + text, scalar, scalar_length);
+            text += scalar_length;
+            token->end = (int)text;
+        } else {
+            const uint64_t items = type == JSMN_OBJECT ? 2 * container_size : container_size;
+            /* Every item needs a token, which also keeps the size within the bits of compact tokens */
+            if (JS2C_UNLIKELY(items > num_tokens - toknext - 1)) {
+                JS2C_MSGPACK_ERROR(JSMN_ERROR_NOMEM, item_start);
+            }
+            JS2C_MSGPACK_RESERVE(items == 0 ? 2 : 1, item_start);
+            token->start = (int)text;
+            token->size = (unsigned int)container_size;
+            buffer[text++] = type == JSMN_OBJECT ? '{' : '[';
+            if (items > 0) {
+                if (JS2C_UNLIKELY(depth >= JS2C_MSGPACK_MAX_DEPTH)) {
+                    JS2C_MSGPACK_ERROR(JSMN_ERROR_NOMEM, item_start);
+                }
+                stack[depth].token = (int)toknext;
+                stack[depth].items = items;
+                stack[depth].done = 0;
+                depth += 1;
+                toknext += 1;
+                continue;
+            }
+            buffer[text++] = type == JSMN_OBJECT ? '}' : ']';
+            token->end = (int)text;
+        }
+        toknext += 1;
+        /* Close the containers completed by this item */
+        while (depth > 0) {
+            builtin_msgpack_container_t *container = &stack[depth - 1];
+            container->done += 1;
+            if (container->done < container->items) {
+                break;
+            }
+            JS2C_MSGPACK_RESERVE(1, pos);
+            buffer[text++] = tokens[container->token].type == JSMN_OBJECT ? '}' : ']';
+            tokens[container->token].end = (int)text;
+            depth -= 1;
+        }
+    } while (depth > 0);
+    if (JS2C_UNLIKELY(pos != length)) {
+        JS2C_MSGPACK_ERROR(JSMN_ERROR_INVAL, pos);
+    }
+    /* Numbers are parsed with strto*, which need a terminator after a root primitive */
+    JS2C_MSGPACK_RESERVE(1, pos);
+    buffer[text] = '\0';
+    parse_state->max_token_num = toknext;
+    return false;
+#undef JS2C_MSGPACK_RESERVE
+#undef JS2C_MSGPACK_ERROR
+}
+#endif
+
+#ifdef JS2C_TABLE_PARSER
+/* The table-driven parser: instead of a function per schema node, the schema is described by constant
+ * tables of js2c_node_t-s, which are run by the generic builtin_table_parse. It fills the same structs,
+ * with the same checks and errors. */
+enum {
+    JS2C_NODE_OBJECT,
+    JS2C_NODE_ARRAY,
+    JS2C_NODE_SIGNED,
+    JS2C_NODE_UNSIGNED,
+    JS2C_NODE_DOUBLE,
+    JS2C_NODE_BOOL,
+    JS2C_NODE_STRING,
+    JS2C_NODE_ENUM,
+};
+
+/* Bits of js2c_node_t.flags */
+#define JS2C_NODE_HAS_DEFAULT 0x01
+#define JS2C_NODE_HAS_MINIMUM 0x02
+#define JS2C_NODE_EXCLUSIVE_MINIMUM 0x04
+#define JS2C_NODE_HAS_MAXIMUM 0x08
+#define JS2C_NODE_EXCLUSIVE_MAXIMUM 0x10
+#define JS2C_NODE_NUMBER_ALLOWED 0x20
+#define JS2C_NODE_STRING_ALLOWED 0x40
+#define JS2C_NODE_ADDITIONAL_PROPERTIES 0x80
+
+/* Objects with more fields are not supported, as the seen flags are on the stack */
+#define JS2C_TABLE_MAX_FIELDS 256
+
+typedef struct js2c_node_s js2c_node_t;
+
+typedef struct js2c_field_s {
+    const char *name;
+    const js2c_node_t *node;
+    uint32_t offset;
+} js2c_field_t;
+
+typedef union js2c_value_u {
+    int64_t i;
+    uint64_t u;
+    double d;
+    const char *s;
+} js2c_value_t;
+
+struct js2c_node_s {
+    uint8_t kind;
+    uint8_t flags;
+    /* The size of the stored integer or enum */
+    uint8_t size;
+    /* Of integers in strings */
+    uint8_t radix;
+    /* minLength or minItems */
+    uint32_t min_count;
+    /* maxLength, maxItems, or the number of fields or enum labels */
+    uint32_t max_count;
+    /* The offset and size of the items of arrays */
+    uint32_t item_offset;
+    uint32_t item_size;
+    const js2c_node_t *item;
+    const js2c_field_t *fields;
+    const char *const *labels;
+    js2c_value_t minimum;
+    js2c_value_t maximum;
+    js2c_value_t default_value;
+};
+
+static bool builtin_table_parse(parse_state_t *parse_state, const js2c_node_t *node, void *out);
+
+static void builtin_table_store_integer(void *out, uint8_t size, uint64_t value) {
+    /* Integers are converted to the stored type, like in an assignment */
+    switch (size) {
+    case 1: {
+        const uint8_t narrow = (uint8_t)value;
+        memcpy(out, &narrow, 1);
+        break;
+    }
+    case 2: {
+        const uint16_t narrow = (uint16_t)value;
+        memcpy(out, &narrow, 2);
+        break;
+    }
+    case 4: {
+        const uint32_t narrow = (uint32_t)value;
+        memcpy(out, &narrow, 4);
+        break;
+    }
+    default:
+        memcpy(out, &value, 8);
+        break;
+    }
+}
+
+static void builtin_table_set_default(const js2c_node_t *node, char *out) {
+    switch (node->kind) {
+    case JS2C_NODE_OBJECT:
+        for (uint32_t i = 0; i < node->max_count; ++i) {
+            builtin_table_set_default(node->fields[i].node, out + node->fields[i].offset);
+        }
+        break;
+    case JS2C_NODE_ARRAY:
+        *(uint64_t *)out = 0;
+        break;
+    case JS2C_NODE_SIGNED:
+    case JS2C_NODE_UNSIGNED:
+    case JS2C_NODE_ENUM:
+        builtin_table_store_integer(out, node->size, node->default_value.u);
+        break;
+    case JS2C_NODE_DOUBLE:
+        *(double *)out = node->default_value.d;
+        break;
+    case JS2C_NODE_BOOL:
+        *(bool *)out = node->default_value.u != 0;
+        break;
+    case JS2C_NODE_STRING:
+        strcpy(out, node->default_value.s);
+        break;
+    }
+}
+
+static JS2C_COLD void builtin_table_log_integer_range(
+    parse_state_t *parse_state, const js2c_node_t *node, uint64_t value, bool too_large
+) {
+    (void)parse_state;
+    (void)node;
+    (void)value;
+    const uint8_t exclusive_flag = too_large ? JS2C_NODE_EXCLUSIVE_MAXIMUM : JS2C_NODE_EXCLUSIVE_MINIMUM;
+    const char *operator_string = too_large ?
+        (node->flags & exclusive_flag ? "<" : "<=") :
+        (node->flags & exclusive_flag ? ">" : ">=");
+    (void)operator_string;
+    const js2c_value_t limit = too_large ? node->maximum : node->minimum;
+    (void)limit;
+    if (node->kind == JS2C_NODE_SIGNED) {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Integer %" PRIi64 " in '%s' out of range. It must be %s %" PRIi64 ".",
+            (int64_t)value,
+            parse_state->current_key,
+            operator_string,
+            limit.i
+        );
+    } else {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Integer %" PRIu64 " in '%s' out of range. It must be %s %" PRIu64 ".",
+            value,
+            parse_state->current_key,
+            operator_string,
+            limit.u
+        );
+    }
+}
+
+static bool builtin_table_parse_integer(parse_state_t *parse_state, const js2c_node_t *node, void *out) {
+    const bool number_allowed = node->flags & JS2C_NODE_NUMBER_ALLOWED;
+    const bool string_allowed = node->flags & JS2C_NODE_STRING_ALLOWED;
+    uint64_t value;
+    bool too_small;
+    bool too_large;
+    if (node->kind == JS2C_NODE_SIGNED) {
+        int64_t signed_value;
+        if (builtin_parse_signed(parse_state, number_allowed, string_allowed, node->radix, &signed_value)) {
+            return true;
+        }
+        too_small = (node->flags & JS2C_NODE_HAS_MINIMUM) && (
+            signed_value < node->minimum.i ||
+            ((node->flags & JS2C_NODE_EXCLUSIVE_MINIMUM) && signed_value == node->minimum.i)
+        );
+        too_large = (node->flags & JS2C_NODE_HAS_MAXIMUM) && (
+            signed_value > node->maximum.i ||
+            ((node->flags & JS2C_NODE_EXCLUSIVE_MAXIMUM) && signed_value == node->maximum.i)
+        );
+        value = (uint64_t)signed_value;
+    } else {
+        if (builtin_parse_unsigned(parse_state, number_allowed, string_allowed, node->radix, &value)) {
+            return true;
+        }
+        too_small = (node->flags & JS2C_NODE_HAS_MINIMUM) && (
+            value < node->minimum.u ||
+            ((node->flags & JS2C_NODE_EXCLUSIVE_MINIMUM) && value == node->minimum.u)
+        );
+        too_large = (node->flags & JS2C_NODE_HAS_MAXIMUM) && (
+            value > node->maximum.u ||
+            ((node->flags & JS2C_NODE_EXCLUSIVE_MAXIMUM) && value == node->maximum.u)
+        );
+    }
+    if (JS2C_UNLIKELY(too_small || too_large)) {
+        /* Roll back the token, as the value was not actually correct */
+        parse_state->current_token -= 1;
+        builtin_table_log_integer_range(parse_state, node, value, too_large);
+        return true;
+    }
+    if (out != NULL) {
+        builtin_table_store_integer(out, node->size, value);
+    }
+    return false;
+}
+
+static JS2C_COLD void builtin_table_log_double_range(
+    parse_state_t *parse_state, const js2c_node_t *node, double value, bool too_large
+) {
+    (void)parse_state;
+    (void)node;
+    (void)value;
+    (void)too_large;
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Floating point value %.15g in '%s' out of range. It must be %s %.15g.",
+        value,
+        parse_state->current_key,
+        too_large ?
+            (node->flags & JS2C_NODE_EXCLUSIVE_MAXIMUM ? "<" : "<=") :
+            (node->flags & JS2C_NODE_EXCLUSIVE_MINIMUM ? ">" : ">="),
+        too_large ? node->maximum.d : node->minimum.d
+    );
+}
+
+static bool builtin_table_parse_double(parse_state_t *parse_state, const js2c_node_t *node, void *out) {
+    double value;
+    if (builtin_parse_double(parse_state, &value)) {
+        return true;
+    }
+    const bool too_small = (node->flags & JS2C_NODE_HAS_MINIMUM) && !(
+        (node->flags & JS2C_NODE_EXCLUSIVE_MINIMUM) ? value > node->minimum.d : value >= node->minimum.d
+    );
+    const bool too_large = (node->flags & JS2C_NODE_HAS_MAXIMUM) && !(
+        (node->flags & JS2C_NODE_EXCLUSIVE_MAXIMUM) ? value < node->maximum.d : value <= node->maximum.d
+    );
+    if (JS2C_UNLIKELY(too_small || too_large)) {
+        parse_state->current_token -= 1;
+        builtin_table_log_double_range(parse_state, node, value, too_large);
+        return true;
+    }
+    if (out != NULL) {
+        *(double *)out = value;
+    }
+    return false;
+}
+
+static bool builtin_table_parse_enum(parse_state_t *parse_state, const js2c_node_t *node, void *out) {
+    if (check_type(parse_state, JSMN_STRING)) {
+        return true;
+    }
+    for (uint32_t i = 0; i < node->max_count; ++i) {
+        if (current_string_is(parse_state, node->labels[i])) {
+            if (out != NULL) {
+                builtin_table_store_integer(out, node->size, i);
+            }
+            parse_state->current_token += 1;
+            return false;
+        }
+    }
+    REPORT_ERROR(
+        parse_state,
+        CURRENT_TOKEN(parse_state).start,
+        "Unknown enum value in '%s': %.*s",
+        parse_state->current_key,
+        CURRENT_STRING_FOR_ERROR(parse_state)
+    );
+    return true;
+}
+
+static bool builtin_table_parse_array(parse_state_t *parse_state, const js2c_node_t *node, char *out) {
+    if (check_type(parse_state, JSMN_ARRAY)) {
+        return true;
+    }
+    const int n = CURRENT_TOKEN(parse_state).size;
+    if (JS2C_UNLIKELY((uint32_t)n > node->max_count)) {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Array '%s' too large. Length: %i. Maximum length: %" PRIu32 ".",
+            parse_state->current_key,
+            n,
+            node->max_count
+        );
+        return true;
+    }
+    if (JS2C_UNLIKELY((uint32_t)n < node->min_count)) {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Array '%s' too small. Length: %i. Minimum length: %" PRIu32 ".",
+            parse_state->current_key,
+            n,
+            node->min_count
+        );
+        return true;
+    }
+    if (out != NULL) {
+        *(uint64_t *)out = n;
+    }
+    parse_state->current_token += 1;
+    for (int i = 0; i < n; ++i) {
+        char *item_out = out != NULL ? out + node->item_offset + (size_t)i * node->item_size : NULL;
+        if (builtin_table_parse(parse_state, node->item, item_out)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+static bool builtin_table_check_key(parse_state_t *parse_state) {
+    if (JS2C_UNLIKELY(CURRENT_TOKEN(parse_state).size > 1)) {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Missing separator between values in '%s', after key: %.*s",
+            parse_state->current_key,
+            CURRENT_STRING_FOR_ERROR(parse_state)
+        );
+        return true;
+    }
+    if (JS2C_UNLIKELY(CURRENT_TOKEN(parse_state).size < 1)) {
+        REPORT_ERROR(
+            parse_state,
+            CURRENT_TOKEN(parse_state).start,
+            "Missing value in '%s', after key: %.*s",
+            parse_state->current_key,
+            CURRENT_STRING_FOR_ERROR(parse_state)
+        );
+        return true;
+    }
+    return false;
+}
+
+static bool builtin_table_parse_object(parse_state_t *parse_state, const js2c_node_t *node, char *out) {
+    if (check_type(parse_state, JSMN_OBJECT)) {
+        return true;
+    }
+    uint64_t seen[JS2C_TABLE_MAX_FIELDS / 64] = {0};
+    const uint64_t object_start_token = parse_state->current_token;
+    const uint64_t n = CURRENT_TOKEN(parse_state).size;
+    parse_state->current_token += 1;
+    /* Most documents have their fields in schema order, so the field after the previous one is tried first */
+    uint32_t next_field_index = 0;
+    for (uint64_t i = 0; i < n; ++i) {
+        if (builtin_table_check_key(parse_state)) {
+            return true;
+        }
+        uint32_t field_index = next_field_index;
+        if (field_index >= node->max_count || !current_string_is(parse_state, node->fields[field_index].name)) {
+            for (field_index = 0; field_index < node->max_count; ++field_index) {
+                if (current_string_is(parse_state, node->fields[field_index].name)) {
+                    break;
+                }
+            }
+        }
+        if (field_index == node->max_count) {
+            if (node->flags & JS2C_NODE_ADDITIONAL_PROPERTIES) {
+                parse_state->current_token += 1;
+                builtin_skip(parse_state);
+                continue;
+            }
+            REPORT_ERROR(
+                parse_state,
+                CURRENT_TOKEN(parse_state).start,
+                "Unknown field in '%s': %.*s",
+                parse_state->current_key,
+                CURRENT_STRING_FOR_ERROR(parse_state)
+            );
+            return true;
+        }
+        const js2c_field_t *field = &node->fields[field_index];
+        if (JS2C_UNLIKELY(seen[field_index / 64] & (UINT64_C(1) << (field_index % 64)))) {
+            REPORT_ERROR(
+                parse_state,
+                CURRENT_TOKEN(parse_state).start,
+                "Duplicate field definition in '%s': %s",
+                parse_state->current_key,
+                field->name
+            );
+            return true;
+        }
+        seen[field_index / 64] |= UINT64_C(1) << (field_index % 64);
+        parse_state->current_token += 1;
+#ifndef JS2C_LEAN_PARSER
+        const char *saved_key = parse_state->current_key;
+        parse_state->current_key = field->name;
+#endif
+        if (builtin_table_parse(parse_state, field->node, out != NULL ? out + field->offset : NULL)) {
+            return true;
+        }
+#ifndef JS2C_LEAN_PARSER
+        parse_state->current_key = saved_key;
+#endif
+        next_field_index = field_index + 1;
+    }
+
+    /* Missing fields are reported at the start of the object */
+    const uint64_t saved_current_token = parse_state->current_token;
+    parse_state->current_token = object_start_token;
+    for (uint32_t field_index = 0; field_index < node->max_count; ++field_index) {
+        if (seen[field_index / 64] & (UINT64_C(1) << (field_index % 64))) {
+            continue;
+        }
+        const js2c_field_t *field = &node->fields[field_index];
+        if (JS2C_UNLIKELY(!(field->node->flags & JS2C_NODE_HAS_DEFAULT))) {
+            REPORT_ERROR(
+                parse_state,
+                CURRENT_TOKEN(parse_state).start,
+                "Missing required field in '%s': %s",
+                parse_state->current_key,
+                field->name
+            );
+            return true;
+        }
+        if (out != NULL) {
+            builtin_table_set_default(field->node, out + field->offset);
+        }
+    }
+    parse_state->current_token = saved_current_token;
+    return false;
+}
+
+/* Parse the value described by node into out, or only validate it if out is NULL */
+static bool builtin_table_parse(parse_state_t *parse_state, const js2c_node_t *node, void *out) {
+    switch (node->kind) {
+    case JS2C_NODE_OBJECT:
+        return builtin_table_parse_object(parse_state, node, (char *)out);
+    case JS2C_NODE_ARRAY:
+        return builtin_table_parse_array(parse_state, node, (char *)out);
+    case JS2C_NODE_SIGNED:
+    case JS2C_NODE_UNSIGNED:
+        return builtin_table_parse_integer(parse_state, node, out);
+    case JS2C_NODE_DOUBLE:
+        return builtin_table_parse_double(parse_state, node, out);
+    case JS2C_NODE_BOOL: {
+        bool value;
+        if (builtin_parse_bool(parse_state, &value)) {
+            return true;
+        }
+        if (out != NULL) {
+            *(bool *)out = value;
+        }
+        return false;
+    }
+    case JS2C_NODE_STRING:
+        if (out != NULL) {
+            return builtin_parse_string(parse_state, (char *)out, node->min_count, node->max_count);
+        }
+        if (builtin_check_current_string(parse_state, node->min_count, node->max_count)) {
+            return true;
+        }
+        parse_state->current_token += 1;
+        return false;
+    case JS2C_NODE_ENUM:
+        return builtin_table_parse_enum(parse_state, node, out);
+    default:
+        return true;
+    }
+}
+#endif
+
+#ifdef JS2C_FILE_PARSER
+#include <errno.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+/* Map a whole file read-only into memory, so that it can be parsed without copying it.
+ * Token positions are offsets from the start of the mapping, so they are file positions too. */
+static bool builtin_map_file(parse_state_t *parse_state, const char *path, const char **contents, size_t *length) {
+    (void)parse_state;
+    /* Errors before tokenizing are not at any token */
+    parse_state->current_token = 0;
+    const int fd = open(path, O_RDONLY);
+    if (fd < 0) {
+        RECORD_ERROR(parse_state, JS2C_ERROR_IO, JS2C_ERROR_VALUE(s, path), JS2C_ERROR_VALUE(i, errno))
+        REPORT_ERROR(parse_state, 0, "Could not open '%s'", path);
+        return true;
+    }
+    struct stat file_stat;
+    if (fstat(fd, &file_stat) != 0) {
+        RECORD_ERROR(parse_state, JS2C_ERROR_IO, JS2C_ERROR_VALUE(s, path), JS2C_ERROR_VALUE(i, errno))
+        REPORT_ERROR(parse_state, 0, "Could not stat '%s'", path);
+        close(fd);
         return true;
     }
+    /* jsmn stores positions as int */
+    if ((uint64_t)file_stat.st_size > INT_MAX) {
+        RECORD_ERROR(parse_state, JS2C_ERROR_IO, JS2C_ERROR_VALUE(s, path), JS2C_ERROR_VALUE(i, EFBIG))
+        REPORT_ERROR(parse_state, 0, "File too large: '%s'", path);
+        close(fd);
+        return true;
+    }
+    *length = file_stat.st_size;
+    if (*length == 0) {
+        /* Empty mappings are not allowed, and there is nothing to map anyway */
+        *contents = "";
+        close(fd);
+        return false;
+    }
+    void *mapping = mmap(NULL, *length, PROT_READ, MAP_PRIVATE, fd, 0);
+    if (mapping == MAP_FAILED) {
+        RECORD_ERROR(parse_state, JS2C_ERROR_IO, JS2C_ERROR_VALUE(s, path), JS2C_ERROR_VALUE(i, errno))
+        REPORT_ERROR(parse_state, 0, "Could not map '%s'", path);
+        close(fd);
+        return true;
+    }
+    /* The mapping stays valid after the file is closed */
+    close(fd);
+#ifdef MADV_SEQUENTIAL
+    madvise(mapping, *length, MADV_SEQUENTIAL);
+#endif
+    *contents = (const char *)mapping;
     return false;
 }
 
+static void builtin_unmap_file(const char *contents, size_t length) {
+    if (length != 0) {
+        munmap((void *)contents, length);
+    }
+}
+#endif
+
 #endif /* JS2C_BUILTINS_H */
@@ -24,12 +24,14 @@
 #
 
 import argparse
+import io
 import os
 import sys
 
 from js2c.schema import load_schema
 from js2c.codegen.base import SchemaError
 from js2c.codegen.root import RootGenerator
+from js2c.files import write_if_changed
 from js2c.settings import Settings
 
 HELP = """
@@ -58,12 +60,10 @@ def parse_args():
     )
     parser.add_argument(
         "c_file",
-        type=argparse.FileType('w'),
         help="Filename of the generated parser .c file",
     )
     parser.add_argument(
         "h_file",
-        type=argparse.FileType('w'),
         help="Filename of the generated parser .h file",
     )
     Settings.fill_argparse(parser)
@@ -75,8 +75,17 @@ def main(args):
     settings = Settings(vars(args), schema.get('js2cSettings', {}))
     try:
         root_generator = RootGenerator(schema, settings)
-        root_generator.generate_parser_h(args.h_file)
-        root_generator.generate_parser_c(args.c_file, os.path.basename(args.h_file.name))
+        h_file = io.StringIO()
+        h_file.name = args.h_file
+        c_file = io.StringIO()
+        c_file.name = args.c_file
+        root_generator.generate_parser_h(h_file)
+        root_generator.generate_parser_c(c_file, os.path.basename(args.h_file))
+        outputs = [(args.h_file, h_file.getvalue()), (args.c_file, c_file.getvalue())]
+        outputs.extend(root_generator.generate_extra_outputs(args.c_file, args.h_file))
+        # Unchanged files are not rewritten, so that build systems only recompile what changed
+        for file_name, contents in outputs:
+            write_if_changed(file_name, contents)
     except SchemaError as e:
         print(e, file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NON-INFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import sys
+
+from js2c.daemon import GeneratorDaemon
+from js2c.settings import Settings
+
+HELP = """
+Keep the JSON Schema to C generator running, and regenerate parsers on demand, or when their schemas change.
+Regenerations take milliseconds, as there is no process startup, and the generator's own files are only read once.
+""".strip()
+
+HELP_EPILOG = """
+Requests on stdin (--stdin) or on a unix socket (--socket) are JSON objects, one per line:
+{"schema_file": "a.schema.json", "c_file": "a.parser.c", "h_file": "a.parser.h", "settings": {"leanParser": true}}
+The settings are optional, and are in the same format as js2cSettings. Each request is answered with a line like:
+{"status": "ok", "regenerated": true, "time_ms": 12.5}
+or {"status": "error", "message": "..."}. Parsers are only regenerated if any of their input files changed.
+
+Settings given on the command line apply to every parser.
+""".strip()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=HELP,
+        epilog=HELP_EPILOG,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="schema_file c_file h_file",
+        help="Schema and output file triplets to watch. Each of them is regenerated whenever its schema, or any file \n"
+        "it includes (like the prefix files) changes.",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Answer generation requests from stdin, on stdout, until the end of the input.",
+    )
+    mode.add_argument(
+        "--socket",
+        metavar="path",
+        help="Answer generation requests on this unix domain socket.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.1,
+        metavar="seconds",
+        help="How often to check the watched files for changes.",
+    )
+    Settings.fill_argparse(parser, convert_values=False)
+    args = parser.parse_args()
+    if len(args.files) % 3 != 0:
+        parser.error("Files to watch must be given as schema_file c_file h_file triplets")
+    if not args.files and not args.stdin and not args.socket:
+        parser.error("Either files to watch, --stdin, or --socket is needed")
+    if args.files and (args.stdin or args.socket):
+        parser.error("Files can only be watched if no requests are served")
+    return args
+
+
+def main(args):
+    settings_args = {
+        name: value for name, value in vars(args).items()
+        if name not in ("files", "stdin", "socket", "poll_interval") and value is not None
+    }
+    daemon = GeneratorDaemon(settings_args)
+    try:
+        if args.stdin:
+            daemon.serve_stream(sys.stdin, sys.stdout)
+        elif args.socket:
+            daemon.serve_socket(args.socket)
+        else:
+            daemon.watch([args.files[i:i + 3] for i in range(0, len(args.files), 3)], args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,40 @@
+#include "columnar.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(
+        "{\"samples\": ["
+            "{\"ts\": 10, \"value\": 1.5, \"quality\": \"bad\"},"
+            "{\"value\": 2.5, \"ts\": 20},"
+            "{\"ts\": 30, \"value\": -1}"
+        "], \"other_samples\": []}",
+        &root
+    ));
+    assert(root.samples.n == 3);
+    assert(root.samples.ts[0] == 10);
+    assert(root.samples.ts[1] == 20);
+    assert(root.samples.ts[2] == 30);
+    assert(root.samples.value[0] == 1.5);
+    assert(root.samples.value[1] == 2.5);
+    assert(root.samples.value[2] == -1);
+    assert(strcmp(root.samples.quality[0], "bad") == 0);
+    assert(strcmp(root.samples.quality[1], "good") == 0);
+    assert(strcmp(root.samples.quality[2], "good") == 0);
+    assert(root.other_samples.n == 0);
+
+    /* The columns are contiguous */
+    assert((char*)&root.samples.ts[1] - (char*)&root.samples.ts[0] == sizeof(root.samples.ts[0]));
+
+    assert(json_parse_root("{\"samples\": [{\"ts\": 10}], \"other_samples\": []}", &root));
+    assert(json_parse_root("{\"samples\": [{\"ts\": -1, \"value\": 1}], \"other_samples\": []}", &root));
+    assert(json_parse_root("{\"samples\": [{\"ts\": 1, \"value\": 1, \"x\": 1}], \"other_samples\": []}", &root));
+    assert(json_parse_root("{\"samples\": [1], \"other_samples\": []}", &root));
+    assert(json_parse_root("{\"samples\": [{}, {}, {}, {}, {}], \"other_samples\": []}", &root));
+    return 0;
+}
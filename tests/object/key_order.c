@@ -0,0 +1,36 @@
+#include "key_order.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static void check(const char* json){
+    root_t root = {};
+    if (json_parse_root(json, &root)){
+        fprintf(stderr, "Could not parse: %s\n", json);
+        assert(false);
+    }
+    assert(root.a == 1);
+    assert(root.b == 2);
+    assert(root.c == 3);
+    assert(root.d == 4);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    check("{\"a\": 1, \"b\": 2, \"c\": 3, \"d\": 4}");
+    check("{\"d\": 4, \"c\": 3, \"b\": 2, \"a\": 1}");
+    check("{\"b\": 2, \"c\": 3, \"d\": 4, \"a\": 1}");
+    check("{\"a\": 1, \"c\": 3, \"b\": 2, \"d\": 4}");
+    check("{\"x\": 0, \"a\": 1, \"y\": 0, \"b\": 2, \"c\": 3, \"z\": 0, \"d\": 4}");
+    check("{\"a\": 1, \"bb\": 0, \"b\": 2, \"c\": 3, \"d\": 4}");
+
+    /* Duplicates are found both on the guessed and on the searched path */
+    assert(json_parse_root("{\"a\": 1, \"a\": 1, \"b\": 2, \"c\": 3, \"d\": 4}", &root));
+    assert(json_parse_root("{\"a\": 1, \"b\": 2, \"a\": 1, \"c\": 3, \"d\": 4}", &root));
+    assert(json_parse_root("{\"a\": 1, \"b\": 2, \"c\": 3, \"d\": 4, \"d\": 4}", &root));
+    assert(json_parse_root("{\"a\": 1, \"b\": 2, \"c\": 3}", &root));
+    return 0;
+}
@@ -0,0 +1,76 @@
+#include "map.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static void check_both(const char* json, const char* expected_str, int expected_pos){
+    check_error(json, expected_str, expected_pos);
+    last_error[0] = 0;
+    assert(json_validate_root(json, strlen(json)));
+    assert(!strcmp(last_error, expected_str));
+    assert(last_error_pos == expected_pos);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    const char *json = "{\"labels\": {\"host\": \"web1\", \"zone\": \"eu\", \"\": \"empty\"}, \"optional\": {\"x\": true}}";
+    assert(!json_parse_root(json, &root));
+    assert(!json_validate_root(json, strlen(json)));
+    assert(root.labels.n == 3);
+    assert(!strcmp(*root_labels_get(&root.labels, "host", 4), "web1"));
+    assert(!strcmp(*root_labels_get(&root.labels, "zone", 4), "eu"));
+    assert(!strcmp(*root_labels_get(&root.labels, "", 0), "empty"));
+    assert(root_labels_get(&root.labels, "hos", 3) == NULL);
+    assert(root_labels_get(&root.labels, "hostname_too_long", 17) == NULL);
+    assert(*root_optional_get(&root.optional, "x", 1));
+    assert(root.counters.n == 0);
+    assert(counter_map_get(&root.counters, "x", 1) == NULL);
+
+    /* Iteration is in document order */
+    const char *expected_keys[] = {"host", "zone", ""};
+    int i = 0;
+    ROOT_LABELS_FOREACH(&root.labels, entry) {
+        assert(!strcmp(entry->key, expected_keys[i]));
+        assert(entry->key_length == strlen(expected_keys[i]));
+        i += 1;
+    }
+    assert(i == 3);
+
+    /* Fill a larger map, so that there are hash collisions */
+    char big_json[2000] = "{\"labels\": {}, \"counters\": {";
+    for (int j = 0; j < 100; ++j) {
+        char field[20];
+        snprintf(field, sizeof(field), "%s\"%d\": %d", j ? ", " : "", j, j * 10);
+        strcat(big_json, field);
+    }
+    strcat(big_json, "}}");
+    assert(!json_parse_root(big_json, &root));
+    assert(!json_validate_root(big_json, strlen(big_json)));
+    assert(root.counters.n == 100);
+    for (int j = 0; j < 100; ++j) {
+        char key[5];
+        snprintf(key, sizeof(key), "%d", j);
+        const int64_t *value = counter_map_get(&root.counters, key, strlen(key));
+        assert(value && *value == j * 10);
+    }
+    assert(counter_map_get(&root.counters, "100", 3) == NULL);
+    assert(root.labels.n == 0);
+    assert(root_labels_get(&root.labels, "host", 4) == NULL);
+
+    check_both("{\"labels\": {\"a\": \"1\", \"b\": \"2\", \"a\": \"3\"}}", "Duplicate key in 'labels': a", 33);
+    check_both("{\"labels\": {}, \"counters\": {\"abcd\": 1, \"abc\": 2, \"abcd\": 3}}", "Duplicate key in 'counters': abcd", 50);
+    check_both(
+        "{\"labels\": {\"a\": \"1\", \"b\": \"2\", \"c\": \"3\", \"d\": \"4\", \"e\": \"5\", \"f\": \"6\"}}",
+        "Too many keys in 'labels'. Count: 6. Maximum: 5.",
+        11
+    );
+    check_both("{\"labels\": {}, \"counters\": {}}", "Too few keys in 'counters'. Count: 0. Minimum: 1.", 27);
+    check_both("{\"labels\": {\"too_long_key\": \"1\"}}", "String too large in 'labels'. Length: 12. Maximum length: 8.", 13);
+    check_both("{\"labels\": {\"a\": \"too long value\"}}", "String too large in 'labels'. Length: 14. Maximum length: 10.", 18);
+    check_both("{\"labels\": {}, \"counters\": {\"a\": 1001}}", "Integer 1001 in 'counters' out of range. It must be <= 1000.", 33);
+    check_both("{\"labels\": []}", "Unexpected token in 'labels': ARRAY instead of OBJECT", 11);
+    return 0;
+}
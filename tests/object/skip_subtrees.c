@@ -0,0 +1,55 @@
+#include "skip_subtrees.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static char json[100000];
+
+/* Append a subtree of roughly token_num tokens (6 per element), with nested containers, and strings with brackets in them */
+static void append_blob(int token_num){
+    strcat(json, "[");
+    for (int i = 0; i < token_num / 6; ++i){
+        strcat(json, i ? ", " : "");
+        strcat(json, "{\"a]}\": [\"{[\", 1, {}]}");
+    }
+    strcat(json, "]");
+}
+
+static void check_skip(int token_num){
+    root_t root = {};
+    json[0] = 0;
+    strcat(json, "{\"x\": ");
+    append_blob(token_num);
+    strcat(json, ", \"inner\": {\"blob\": ");
+    append_blob(token_num);
+    strcat(json, ", \"num\": 5, \"blob2\": ");
+    append_blob(token_num);
+    strcat(json, "}, \"y\": ");
+    append_blob(token_num);
+    strcat(json, ", \"name\": \"carrot\"}");
+    if (json_parse_root(json, &root)){
+        fprintf(stderr, "Could not parse: %s\n", json);
+        assert(false);
+    }
+    assert(!strcmp(root.name, "carrot"));
+    assert(root.inner.num == 5);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    for (int token_num = 0; token_num < 400; ++token_num){
+        check_skip(token_num);
+    }
+
+    /* Skipped values at the very end of the document */
+    assert(!json_parse_root("{\"name\": \"apple\", \"z\": [[[]], {\"a\": {\"b\": []}}]}", &root));
+    assert(!strcmp(root.name, "apple"));
+    assert(!json_parse_root("{\"name\": \"pear\", \"z\": \"]\"}", &root));
+    assert(!strcmp(root.name, "pear"));
+    assert(!json_parse_root("{\"name\": \"plum\", \"z\": \"\"}", &root));
+    assert(!strcmp(root.name, "plum"));
+    return 0;
+}
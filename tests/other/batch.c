@@ -0,0 +1,34 @@
+#include "batch.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    const char *documents[] = {
+        "{\"id\": 1, \"label\": \"one\"}",
+        "{\"id\": 2}",
+        "{\"id\": 3, \"label\": \"three\"}",
+    };
+    root_t records[3];
+    size_t failed_index = 42;
+    assert(!json_parse_root_batch(documents, 3, records, &failed_index));
+    assert(failed_index == 42);
+    assert(records[0].id == 1);
+    assert(strcmp(records[0].label, "one") == 0);
+    assert(records[1].id == 2);
+    assert(strcmp(records[1].label, "none") == 0);
+    assert(records[2].id == 3);
+    assert(strcmp(records[2].label, "three") == 0);
+
+    assert(!json_parse_root_batch(documents, 0, records, &failed_index));
+
+    documents[1] = "{\"id\": -2}";
+    assert(json_parse_root_batch(documents, 3, records, &failed_index));
+    assert(failed_index == 1);
+    assert(strcmp(last_error, "Invalid unsigned integer literal in 'id': -2") == 0);
+    assert(last_error_pos == 7);
+    return 0;
+}
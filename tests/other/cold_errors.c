@@ -0,0 +1,116 @@
+#include "cold_errors.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root("{\"the_array\": [1, 2], \"num\": -5000, \"fnum\": 4999.5, \"error_arr\": [{}]}", &root));
+    assert(root.num == -5000);
+    assert(root.fnum == 4999.5);
+    assert(root.unsigned_num == 420);
+
+    check_error(
+        "{",
+        "JSON syntax error: End-of-file reached (JSON file incomplete)",
+        1
+    );
+    check_error(
+        "[]",
+        "Unexpected token in 'document root': ARRAY instead of OBJECT",
+        0
+    );
+    check_error(
+        "{\"name\": \"n>8 here.\"}",
+        "String too large in 'name'. Length: 9. Maximum length: 8.",
+        10
+    );
+    check_error(
+        "{\"name\": \" <4\"}",
+        "String too short in 'name'. Length: 3. Minimum length: 4.",
+        10
+    );
+    check_error(
+        "{\"is_good\": 1}",
+        "Invalid boolean literal in 'is_good': 1",
+        12
+    );
+    check_error(
+        "{\"num\": 100e}",
+        "Invalid signed integer literal in 'num': 100e",
+        8
+    );
+    check_error(
+        "{\"num\": \"1234\"}",
+        "Unexpected token in 'num': STRING",
+        9
+    );
+    check_error(
+        "{\"num\": 5001}",
+        "Integer 5001 in 'num' out of range. It must be <= 5000.",
+        8
+    );
+    check_error(
+        "{\"unsigned_num\": -5}",
+        "Invalid unsigned integer literal in 'unsigned_num': -5",
+        17
+    );
+    check_error(
+        "{\"unsigned_num\": 120}",
+        "Integer 120 in 'unsigned_num' out of range. It must be >= 123.",
+        17
+    );
+    check_error(
+        "{\"fnum\": 0x100}",
+        "Invalid floating point literal in 'fnum': 0x100",
+        9
+    );
+    check_error(
+        "{\"fnum\": 5000}",
+        "Floating point value 5000 in 'fnum' out of range. It must be < 5000.",
+        9
+    );
+    check_error(
+        "{\"the_array\": [1,2,3,4]}",
+        "Array 'the_array' too large. Length: 4. Maximum length: 3.",
+        14
+    );
+    check_error(
+        "{\"the_array\": [1]}",
+        "Array 'the_array' too small. Length: 1. Minimum length: 2.",
+        14
+    );
+    check_error(
+        "{}",
+        "Missing required field in 'document root': the_array",
+        0
+    );
+    check_error(
+        "{\"num\": 1234, \"num\": 1234}",
+        "Duplicate field definition in 'document root': num",
+        15
+    );
+    check_error(
+        "{\"nonexistent\": true}",
+        "Unknown field in 'document root': nonexistent",
+        2
+    );
+    check_error(
+        "{\"the_array\": [1, 2], \"fnum\": }",
+        "Missing value in 'document root', after key: fnum",
+        23
+    );
+    check_error(
+        "{\"error_arr\": [{\"trigger\": \"ab\"}]}",
+        "Error parsing 'trigger', value=\"ab\": Custom error",
+        28
+    );
+    check_error(
+        "{\"the_enum\": \"x\"}",
+        "Unknown enum value in 'the_enum': x",
+        14
+    );
+    return 0;
+}
@@ -0,0 +1,51 @@
+#include "compact_tokens.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static const char *const document =
+    "{\"skipped\": {\"a\": [1, {\"b\": null}], \"c\": \"d\"}, \"name\": \"compact\", "
+    "\"items\": [{\"id\": 1, \"ratio\": 0.5}, {\"active\": true, \"id\": 2}], "
+    "\"labels\": {\"x\": \"y\", \"zz\": \"w\"}, \"also_skipped\": [[], {}]}";
+
+static void check_root(const root_t *root) {
+    assert(strcmp(root->name, "compact") == 0);
+    assert(root->items.n == 2);
+    assert(root->items.items[0].id == 1);
+    assert(root->items.items[0].ratio == 0.5);
+    assert(!root->items.items[0].active);
+    assert(root->items.items[1].id == 2);
+    assert(root->items.items[1].ratio == 1.0);
+    assert(root->items.items[1].active);
+    assert(root->labels.n == 2);
+    assert(strcmp(*root_labels_get(&root->labels, "zz", 2), "w") == 0);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root;
+    assert(!json_parse_root(document, &root));
+    check_root(&root);
+    assert(!json_validate_root(document, strlen(document)));
+
+    /* The built-in tokenizer continues after a partial token, in the compact format too */
+    char buffer[512];
+    for (size_t chunk_size = 1; chunk_size <= strlen(document); ++chunk_size) {
+        root_push_parser_t parser;
+        json_parse_root_init(&parser, buffer, sizeof(buffer));
+        for (size_t pos = 0; pos < strlen(document); pos += chunk_size) {
+            const size_t remaining = strlen(document) - pos;
+            assert(!json_parse_root_feed(&parser, document + pos, remaining < chunk_size ? remaining : chunk_size));
+        }
+        memset(&root, 0, sizeof(root));
+        assert(!json_parse_root_finish(&parser, &root));
+        check_root(&root);
+    }
+
+    check_error("{\"name\": \"x\", \"items\": [{\"id\": -1}]}", "Invalid unsigned integer literal in 'id': -1", 31);
+    check_error("{\"name\": \"x\", \"items\": [], \"labels\": {\"x\": \"y\", \"x\": \"z\"}}", "Duplicate key in 'labels': x", 49);
+    check_error("{\"name\": \"x\", \"items\": [}", "JSON syntax error: Invalid character", 24);
+    return 0;
+}
@@ -0,0 +1,75 @@
+#include "file_parser.parser.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <assert.h>
+#include <unistd.h>
+
+static char file_name[] = "/tmp/js2c_file_parser_XXXXXX";
+
+static void write_file(const char *contents, size_t length) {
+    FILE *file = fopen(file_name, "wb");
+    assert(file);
+    assert(fwrite(contents, 1, length, file) == length);
+    fclose(file);
+}
+
+static void check_file_error(const char *contents, const char *expected_str, int expected_pos) {
+    root_t root;
+    write_file(contents, strlen(contents));
+    assert(json_parse_root_file(file_name, &root));
+    if (strcmp(last_error, expected_str)) {
+        fprintf(stderr, "When parsing file %s\n", contents);
+        fprintf(stderr, "Last error: %s\n", last_error);
+        fprintf(stderr, "Expected  : %s\n", expected_str);
+        assert(false);
+    }
+    if (expected_pos != last_error_pos) {
+        fprintf(stderr, "When parsing file %s\n", contents);
+        fprintf(stderr, "Last error pos: %i\n", last_error_pos);
+        fprintf(stderr, "Expected   pos: %i\n", expected_pos);
+        assert(false);
+    }
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    int fd = mkstemp(file_name);
+    assert(fd >= 0);
+    close(fd);
+
+    root_t root;
+    const char *json = "{\"name\": \"file\", \"values\": [1, 2, 3]}";
+    write_file(json, strlen(json));
+    assert(!json_parse_root_file(file_name, &root));
+    assert(strcmp(root.name, "file") == 0);
+    assert(root.values.n == 3);
+    assert(root.values.items[2] == 3);
+
+    /* The file is not NUL terminated, and the document ends exactly at a page boundary */
+    char page[4096];
+    memset(page, ' ', sizeof(page));
+    memcpy(page, "{\"name\": \"x\", \"values\": [4]", 27);
+    page[sizeof(page) - 1] = '}';
+    write_file(page, sizeof(page));
+    assert(!json_parse_root_file(file_name, &root));
+    assert(strcmp(root.name, "x") == 0);
+    assert(root.values.n == 1);
+    page[sizeof(page) - 1] = ' ';
+    write_file(page, sizeof(page));
+    assert(json_parse_root_file(file_name, &root));
+
+    /* Error positions are positions in the file */
+    check_file_error("\n\n   {\"name\": \"too long name\"}", "String too large in 'name'. Length: 13. Maximum length: 8.", 15);
+    check_file_error("{\"name\": \"x\", \"values\": [1, 2x]}", "Invalid signed integer literal in 'values': 2x", 28);
+    check_file_error("", "JSON syntax error: End-of-file reached (JSON file incomplete)", 0);
+    check_file_error("\n\n", "JSON syntax error: End-of-file reached (JSON file incomplete)", 2);
+
+    unlink(file_name);
+    assert(json_parse_root_file(file_name, &root));
+    assert(strncmp(last_error, "Could not open '/tmp/js2c_file_parser_", 38) == 0);
+    assert(last_error_pos == 0);
+    return 0;
+}
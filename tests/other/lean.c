@@ -0,0 +1,28 @@
+#include "lean.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root("{\"the_array\": [1, 2], \"num\": -5000, \"error_arr\": [{}]}", &root));
+    assert(root.num == -5000);
+    assert(root.the_array.n == 2);
+    assert(!strcmp(root.name, "abcd"));
+
+    /* Only the position is reported, with a generic message */
+    check_error("{", "Invalid JSON document", 1);
+    check_error("[]", "Invalid JSON document", 0);
+    check_error("{\"name\": \"n>8 here.\"}", "Invalid JSON document", 10);
+    check_error("{\"num\": 100e}", "Invalid JSON document", 8);
+    check_error("{\"num\": 5001}", "Invalid JSON document", 8);
+    check_error("{\"the_array\": [1,2,3,4]}", "Invalid JSON document", 14);
+    check_error("{}", "Invalid JSON document", 0);
+    check_error("{\"num\": 1234, \"num\": 1234}", "Invalid JSON document", 15);
+    check_error("{\"nonexistent\": true}", "Invalid JSON document", 2);
+    check_error("{\"error_arr\": [{\"trigger\": \"ab\"}]}", "Invalid JSON document", 28);
+    check_error("{\"the_enum\": \"x\"}", "Invalid JSON document", 14);
+    return 0;
+}
@@ -0,0 +1,154 @@
+#include "msgpack.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+/* {"skipped": {"a": [1, {"b": null}], "c": "d", "e": []}, "id": 70000, "name": "msgpack", "offset": -3,
+ *  "ratio": 1.5, "enabled": true, "color": "green", "points": [{"x": 1, "y": -200}, {"y": 300, "x": -40000}],
+ *  "tags": {"a": "bb", "c": ""}, "also_skipped": [[], {}, ""]} */
+static const char document[] =
+    "\x8a"
+    "\xa7" "skipped" "\x83" "\xa1" "a" "\x92\x01\x81" "\xa1" "b" "\xc0" "\xa1" "c" "\xa1" "d" "\xa1" "e" "\x90"
+    "\xa2" "id" "\xce\x00\x01\x11\x70"
+    "\xa4" "name" "\xa7" "msgpack"
+    "\xa6" "offset" "\xfd"
+    "\xa5" "ratio" "\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00"
+    "\xa7" "enabled" "\xc3"
+    "\xa5" "color" "\xa5" "green"
+    "\xa6" "points" "\x92"
+        "\x82" "\xa1" "x" "\x01" "\xa1" "y" "\xd1\xff\x38"
+        "\x82" "\xa1" "y" "\xcd\x01\x2c" "\xa1" "x" "\xd2\xff\xff\x63\xc0"
+    "\xa4" "tags" "\x82" "\xa1" "a" "\xa2" "bb" "\xa1" "c" "\xa0"
+    "\xac" "also_skipped" "\x93\x90\x80\xa0";
+
+static const char equivalent_json[] =
+    "{\"skipped\": {\"a\": [1, {\"b\": null}], \"c\": \"d\", \"e\": []}, \"id\": 70000, \"name\": \"msgpack\", "
+    "\"offset\": -3, \"ratio\": 1.5, \"enabled\": true, \"color\": \"green\", "
+    "\"points\": [{\"x\": 1, \"y\": -200}, {\"y\": 300, \"x\": -40000}], \"tags\": {\"a\": \"bb\", \"c\": \"\"}, "
+    "\"also_skipped\": [[], {}, \"\"]}";
+
+static char buffer[1024];
+
+static bool parse(const char *data, size_t length, root_t *out) {
+    return msgpack_parse_root((const uint8_t *)data, length, buffer, sizeof(buffer), out);
+}
+
+/* The length of a literal, which may contain NUL characters */
+#define LITERAL(data) (data), (sizeof(data) - 1)
+
+static void check_msgpack_error(const char *data, size_t length, const char *expected_str, int expected_pos) {
+    root_t root;
+    last_error[0] = 0;
+    assert(parse(data, length, &root));
+    if (strcmp(last_error, expected_str) || expected_pos != last_error_pos) {
+        fprintf(stderr, "Last error: %s at %i\n", last_error, last_error_pos);
+        fprintf(stderr, "Expected  : %s at %i\n", expected_str, expected_pos);
+        assert(false);
+    }
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root;
+    root_t root_from_json;
+    memset(&root, 0, sizeof(root));
+    memset(&root_from_json, 0, sizeof(root_from_json));
+    const size_t length = sizeof(document) - 1;
+    assert(!msgpack_parse_root((const uint8_t *)document, length, buffer, JS2C_MSGPACK_BUFFER_SIZE(length), &root));
+    assert(root.id == 70000);
+    assert(strcmp(root.name, "msgpack") == 0);
+    assert(root.offset == -3);
+    assert(root.ratio == 1.5);
+    assert(root.enabled);
+    assert(root.color == ROOT_COLOR_GREEN);
+    assert(root.points.n == 2);
+    assert(root.points.items[0].x == 1);
+    assert(root.points.items[0].y == -200);
+    assert(root.points.items[1].x == -40000);
+    assert(root.points.items[1].y == 300);
+    assert(root.tags.n == 2);
+    assert(strcmp(*root_tags_get(&root.tags, "a", 1), "bb") == 0);
+    assert(strcmp(*root_tags_get(&root.tags, "c", 1), "") == 0);
+    /* The same struct as from the JSON document */
+    assert(!json_parse_root(equivalent_json, &root_from_json));
+    assert(memcmp(&root, &root_from_json, sizeof(root)) == 0);
+    /* The tokens point into JSON-like text */
+    assert(strcmp(buffer, "{\"skipped\":{\"a\":[1,{\"b\":null}],\"c\":\"d\",\"e\":[]},\"id\":70000,\"name\":\"msgpack\","
+        "\"offset\":-3,\"ratio\":1.5,\"enabled\":true,\"color\":\"green\","
+        "\"points\":[{\"x\":1,\"y\":-200},{\"y\":300,\"x\":-40000}],\"tags\":{\"a\":\"bb\",\"c\":\"\"},"
+        "\"also_skipped\":[[],{},\"\"]}") == 0);
+
+    /* Defaults, and the shortest encodings: fixmap, fixint and fixstr */
+    assert(!parse(LITERAL("\x82" "\xa2" "id" "\x00" "\xa4" "name" "\xa0"), &root));
+    assert(root.id == 0);
+    assert(strcmp(root.name, "") == 0);
+    assert(root.offset == 5);
+    assert(root.ratio == 0.5);
+    assert(!root.enabled);
+    assert(root.color == ROOT_COLOR_RED);
+    assert(root.points.n == 0);
+    assert(root.tags.n == 0);
+
+    /* Every other encoding of numbers, strings, arrays and maps */
+    assert(!parse(LITERAL(
+        "\xde\x00\x05"
+        "\xd9\x02" "id" "\xcf\x00\x00\x00\x00\x00\x00\x00\x2a"
+        "\xda\x00\x04" "name" "\xdb\x00\x00\x00\x01" "x"
+        "\xa6" "offset" "\xd3\xff\xff\xff\xff\xff\xfe\x79\x60"
+        "\xa5" "ratio" "\xca\x3e\x80\x00\x00"
+        "\xa6" "points" "\xdd\x00\x00\x00\x01" "\xdf\x00\x00\x00\x02" "\xa1" "x" "\xcc\xff" "\xa1" "y" "\xd0\x80"
+    ), &root
+    ));
+    assert(root.id == 42);
+    assert(strcmp(root.name, "x") == 0);
+    assert(root.offset == -100000);
+    assert(root.ratio == 0.25);
+    assert(root.points.n == 1);
+    assert(root.points.items[0].x == 255);
+    assert(root.points.items[0].y == -128);
+
+    /* The same checks as for JSON, with positions in the text */
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\xce\x00\x0f\x42\x41" "\xa4" "name" "\xa1" "x"),
+        "Integer 1000001 in 'id' out of range. It must be <= 1000000.", 6);
+    assert(strcmp(buffer, "{\"id\":1000001,\"name\":\"x\"}") == 0);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xa9" "too long!"),
+        "String too large in 'name'. Length: 9. Maximum length: 8.", 16);
+    check_msgpack_error(LITERAL("\x81" "\xa4" "name" "\xa1" "x"), "Missing required field in 'document root': id", 0);
+    check_msgpack_error(LITERAL("\x83" "\xa2" "id" "\x01" "\xa4" "name" "\xa1" "x" "\xa5" "color" "\xa4" "blue"),
+        "Unknown enum value in 'color': blue", 28);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x80" "\xa4" "name" "\xa1" "x"),
+        "Unexpected token in 'id': OBJECT", 6);
+    /* Floats are not integers, even if they are whole numbers */
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\xcb\x3f\xf0\x00\x00\x00\x00\x00\x00" "\xa4" "name" "\xa1" "x"),
+        "Invalid unsigned integer literal in 'id': 1.0", 6);
+    /* NaN */
+    check_msgpack_error(LITERAL("\x83" "\xa2" "id" "\x01" "\xa4" "name" "\xa1" "x" "\xa5" "ratio" "\xcb\x7f\xf8\x00\x00\x00\x00\x00\x00"),
+        "Invalid floating point literal in 'ratio': nan", 27);
+
+    /* Malformed documents, with positions in the MessagePack data */
+    check_msgpack_error(LITERAL(""), "MessagePack syntax error: End of data reached (MessagePack document incomplete)", 0);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name"),
+        "MessagePack syntax error: End of data reached (MessagePack document incomplete)", 10);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\xce\x00\x01"),
+        "MessagePack syntax error: End of data reached (MessagePack document incomplete)", 4);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xa3" "x"),
+        "MessagePack syntax error: End of data reached (MessagePack document incomplete)", 10);
+    /* Binary data, non-string keys, NUL characters in strings, and data after the document */
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xc4\x01" "x"),
+        "MessagePack syntax error: Invalid or unsupported value", 10);
+    check_msgpack_error(LITERAL("\x82" "\x01" "\x01" "\xa4" "name" "\xa1" "x"),
+        "MessagePack syntax error: Invalid or unsupported value", 1);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xa3" "x\0y"),
+        "MessagePack syntax error: Invalid or unsupported value", 10);
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xa1" "x" "\xc0"),
+        "MessagePack syntax error: Invalid or unsupported value", 12);
+    /* Too many tokens, and a buffer too small for the text */
+    check_msgpack_error(LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xdc\xff\xff"),
+        "MessagePack syntax error: MessagePack document too complex, or the buffer is too small", 10);
+    assert(msgpack_parse_root((const uint8_t *)LITERAL("\x82" "\xa2" "id" "\x01" "\xa4" "name" "\xa1" "x"), buffer, 12, &root));
+    assert(strcmp(last_error, "MessagePack syntax error: MessagePack document too complex, or the buffer is too small") == 0);
+    assert(last_error_pos == 5);
+    return 0;
+}
@@ -0,0 +1,63 @@
+#include "patch.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+#define PATCH(json, config, changed) json_patch_root(json, strlen(json), config, changed)
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t config = {};
+    uint64_t changed = 0;
+    assert(!json_parse_root(
+        "{\"name\": \"srv\", \"verbose\": true, \"limits\": {\"max_conn\": 10, \"timeout\": 3}, \"hosts\": [\"a\", \"b\"]}",
+        &config
+    ));
+
+    /* Only the present fields are touched, required fields may be missing */
+    assert(!PATCH("{\"name\": \"srv2\"}", &config, &changed));
+    assert(changed == ROOT_FIELD_NAME);
+    assert(!strcmp(config.name, "srv2"));
+    assert(config.verbose);
+    assert(config.limits.max_conn == 10);
+    assert(config.hosts.n == 2);
+
+    /* Objects are patched recursively */
+    assert(!PATCH("{\"limits\": {\"max_conn\": 20}}", &config, &changed));
+    assert(changed == ROOT_FIELD_LIMITS);
+    assert(config.limits.max_conn == 20);
+    assert(config.limits.timeout == 3);
+
+    /* Arrays are replaced */
+    assert(!PATCH("{\"hosts\": [\"c\"], \"verbose\": false}", &config, &changed));
+    assert(changed == (ROOT_FIELD_HOSTS | ROOT_FIELD_VERBOSE));
+    assert(config.hosts.n == 1);
+    assert(!strcmp(config.hosts.items[0], "c"));
+    assert(!config.verbose);
+
+    /* null removes the field, i.e. resets it to its default */
+    config.verbose = true;
+    assert(!PATCH("{\"verbose\": null, \"hosts\": null, \"limits\": {\"timeout\": null}}", &config, &changed));
+    assert(changed == (ROOT_FIELD_HOSTS | ROOT_FIELD_VERBOSE | ROOT_FIELD_LIMITS));
+    assert(!config.verbose);
+    assert(config.hosts.n == 0);
+    assert(config.limits.timeout == 1.5);
+    assert(config.limits.max_conn == 20);
+
+    assert(!PATCH("{}", &config, &changed));
+    assert(changed == 0);
+
+    /* Errors */
+    assert(PATCH("{\"name\": null}", &config, &changed));
+    assert(!strcmp(last_error, "Field 'name' is required, it can not be removed"));
+    assert(last_error_pos == 9);
+    assert(PATCH("{\"limits\": {\"max_conn\": 1001}}", &config, &changed));
+    assert(!strcmp(last_error, "Integer 1001 in 'max_conn' out of range. It must be <= 1000."));
+    assert(PATCH("{\"verbose\": true, \"verbose\": true}", &config, &changed));
+    assert(!strcmp(last_error, "Duplicate field definition in 'document root': verbose"));
+    assert(PATCH("{\"unknown\": true}", &config, &changed));
+    assert(!strcmp(last_error, "Unknown field in 'document root': unknown"));
+    assert(PATCH("[]", &config, &changed));
+    return 0;
+}
@@ -0,0 +1,48 @@
+#include "projection.parser.h"
+#include "projection_numbers.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    const char *json =
+        "{\"name\": \"apple\", \"num\": 42, \"nested\": {\"a\": 5, \"b\": \"bbb\"},"
+        " \"arr\": [{\"x\": 1, \"y\": [true]}, {\"x\": 2, \"y\": [false, true]}]}";
+
+    names_t names = {};
+    assert(!json_parse_names(json, &names));
+    assert(!strcmp(names.name, "apple"));
+    assert(!strcmp(names.nested.b, "bbb"));
+    assert(names.arr.n == 2);
+    assert(names.arr.items[0].x == 1);
+    assert(names.arr.items[1].x == 2);
+
+    numbers_t numbers = {};
+    assert(!json_parse_numbers(json, &numbers));
+    assert(numbers.num == 42);
+
+    /* Skipped fields are not validated */
+    const char *invalid_skipped =
+        "{\"name\": \"pear\", \"num\": 1000, \"nested\": {\"a\": \"x\"},"
+        " \"arr\": [{\"x\": 3, \"y\": [1, 2, 3]}]}";
+    assert(!json_parse_names(invalid_skipped, &names));
+    assert(!strcmp(names.name, "pear"));
+    assert(names.arr.n == 1);
+    assert(names.arr.items[0].x == 3);
+    assert(!strcmp(names.nested.b, "b"));
+
+    /* Selected fields still are */
+    assert(json_parse_names("{\"name\": \"too long string\", \"num\": 1, \"nested\": {\"a\": 1}}", &names));
+    assert(json_parse_names("{\"num\": 1, \"nested\": {\"a\": 1}, \"arr\": [{\"y\": []}]}", &names));
+    assert(json_parse_numbers("{\"num\": 1000, \"nested\": {}}", &numbers));
+
+    /* Required fields that are not selected are not checked, selected ones are */
+    assert(!json_parse_names("{\"name\": \"a\", \"nested\": {}}", &names));
+    assert(json_parse_numbers("{\"nested\": {\"a\": 1}}", &numbers));
+
+    /* Unknown fields are still errors */
+    assert(json_parse_numbers("{\"num\": 1, \"nested\": {}, \"unknown\": 1}", &numbers));
+    return 0;
+}
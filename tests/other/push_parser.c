@@ -0,0 +1,108 @@
+#include "push_parser.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static char buffer[256];
+
+/* Feed the document in chunks of chunk_size bytes */
+static bool parse_in_chunks(const char *json, size_t chunk_size, size_t buffer_size, root_t *out) {
+    root_push_parser_t parser;
+    json_parse_root_init(&parser, buffer, buffer_size);
+    const size_t length = strlen(json);
+    for (size_t pos = 0; pos < length; pos += chunk_size) {
+        const size_t remaining = length - pos;
+        if (json_parse_root_feed(&parser, json + pos, remaining < chunk_size ? remaining : chunk_size)) {
+            /* Finishing a failed document fails too, without overwriting the error */
+            char error[sizeof(last_error)];
+            strcpy(error, last_error);
+            assert(json_parse_root_finish(&parser, out));
+            assert(strcmp(error, last_error) == 0);
+            return true;
+        }
+    }
+    return json_parse_root_finish(&parser, out);
+}
+
+static void check_chunked_error(const char *json, size_t buffer_size, const char *expected_str, int expected_pos) {
+    root_t root;
+    for (size_t chunk_size = 1; chunk_size <= strlen(json); ++chunk_size) {
+        last_error[0] = 0;
+        assert(parse_in_chunks(json, chunk_size, buffer_size, &root));
+        if (strcmp(last_error, expected_str) || expected_pos != last_error_pos) {
+            fprintf(stderr, "When parsing %s in chunks of %zu\n", json, chunk_size);
+            fprintf(stderr, "Last error: %s at %i\n", last_error, last_error_pos);
+            fprintf(stderr, "Expected  : %s at %i\n", expected_str, expected_pos);
+            assert(false);
+        }
+    }
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+
+    /* Every string, number and literal is cut in half by some of the chunk sizes */
+    const char *json = "{\"name\": \"chunked \\\"name\\\"\", \"values\": [1.5, -2e3, 0], \"id\": 123456}";
+    for (size_t chunk_size = 1; chunk_size <= strlen(json); ++chunk_size) {
+        root_t root;
+        memset(&root, 0xff, sizeof(root));
+        assert(!parse_in_chunks(json, chunk_size, sizeof(buffer), &root));
+        assert(strcmp(root.name, "chunked \\\"name\\\"") == 0);
+        assert(root.id == 123456);
+        assert(root.values.n == 3);
+        assert(root.values.items[0] == 1.5);
+        assert(root.values.items[1] == -2e3);
+        assert(root.values.items[2] == 0);
+    }
+
+    /* Defaults and empty chunks */
+    root_push_parser_t parser;
+    root_t root;
+    json_parse_root_init(&parser, buffer, sizeof(buffer));
+    assert(!json_parse_root_feed(&parser, "", 0));
+    assert(!json_parse_root_feed(&parser, "{\"id\": 1, \"na", 13));
+    assert(!json_parse_root_feed(&parser, "", 0));
+    assert(!json_parse_root_feed(&parser, "me\": \"x\"}\n", 10));
+    assert(!json_parse_root_finish(&parser, &root));
+    assert(strcmp(root.name, "x") == 0);
+    assert(root.id == 1);
+    assert(root.values.n == 0);
+
+    /* The same checks apply as with json_parse_root */
+    check_chunked_error("{\"name\": \"x\", \"id\": 1000001}", sizeof(buffer),
+        "Integer 1000001 in 'id' out of range. It must be <= 1000000.", 20);
+    check_chunked_error("{\"name\": \"much too long name\", \"id\": 1}", sizeof(buffer),
+        "String too large in 'name'. Length: 18. Maximum length: 16.", 10);
+    check_chunked_error("{\"name\": \"x\"}", sizeof(buffer), "Missing required field in 'document root': id", 0);
+
+    /* Errors found while feeding */
+    check_chunked_error("{\"name\": \"x\" x", sizeof(buffer), "JSON syntax error: Invalid character", 13);
+    check_chunked_error("{\"name\": \"x\", \"id\": 1}", 16, "Document too large for the 16 byte buffer", 16);
+
+    /* A long document fed in single bytes. Each chunk only costs as much as its own length, as the part of the
+     * document tokenized by the earlier chunks is not scanned again, so this is as fast as a single chunk. */
+    static char large_buffer[256 * 1024];
+    static char large_json[sizeof(large_buffer)];
+    const char *large_json_start = "{\"values\": [1, ";
+    const char *large_json_end = "2], \"name\": \"x\", \"id\": 7}";
+    memset(large_json, ' ', sizeof(large_json));
+    memcpy(large_json, large_json_start, strlen(large_json_start));
+    strcpy(large_json + sizeof(large_json) - strlen(large_json_end) - 1, large_json_end);
+    json_parse_root_init(&parser, large_buffer, sizeof(large_buffer));
+    for (size_t pos = 0; large_json[pos] != 0; ++pos) {
+        assert(!json_parse_root_feed(&parser, large_json + pos, 1));
+    }
+    assert(!json_parse_root_finish(&parser, &root));
+    assert(root.values.n == 2);
+    assert(root.id == 7);
+
+    /* Incomplete documents */
+    check_chunked_error("{\"name\": \"x\", \"id\": 1", sizeof(buffer),
+        "JSON syntax error: End-of-file reached (JSON file incomplete)", 21);
+    json_parse_root_init(&parser, buffer, sizeof(buffer));
+    assert(json_parse_root_finish(&parser, &root));
+    assert(strcmp(last_error, "JSON syntax error: End-of-file reached (JSON file incomplete)") == 0);
+    return 0;
+}
@@ -0,0 +1,191 @@
+import json
+import sys
+import threading
+
+import python_extension
+
+
+def check_parse():
+    document = (
+        '{"name": "thing", "count": 3, "offset": -5, "hex": "ff", "ratio": 1.25, "enabled": false, "color": "darkGreen",'
+        ' "tags": ["a", "b\\\\n"], "samples": [{"ts": 1, "value": 0.5}, {"value": 2, "ts": 3}],'
+        ' "limits": {"x": 1, "y": -2}, "shape": {"kind": "polygon", "points": [[0, 1], [2.5, 3]]}}'
+    )
+    expected = {
+        "name": "thing",
+        "count": 3,
+        "offset": -5,
+        "hex": 255,
+        "ratio": 1.25,
+        "enabled": False,
+        "color": "darkGreen",
+        "tags": ["a", "b\\n"],
+        "samples": [{"ts": 1, "value": 0.5}, {"ts": 3, "value": 2.0}],
+        "limits": {"x": 1, "y": -2},
+        "shape": {"kind": "polygon", "points": [[0.0, 1.0], [2.5, 3.0]]},
+    }
+    assert python_extension.parse(document) == expected
+    assert python_extension.parse(document.encode()) == expected
+
+    # Escapes are decoded like json.loads does, including surrogate pairs and unpaired surrogates
+    escaped = (
+        r'{"name": "x\ud83d\ude00\/", "count": 1, "tags": ["\u00e9\n", "\"\t\\", "\ud800"], "limits": {"a\u0062": 1},'
+        r' "shape": {"kind": "circle", "radius": 1}}'
+    )
+    parsed = python_extension.parse(escaped)
+    loaded = json.loads(escaped)
+    assert [parsed["name"], parsed["tags"], parsed["limits"]] == [loaded["name"], loaded["tags"], loaded["limits"]], parsed
+
+    defaults = python_extension.parse('{"name": "", "count": 0, "shape": {"radius": 2, "kind": "circle"}}')
+    assert defaults == {
+        "name": "",
+        "count": 0,
+        "offset": -1,
+        "hex": 0,
+        "ratio": 0.5,
+        "enabled": True,
+        "color": "red",
+        "tags": [],
+        "samples": [],
+        "limits": {},
+        "shape": {"kind": "circle", "radius": 2.0},
+    }, defaults
+
+
+def check_error(document, expected_message, expected_position):
+    try:
+        python_extension.parse(document)
+    except python_extension.ParseError as e:
+        assert str(e) == expected_message, str(e)
+        assert e.position == expected_position, e.position
+        assert e.index is None
+    else:
+        assert False, "No error raised for {}".format(document)
+
+
+def check_errors():
+    assert issubclass(python_extension.ParseError, ValueError)
+    check_error('{"name": "x", "count": -1, "shape": {"kind": "circle", "radius": 1}}', "Invalid unsigned integer literal in 'count': -1", 23)
+    check_error('{"name": "x"', "JSON syntax error: End-of-file reached (JSON file incomplete)", 12)
+    check_error('{"name": "x", "count": 1, "shape": {"kind": "square"}}', "Unknown discriminator value in 'shape': square", 45)
+    for invalid_input, exception_type in ((None, TypeError), (b'{"name": "x\0"}', ValueError)):
+        try:
+            python_extension.parse(invalid_input)
+        except exception_type:
+            pass
+        else:
+            assert False
+
+
+def check_parse_many():
+    documents = ['{{"name": "doc{}", "count": {}, "shape": {{"kind": "circle", "radius": 1}}}}'.format(i, i) for i in range(100)]
+    results = python_extension.parse_many(documents)
+    assert [result["count"] for result in results] == list(range(100))
+    assert python_extension.parse_many([]) == []
+    assert python_extension.parse_many(tuple(documents[:2])) == results[:2]
+
+    documents[42] = '{"name": "doc", "count": 1, "shape": {"kind": "circle", "radius": true}}'
+    try:
+        python_extension.parse_many(documents)
+    except python_extension.ParseError as e:
+        assert e.index == 42, e.index
+        assert e.position == 66, e.position
+        assert str(e) == "Invalid floating point literal in 'radius': true", str(e)
+    else:
+        assert False
+
+    # The GIL is released during parsing, and errors are recorded per thread
+    failures = []
+
+    def worker(worker_index):
+        for _ in range(50):
+            try:
+                if worker_index % 2:
+                    python_extension.parse('{"name": "x", "count": 1, "color": "blue", "shape": {"kind": "circle", "radius": 1}}')
+                    failures.append("no error")
+                else:
+                    assert len(python_extension.parse_many(documents[:40])) == 40
+            except python_extension.ParseError as e:
+                if str(e) != "Unknown enum value in 'color': blue":
+                    failures.append(str(e))
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures, failures
+
+
+def field(dtype, data, record_index, path):
+    """ Read a field of a parse_array result the way numpy.frombuffer would, with the dtype description """
+    offset = record_index * dtype["itemsize"]
+    for name in path:
+        if isinstance(name, int):
+            dtype, count = dtype
+            assert 0 <= name < count
+            offset += name * (dtype["itemsize"] if isinstance(dtype, dict) else int(dtype[1:]))
+            continue
+        index = dtype["names"].index(name)
+        offset += dtype["offsets"][index]
+        dtype = dtype["formats"][index]
+    size = int(dtype[1:])
+    raw = data[offset:offset + size]
+    if dtype[0] == "S":
+        return raw.split(b"\0")[0]
+    if dtype[0] == "f":
+        return memoryview(raw).cast("d")[0]
+    return int.from_bytes(raw, sys.byteorder, signed=dtype[0] == "i")
+
+
+def check_parse_array():
+    dtype = python_extension.dtype()
+    assert dtype["names"][:3] == ["name", "count", "offset"]
+    assert dtype["formats"][:3] == ["S17", "u8", "i1"]
+    assert dtype["offsets"][:3] == [0, 24, 32]
+
+    documents = [
+        '{"name": "first", "count": 7, "offset": -3, "tags": ["x", "yz"], "limits": {"k": 5},'
+        ' "samples": [{"ts": 9, "value": 1}, {"ts": 10, "value": 1.5}],'
+        ' "shape": {"kind": "polygon", "points": [[1, 2], [3, 4.5]]}}',
+        '{"name": "second", "count": 8, "color": "darkGreen", "shape": {"kind": "circle", "radius": 0.25}}',
+    ]
+    data = python_extension.parse_array(documents)
+    assert isinstance(data, bytearray)
+    assert len(data) == 2 * dtype["itemsize"]
+    assert field(dtype, data, 0, ["name"]) == b"first"
+    assert field(dtype, data, 0, ["count"]) == 7
+    assert field(dtype, data, 0, ["offset"]) == -3
+    assert field(dtype, data, 0, ["tags", "n"]) == 2
+    assert field(dtype, data, 0, ["tags", "items", 1]) == b"yz"
+    assert field(dtype, data, 0, ["samples", "n"]) == 2
+    assert field(dtype, data, 0, ["samples", "ts", 1]) == 10
+    assert field(dtype, data, 0, ["samples", "value", 1]) == 1.5
+    assert field(dtype, data, 0, ["limits", "entries", 0, "key"]) == b"k"
+    assert field(dtype, data, 0, ["limits", "entries", 0, "value"]) == 5
+    assert field(dtype, data, 0, ["shape", "tag"]) == 1
+    assert field(dtype, data, 0, ["shape", "value", "polygon", "points", "items", 1, "items", 1]) == 4.5
+    assert field(dtype, data, 1, ["name"]) == b"second"
+    assert field(dtype, data, 1, ["color"]) == 1
+    assert field(dtype, data, 1, ["shape", "tag"]) == 0
+    assert field(dtype, data, 1, ["shape", "value", "circle", "radius"]) == 0.25
+    assert python_extension.parse_array([]) == bytearray()
+    try:
+        python_extension.parse_array(documents + ['{"name": "x"}'])
+    except python_extension.ParseError as e:
+        assert e.index == 2
+    else:
+        assert False
+
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    records = numpy.frombuffer(data, numpy.dtype(dtype))
+    assert records["count"].tolist() == [7, 8]
+    assert records["shape"]["value"]["circle"]["radius"][1] == 0.25
+
+
+check_parse()
+check_errors()
+check_parse_many()
+check_parse_array()
@@ -0,0 +1,38 @@
+"""
+Check the size report: print C static assertions about the estimated sizes, to be checked by the compiler
+with the generated parser included.
+"""
+import json
+import sys
+
+
+def main(report_path, parser_c_path):
+    with open(report_path, encoding='utf-8') as report_file:
+        report = json.load(report_file)
+
+    assert report["name"] == "root"
+    assert report["stack_frame"]["function"] == "json_parse_root"
+    assert report["stack_frame"]["total"] == report["stack_frame"]["token_buffer"] + report["stack_frame"]["parse_state"]
+    assert report["subtrees"][0]["path"] == "<root>"
+    assert report["subtrees"][0]["max_token_num"] == report["max_token_num"]
+    assert report["functions"]["count"] >= len(report["functions"]["largest"]) > 0
+    for key in ("size", "max_token_num"):
+        values = [path[key] for path in report["dominant_paths"][key]]
+        assert values and values == sorted(values, reverse=True), values
+    type_names = [c_type["name"] for c_type in report["types"]]
+    assert len(type_names) == len(set(type_names))
+    # The item of a columnar array is never declared
+    assert "root_samples_item_t" not in type_names
+    assert "root_readings_item_t" in type_names
+
+    print('#include "{}"'.format(parser_c_path))
+    print("_Static_assert(sizeof(jsmntok_t) * {} == {}, \"token_buffer\");".format(
+        report["max_token_num"], report["stack_frame"]["token_buffer"]
+    ))
+    print("_Static_assert(sizeof(parse_state_t) == {}, \"parse_state_t\");".format(report["stack_frame"]["parse_state"]))
+    for c_type in report["types"]:
+        print("_Static_assert(sizeof({0}) == {1}, \"{0}\");".format(c_type["name"], c_type["size"]))
+        print("_Static_assert(_Alignof({0}) == {1}, \"{0}\");".format(c_type["name"], c_type["alignment"]))
+
+
+main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,123 @@
+#include "simd_tokenizer.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+bool fast_tokenizer_matches_jsmn(const char *json, size_t json_length, unsigned int num_tokens);
+bool fast_tokenizer_resumes_like_jsmn(const char *json, size_t json_length);
+bool use_simd_scanners(int level);
+
+static void check_same_tokens(const char *json) {
+    if (!fast_tokenizer_matches_jsmn(json, strlen(json), 64)) {
+        fprintf(stderr, "When tokenizing %s\n", json);
+        assert(false);
+    }
+    if (!fast_tokenizer_resumes_like_jsmn(json, strlen(json))) {
+        fprintf(stderr, "When tokenizing %s in parts\n", json);
+        assert(false);
+    }
+}
+
+static const char *const documents[] = {
+    "{}",
+    "[]",
+    "{\"a\": 1, \"b\": [true, false, null], \"c\": {\"d\": \"e\"}}",
+    "  \n\t\r  {  \"name\"  :  \"x\"  ,  \"values\"  :  [  1  ,  2  ]  }  \n\n\n",
+    "[[[[[[1]]]], [[2]]], {\"x\": [{}, [], {\"y\": []}]}]",
+    "\"short\"",
+    "\"a string which is longer than sixteen, and even longer than thirty-two bytes\"",
+    "\"0123456789abcd\\\"ef0123456789abcdef0123456789\\\\abcdef0123456789\"",
+    "\"\\u00e9\\u00E9 \\/ \\b \\f \\n \\r \\t\"",
+    "{\"0123456789abcdef0123456789abcde\": \"0123456789abcdef0123456789abcdef0\"}",
+    "[1,-2,3.5e10,true,false,null]",
+    "                                                                      1 ",
+    /* Errors */
+    "",
+    "{",
+    "[1, 2",
+    "{\"a\": 1]",
+    "[1, 2}",
+    "]",
+    "}",
+    "{\"a\" 1}",
+    "{1: 2}",
+    "{{}}",
+    "\"unterminated",
+    "\"unterminated, longer than thirty-two bytes, so that the vectorized scan runs out",
+    "\"bad escape \\x\"",
+    "\"bad unicode \\u12G4\"",
+    "\"truncated unicode \\u12",
+    "\"trailing backslash \\",
+    "1",
+    "[1",
+    "[tru\x01e]",
+    "[1\x7f]",
+    "x",
+    "[\"a\" \"b\"]",
+    "{\"a\": \"b\" \"c\"}",
+    "{\"a\": \"b\" 1}",
+    "[1]]",
+    "[1], [2]",
+};
+
+static void check_tokenizer(void) {
+    for (size_t i = 0; i < sizeof(documents) / sizeof(documents[0]); ++i) {
+        check_same_tokens(documents[i]);
+    }
+
+    /* Strings and whitespace ending at every offset around the vector boundaries */
+    for (size_t length = 0; length < 70; ++length) {
+        char json[128];
+        json[0] = '"';
+        memset(json + 1, 'a', length);
+        strcpy(json + 1 + length, "\"");
+        check_same_tokens(json);
+        json[1 + length] = '\0';
+        check_same_tokens(json);
+        json[0] = '[';
+        memset(json + 1, ' ', length);
+        strcpy(json + 1 + length, "1]");
+        check_same_tokens(json);
+        memset(json, '\n', length);
+        strcpy(json + length, "{\"x\\\"y\": \"\\\\\"}");
+        check_same_tokens(json);
+    }
+
+    /* Running out of tokens at every possible point */
+    const char *nested = "{\"a\": [1, \"b\", {\"c\": null}], \"d\": {}}";
+    for (unsigned int num_tokens = 0; num_tokens < 12; ++num_tokens) {
+        assert(fast_tokenizer_matches_jsmn(nested, strlen(nested), num_tokens));
+    }
+
+    /* Explicit length, which is shorter than the string, or has a NUL inside */
+    assert(fast_tokenizer_matches_jsmn("[1, 2]garbage", 6, 64));
+    assert(fast_tokenizer_matches_jsmn("[1, 2]garbage", 4, 64));
+    assert(fast_tokenizer_matches_jsmn("[1]\0[2]", 7, 64));
+    assert(fast_tokenizer_matches_jsmn("\"ab\0cd\"", 7, 64));
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    /* The scanners selected for this CPU */
+    check_tokenizer();
+    /* And all the others this CPU can run */
+    for (int level = 0; level <= 2; ++level) {
+        if (use_simd_scanners(level)) {
+            check_tokenizer();
+        }
+    }
+
+    /* And the generated parser works with it */
+    root_t root;
+    assert(!json_parse_root(
+        "  {\"name\": \"a string which is longer than sixteen, and even longer than thirty-two bytes\", \"values\": [1, 2, 3]}",
+        &root
+    ));
+    assert(strcmp(root.name, "a string which is longer than sixteen, and even longer than thirty-two bytes") == 0);
+    assert(root.values.n == 3);
+    assert(root.values.items[2] == 3);
+    assert(json_parse_root("{\"name\": \"x\", \"values\": [1, 2}", &root));
+    return 0;
+}
@@ -0,0 +1,34 @@
+#include "split.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+char last_error[1000];
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    const char *json =
+        "{\"primary\": {\"host\": \"a\", \"port\": 1}, \"secondary\": {\"host\": \"b\", \"port\": 2},"
+        " \"name\": \"x\", \"labels\": {\"k\": \"v\"}}";
+    root_t root = {};
+    assert(!json_parse_root(json, &root));
+    assert(!strcmp(root.primary.host, "a"));
+    assert(root.primary.port == 1);
+    assert(!strcmp(root.secondary.host, "b"));
+    assert(root.secondary.port == 2);
+    assert(!strcmp(*root_labels_get(&root.labels, "k", 1), "v"));
+    assert(!json_validate_root(json, strlen(json)));
+
+    uint64_t changed = 0;
+    const char *patch = "{\"secondary\": {\"port\": 3}}";
+    assert(!json_patch_root(patch, strlen(patch), &root, &changed));
+    assert(changed == ROOT_FIELD_SECONDARY);
+    assert(root.secondary.port == 3);
+    assert(!strcmp(root.secondary.host, "b"));
+
+    /* Errors are logged from parsers in the other units */
+    assert(json_parse_root("{\"primary\": {\"host\": \"a\", \"port\": 0}}", &root));
+    assert(!strcmp(last_error, "Integer 0 in 'port' out of range. It must be >= 1."));
+    return 0;
+}
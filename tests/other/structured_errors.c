@@ -0,0 +1,125 @@
+#include "structured_errors.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+#include <errno.h>
+
+/* Filled by LOG_STRUCTURED_ERROR, defined in structured_errors_c_prefix.inc */
+extern js2c_error_t last_error;
+extern int error_num;
+
+static const js2c_error_t *check_error(
+    const char *json, js2c_error_code_t code, int position, uint64_t token_index, const char *path
+) {
+    root_t root;
+    const int previous_error_num = error_num;
+    assert(json_parse_root(json, &root));
+    assert(error_num == previous_error_num + 1);
+    const js2c_error_t *error = &last_error;
+    if (error->code != code || error->position != position || error->token_index != token_index ||
+            strcmp(path, error->path_id == JS2C_NO_PATH ? "-" : root_error_paths[error->path_id])) {
+        char message[256];
+        json_format_error_root(error, message, sizeof(message));
+        fprintf(stderr, "When checking %s\n", json);
+        fprintf(stderr, "Got error %i at %i, token %i: %s\n", error->code, error->position, (int)error->token_index, message);
+        assert(false);
+    }
+    return error;
+}
+
+static void check_message(const js2c_error_t *error, const char *expected) {
+    char message[256];
+    const int length = json_format_error_root(error, message, sizeof(message));
+    if (strcmp(message, expected) || length != (int)strlen(expected)) {
+        fprintf(stderr, "Message : %s\nExpected: %s\n", message, expected);
+        assert(false);
+    }
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root;
+    assert(!json_parse_root("{\"items\": [{\"id\": 1}]}", &root));
+    assert(root.items.items[0].delta == -20);
+    assert(error_num == 0);
+
+    const js2c_error_t *error;
+    error = check_error("{\"items\": [{\"id\": 1}", JS2C_ERROR_SYNTAX, 20, 0, "-");
+    check_message(error, "JSON syntax error at 20: End-of-file reached (JSON file incomplete)");
+
+    error = check_error("{\"name\": \"123456789\", \"items\": []}", JS2C_ERROR_STRING_TOO_LONG, 10, 2, ".properties.name");
+    assert(error->expected.i == 8);
+    assert(error->actual.i == 9);
+    check_message(error, "String too large in '.properties.name' at 10. Length: 9. Limit: 8.");
+
+    error = check_error("{\"items\": [{\"id\": 0}]}", JS2C_ERROR_UNSIGNED_OUT_OF_RANGE, 18, 5, ".properties.items.items.properties.id");
+    assert(error->expected.u == 1);
+    assert(error->actual.u == 0);
+    check_message(error, "Integer out of range in '.properties.items.items.properties.id' at 18. Value: 0. Limit: 1.");
+
+    /* The same type at a different path */
+    error = check_error(
+        "{\"items\": [], \"other_items\": [{\"id\": 1}, {\"id\": 2, \"delta\": 5}]}",
+        JS2C_ERROR_INTEGER_OUT_OF_RANGE, 60, 12, ".properties.other_items.items.properties.delta"
+    );
+    assert(error->expected.i == -10);
+    assert(error->actual.i == 5);
+
+    error = check_error("{\"items\": [{\"id\": 1, \"ratio\": 0.5}]}", JS2C_ERROR_NUMBER_OUT_OF_RANGE, 30, 7, ".properties.items.items.properties.ratio");
+    assert(error->expected.d == 0.5);
+    check_message(error, "Floating point value out of range in '.properties.items.items.properties.ratio' at 30. Value: 0.5. Limit: 0.5.");
+
+    error = check_error("{\"items\": [{\"id\": 1, \"color\": \"blue\"}]}", JS2C_ERROR_UNKNOWN_ENUM_VALUE, 31, 7, ".properties.items.items.properties.color");
+    check_message(error, "Unknown enum value in '.properties.items.items.properties.color' at 31");
+
+    error = check_error("{\"items\": [{\"id\": true}]}", JS2C_ERROR_INVALID_LITERAL, 18, 5, ".properties.items.items.properties.id");
+    assert(strcmp(error->expected.s, "unsigned integer") == 0);
+
+    error = check_error("{\"items\": [{\"id\": \"1\"}]}", JS2C_ERROR_UNEXPECTED_TOKEN, 19, 5, ".properties.items.items.properties.id");
+    check_message(error, "Unexpected token in '.properties.items.items.properties.id' at 19: STRING");
+
+    error = check_error("{\"items\": {}}", JS2C_ERROR_UNEXPECTED_TOKEN, 10, 2, ".properties.items");
+    check_message(error, "Unexpected token in '.properties.items' at 10: OBJECT. Expected: ARRAY.");
+
+    error = check_error("{\"items\": [{}, {}, {}, {}]}", JS2C_ERROR_ARRAY_TOO_LARGE, 10, 2, ".properties.items");
+    assert(error->expected.i == 3);
+    assert(error->actual.i == 4);
+
+    error = check_error("{\"items\": [{\"delta\": -11}]}", JS2C_ERROR_MISSING_FIELD, 11, 3, ".properties.items.items");
+    check_message(error, "Missing required field in '.properties.items.items' at 11: id");
+
+    error = check_error("{\"items\": [], \"items\": []}", JS2C_ERROR_DUPLICATE_FIELD, 15, 3, "<root>");
+    assert(strcmp(error->expected.s, "items") == 0);
+    check_error("{\"items\": [], \"nothing\": []}", JS2C_ERROR_UNKNOWN_FIELD, 15, 3, "<root>");
+    check_error("{\"items\": [], \"name\"}", JS2C_ERROR_MISSING_VALUE, 15, 3, "<root>");
+
+    /* Errors of the validator and the push parser are recorded the same way */
+    error_num = 0;
+    const char *const invalid = "{\"items\": [{\"id\": 0}]}";
+    assert(json_validate_root(invalid, strlen(invalid)));
+    assert(error_num == 1);
+    assert(last_error.code == JS2C_ERROR_UNSIGNED_OUT_OF_RANGE);
+    assert(strcmp(root_error_paths[last_error.path_id], ".properties.items.items.properties.id") == 0);
+
+    char buffer[16];
+    root_push_parser_t parser;
+    json_parse_root_init(&parser, buffer, sizeof(buffer));
+    assert(!json_parse_root_feed(&parser, invalid, 10));
+    assert(json_parse_root_feed(&parser, invalid + 10, strlen(invalid) - 10));
+    assert(error_num == 2);
+    assert(last_error.code == JS2C_ERROR_DOCUMENT_TOO_LARGE);
+    assert(last_error.expected.u == 16);
+    assert(last_error.actual.u == strlen(invalid));
+    assert(last_error.path_id == JS2C_NO_PATH);
+
+    /* So are the errors of reading a file */
+    assert(json_parse_root_file("/nonexistent/js2c_missing.json", &root));
+    assert(error_num == 3);
+    assert(last_error.code == JS2C_ERROR_IO);
+    assert(last_error.actual.i == ENOENT);
+    assert(last_error.path_id == JS2C_NO_PATH);
+    check_message(&last_error, "Could not read file '/nonexistent/js2c_missing.json': No such file or directory");
+    return 0;
+}
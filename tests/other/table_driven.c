@@ -0,0 +1,74 @@
+#include "table_driven.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static const char *const document =
+    "{\"items\": [{\"id\": 1, \"offset\": 7, \"hex\": \"1F\", \"ratio\": 0.5, \"active\": false, \"color\": \"dark blue\"}, "
+    "{\"color\": \"red\", \"id\": 999}], \"name\": \"tables\", \"settings\": {\"tags\": [\"a\", \"bc\"]}}";
+
+static void check_root(const root_t *root) {
+    assert(strcmp(root->name, "tables") == 0);
+    assert(root->items.n == 2);
+    assert(root->items.items[0].id == 1);
+    assert(root->items.items[0].offset == 7);
+    assert(root->items.items[0].hex == 0x1f);
+    assert(root->items.items[0].ratio == 0.5);
+    assert(!root->items.items[0].active);
+    assert(root->items.items[0].color == ROOT_ITEMS_ITEM_COLOR_DARK_BLUE);
+    assert(root->items.items[1].id == 999);
+    assert(root->items.items[1].offset == -5);
+    assert(root->items.items[1].hex == 0xff);
+    assert(root->items.items[1].ratio == 1.0);
+    assert(root->items.items[1].active);
+    assert(root->items.items[1].color == ROOT_ITEMS_ITEM_COLOR_RED);
+    assert(strcmp(root->settings.title, "none") == 0);
+    assert(root->settings.tags.n == 2);
+    assert(strcmp(root->settings.tags.items[1], "bc") == 0);
+    assert(root->settings.other_tags.n == 0);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root;
+    memset(&root, 0xaa, sizeof(root));
+    assert(!json_parse_root(document, &root));
+    check_root(&root);
+    assert(!json_validate_root(document, strlen(document)));
+
+    /* Defaults of whole objects */
+    assert(!json_parse_root("{\"name\": \"ab\", \"items\": [{\"id\": 5}]}", &root));
+    assert(root.items.items[0].color == ROOT_ITEMS_ITEM_COLOR_GREEN);
+    assert(strcmp(root.settings.title, "none") == 0);
+    assert(root.settings.tags.n == 0);
+
+    char buffer[512];
+    root_push_parser_t parser;
+    json_parse_root_init(&parser, buffer, sizeof(buffer));
+    assert(!json_parse_root_feed(&parser, document, 40));
+    assert(!json_parse_root_feed(&parser, document + 40, strlen(document) - 40));
+    memset(&root, 0, sizeof(root));
+    assert(!json_parse_root_finish(&parser, &root));
+    check_root(&root);
+
+    /* The errors are the same as the ones of the generated parser functions */
+    check_error("{\"name\": \"ab\"}", "Missing required field in 'document root': items", 0);
+    check_error("{\"name\": \"ab\", \"items\": [], \"name\": \"cd\"}", "Array 'items' too small. Length: 0. Minimum length: 1.", 24);
+    check_error("{\"name\": \"ab\", \"name\": \"cd\", \"items\": [{\"id\": 1}]}", "Duplicate field definition in 'document root': name", 16);
+    check_error("{\"name\": \"ab\", \"nam\": \"cd\"}", "Unknown field in 'document root': nam", 16);
+    check_error("{\"name\": \"a\", \"items\": [{\"id\": 1}]}", "String too short in 'name'. Length: 1. Minimum length: 2.", 10);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 0}]}", "Integer 0 in 'id' out of range. It must be >= 1.", 32);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1000}]}", "Integer 1000 in 'id' out of range. It must be < 1000.", 32);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1, \"offset\": -101}]}", "Integer -101 in 'offset' out of range. It must be >= -100.", 45);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1, \"hex\": 12}]}", "Unexpected token in 'hex': PRIMITIVE", 42);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1, \"ratio\": 0}]}", "Floating point value 0 in 'ratio' out of range. It must be > 0.", 44);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1, \"color\": \"blue\"}]}", "Unknown enum value in 'color': blue", 45);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1}, {\"id\": 2}, {\"id\": 3}, {\"id\": 4}, {\"id\": 5}]}", "Array 'items' too large. Length: 5. Maximum length: 4.", 24);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1}], \"settings\": {\"tags\": [\"abcde\"]}}", "String too large in 'tags'. Length: 5. Maximum length: 4.", 60);
+    check_error("{\"name\": \"ab\", \"items\": [{\"id\": 1, \"active\": 1}]}", "Invalid boolean literal in 'active': 1", 45);
+
+    assert(json_validate_root("{\"name\": \"ab\", \"items\": [{\"id\": 0}]}", 35));
+    return 0;
+}
@@ -0,0 +1,57 @@
+#include "validate.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static void check_valid(const char* json){
+    if (json_validate_root(json, strlen(json))){
+        fprintf(stderr, "When validating %s\n", json);
+        fprintf(stderr, "Unexpected error: %s\n", last_error);
+        assert(false);
+    }
+}
+
+static void check_invalid(const char* json, const char* expected_str, int expected_pos){
+    assert(json_validate_root(json, strlen(json)));
+    if (strcmp(last_error, expected_str)){
+        fprintf(stderr, "When validating %s\n", json);
+        fprintf(stderr, "Last error: %s\n", last_error);
+        fprintf(stderr, "Expected  : %s\n", expected_str);
+        assert(false);
+    }
+    if (expected_pos != last_error_pos){
+        fprintf(stderr, "When validating %s\n", json);
+        fprintf(stderr, "Last error pos: %i\n", last_error_pos);
+        fprintf(stderr, "Expected   pos: %i\n", expected_pos);
+        assert(false);
+    }
+    /* The parser and the validator must agree on the error */
+    check_error(json, expected_str, expected_pos);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    check_valid("{\"the_array\": [1, 2]}");
+    check_valid(
+        "{\"name\": \"abcde\", \"is_good\": true, \"num\": -5000, \"fnum\": 4999.5,"
+        " \"the_array\": [1, 2, 3], \"error_arr\": [{\"trigger\": \"x\"}], \"the_enum\": \"b\"}"
+    );
+
+    /* Only json_length bytes are looked at */
+    const char* with_garbage = "{\"the_array\": [1, 2]}garbage";
+    assert(!json_validate_root(with_garbage, strlen(with_garbage) - strlen("garbage")));
+
+    check_invalid("{", "JSON syntax error: End-of-file reached (JSON file incomplete)", 1);
+    check_invalid("{}", "Missing required field in 'document root': the_array", 0);
+    check_invalid("{\"the_array\": [1]}", "Array 'the_array' too small. Length: 1. Minimum length: 2.", 14);
+    check_invalid("{\"the_array\": [1, 2], \"name\": \"abc\"}", "String too short in 'name'. Length: 3. Minimum length: 4.", 31);
+    check_invalid("{\"the_array\": [1, 2], \"is_good\": 1}", "Invalid boolean literal in 'is_good': 1", 33);
+    check_invalid("{\"the_array\": [1, 2], \"num\": 5001}", "Integer 5001 in 'num' out of range. It must be <= 5000.", 29);
+    check_invalid("{\"the_array\": [1, 2], \"fnum\": 5000}", "Floating point value 5000 in 'fnum' out of range. It must be < 5000.", 30);
+    check_invalid("{\"the_array\": [1, 2], \"the_enum\": \"c\"}", "Unknown enum value in 'the_enum': c", 35);
+    check_invalid("{\"the_array\": [1, 2], \"error_arr\": [{\"trigger\": \"ab\"}]}", "Error parsing 'trigger', value=\"ab\": Custom error", 49);
+    check_invalid("{\"the_array\": [1, 2], \"num\": 1, \"num\": 1}", "Duplicate field definition in 'document root': num", 33);
+    return 0;
+}
@@ -0,0 +1,81 @@
+#include "one_of.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+static void check_both(const char* json, const char* expected_str, int expected_pos){
+    check_error(json, expected_str, expected_pos);
+    last_error[0] = 0;
+    assert(json_validate_root(json, strlen(json)));
+    assert(!strcmp(last_error, expected_str));
+    assert(last_error_pos == expected_pos);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    const char *json =
+        "{\"shapes\": [{\"r\": 3, \"kind\": \"circle\"}, {\"kind\": \"rect\", \"w\": 2, \"h\": 4},"
+        " {\"kind\": \"dotMark\"}, {\"kind\": \"star\"}],"
+        " \"message\": {\"text\": \"hello\", \"type\": \"text\"}}";
+    assert(!json_parse_root(json, &root));
+    assert(!json_validate_root(json, strlen(json)));
+    assert(root.shapes.n == 4);
+    assert(root.shapes.items[0].tag == SHAPE_TAG_CIRCLE);
+    assert(root.shapes.items[0].value.circle.r == 3);
+    assert(root.shapes.items[1].tag == SHAPE_TAG_RECT);
+    assert(root.shapes.items[1].value.rect.w == 2);
+    assert(root.shapes.items[1].value.rect.h == 4);
+    assert(root.shapes.items[2].tag == SHAPE_TAG_DOT_MARK);
+    assert(root.shapes.items[3].tag == SHAPE_TAG_STAR);
+    assert(root.shapes.items[3].value.star.points == 5);
+    assert(root.message.tag == ROOT_MESSAGE_TAG_TEXT);
+    assert(!strcmp(root.message.value.text.text, "hello"));
+
+    assert(!json_parse_root("{\"shapes\": [], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(root.message.tag == ROOT_MESSAGE_TAG_PING);
+
+    check_both(
+        "{\"shapes\": [{\"r\": 3}], \"message\": {\"type\": \"ping\"}}",
+        "Missing discriminator field in 'shapes': kind",
+        12
+    );
+    check_both(
+        "{\"shapes\": [{\"r\": 3, \"kind\": \"square\"}], \"message\": {\"type\": \"ping\"}}",
+        "Unknown discriminator value in 'shapes': square",
+        30
+    );
+    check_both(
+        "{\"shapes\": [{\"r\": 3, \"kind\": 5}], \"message\": {\"type\": \"ping\"}}",
+        "Unexpected token in 'shapes': PRIMITIVE instead of STRING",
+        29
+    );
+    check_both(
+        "{\"shapes\": [{\"kind\": \"rect\", \"w\": 2, \"h\": 400}], \"message\": {\"type\": \"ping\"}}",
+        "Integer 400 in 'h' out of range. It must be <= 100.",
+        42
+    );
+    check_both(
+        "{\"shapes\": [{\"kind\": \"circle\", \"w\": 2}], \"message\": {\"type\": \"ping\"}}",
+        "Unknown field in 'shapes': w",
+        32
+    );
+    check_both(
+        "{\"shapes\": [], \"message\": {\"type\": \"text\"}}",
+        "Missing required field in 'message': text",
+        26
+    );
+    /* The discriminator can not be given twice, not even with the value of another variant */
+    check_both(
+        "{\"shapes\": [{\"kind\": \"circle\", \"r\": 3, \"kind\": \"star\"}], \"message\": {\"type\": \"ping\"}}",
+        "Duplicate field definition in 'shapes': kind",
+        40
+    );
+    check_both(
+        "{\"shapes\": [], \"message\": {\"type\": \"ping\", \"type\": \"text\"}}",
+        "Duplicate field definition in 'message': type",
+        44
+    );
+    return 0;
+}
@@ -0,0 +1,33 @@
+#include "shared_parsers.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+
+const char* data = "{ \
+    \"home\": {\"city\": \"Budapest\", \"zip\": 1111, \"kind\": \"flat\"}, \
+    \"work\": {\"city\": \"Szeged\"}, \
+    \"previous\": [{\"city\": \"Pecs\", \"zip\": 7600}, {\"city\": \"Gyor\", \"kind\": \"flat\"}] \
+}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(data, &root));
+    assert(!strcmp(root.home.city, "Budapest"));
+    assert(root.home.zip == 1111);
+    assert(root.home.kind == ADDRESS_KIND_FLAT);
+    assert(!strcmp(root.work.city, "Szeged"));
+    assert(root.work.zip == 1000);
+    assert(root.work.kind == ADDRESS_KIND_HOUSE);
+    assert(root.previous.n == 2);
+    assert(!strcmp(root.previous.items[0].city, "Pecs"));
+    assert(root.previous.items[0].zip == 7600);
+    assert(root.previous.items[1].kind == ADDRESS_KIND_FLAT);
+
+    assert(json_parse_root("{\"home\": {\"city\": \"a\"}, \"work\": {\"city\": \"b\", \"zip\": 1}, \"previous\": []}", &root));
+    assert(json_parse_root("{\"home\": {\"city\": \"a\"}, \"work\": {\"city\": \"b\"}, \"previous\": [{\"zip\": 1234}]}", &root));
+    return 0;
+}